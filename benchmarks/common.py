@@ -0,0 +1,105 @@
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from ekosuite import AppDB
+from ekosuite.plugins.model.project.ProjectDB import FITS_FILE_INSERT
+
+
+def synthetic_rows(count: int, seed: int = 42, start: datetime = datetime(2024, 1, 1, 4, 0, 0)) -> list[tuple]:
+    """
+    Generate `fits_files` rows that look like a multi-year archive of a few rigs.
+    """
+    rng = random.Random(seed)
+    targets = [f"NGC {n}" for n in range(1, 60)]
+    filters = ["L", "R", "G", "B", "Ha", "OIII", "SII"]
+    cameras = ["ZWO ASI2600MM Pro", "ZWO ASI533MC Pro", "QHY268M"]
+    telescopes = [("Esprit 100", 550.0), ("RedCat 51", 250.0), ("EdgeHD 8", 2032.0)]
+    types = ["Light"] * 8 + ["Flat", "Dark", "Bias"]
+    rows = []
+    for i in range(count):
+        night = start + timedelta(days=i // 400, seconds=(i % 400) * 60)
+        telescope, focal_length = rng.choice(telescopes)
+        imagetype = rng.choice(types)
+        rows.append((
+            f"/archive/{night:%Y-%m-%d}/{imagetype}/frame_{i:07d}.fits",
+            night,
+            34.0,
+            -118.0,
+            -7.0 if imagetype == "Light" else None,
+            6248,
+            4176,
+            3.76,
+            None,
+            rng.choice(targets),
+            rng.uniform(0, 360),
+            rng.uniform(-30, 80),
+            rng.choice(cameras),
+            telescope,
+            rng.choice(filters),
+            imagetype,
+            rng.choice([1.0, 60.0, 120.0, 300.0]),
+            focal_length,
+            rng.uniform(-5, 20),
+            -10.0,
+            100.0,
+            50.0,
+            rng.uniform(18, 22),
+            rng.uniform(1, 2),
+        ))
+    return rows
+
+def temporary_db() -> AppDB:
+    return AppDB(folder=tempfile.mkdtemp(prefix="ekosuite-bench-"))
+
+def fill(db: AppDB, rows: list[tuple], chunk: int = 5000):
+    for i in range(0, len(rows), chunk):
+        db.executemany(FITS_FILE_INSERT, rows[i:i + chunk])
+
+def write_fits_corpus(folder: str, count: int, nights: int = 20) -> list[str]:
+    """
+    Write `count` small FITS files with realistic headers, spread over night folders.
+    """
+    import numpy as np
+    from astropy.io import fits
+
+    data = np.zeros((8, 8), dtype=np.uint16)
+    paths = []
+    for i, row in enumerate(synthetic_rows(count)):
+        night_folder = os.path.join(folder, f"night_{i % nights:03d}", row[15])
+        os.makedirs(night_folder, exist_ok=True)
+        hdu = fits.PrimaryHDU(data)
+        header = hdu.header
+        header['DATE-OBS'] = row[1].strftime('%Y-%m-%dT%H:%M:%S.%f')
+        header['SITELAT'] = row[2]
+        header['SITELONG'] = row[3]
+        header['XPIXSZ'] = row[7]
+        header['OBJECT'] = row[9]
+        header['RA'] = row[10]
+        header['DEC'] = row[11]
+        header['INSTRUME'] = row[12]
+        header['TELESCOP'] = row[13]
+        header['FILTER'] = row[14]
+        header['IMAGETYP'] = row[15]
+        header['EXPTIME'] = row[16]
+        header['FOCALLEN'] = row[17]
+        header['FOCUSTEM'] = row[18]
+        header['CCD-TEMP'] = row[19]
+        header['GAIN'] = row[20]
+        header['OFFSET'] = row[21]
+        header['MPSAS'] = row[22]
+        header['AIRMASS'] = row[23]
+        path = os.path.join(night_folder, f"frame_{i:07d}.fits")
+        hdu.writeto(path, overwrite=True)
+        paths.append(path)
+    return paths
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.elapsed = time.perf_counter() - self.start
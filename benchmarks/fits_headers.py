@@ -0,0 +1,44 @@
+"""
+Files/s for extracting `fits_files` rows from FITS headers.
+
+Compares the `FITSImage` property path (one `fitsio.read_header` plus 24 property reads) with the
+mmap based header reader, both for parsing alone and for the full row including the timezone.
+
+    python -m benchmarks.fits_headers --files 2000
+"""
+import argparse
+import tempfile
+
+import fitsio
+
+from benchmarks.common import Timer, write_fits_corpus
+from ekosuite.plugins.model.images.FITSHeader import read_fits_row, read_primary_header
+from ekosuite.plugins.model.images.FITSImage import FITSImage
+
+def report(name: str, paths: list[str], read):
+    with Timer() as t:
+        for path in paths:
+            read(path)
+    print(f"{name:>28}: {len(paths) / t.elapsed:10.0f} files/s")
+
+def fits_image_row(path: str):
+    image = FITSImage(path)
+    return (
+        image.filename, image.create_time, image.latitude, image.longitude, image.timezone_offset,
+        image.image_width, image.image_height, image.pixel_size, image.scale, image.object, image.ra,
+        image.dec, image.instrument, image.telescope, image.filter, image.imagetype, image.exptime,
+        image.focal_length, image.temperature, image.sensor_temperature, image.gain, image.bias,
+        image.mpsas, image.airmass,
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=200, help="files used for the full row comparison")
+    args = parser.parse_args()
+
+    paths = write_fits_corpus(tempfile.mkdtemp(prefix="ekosuite-corpus-"), args.files)
+    report("fitsio.read_header", paths, fitsio.read_header)
+    report("read_primary_header", paths, read_primary_header)
+    report("FITSImage row", paths[:args.rows], fits_image_row)
+    report("read_fits_row", paths[:args.rows], read_fits_row)
@@ -0,0 +1,57 @@
+"""
+Wall time and peak RSS for stacking a master flat with `ImageData.flat_stack` and with
+`ccdproc.combine` on the bias subtracted frames, as `flat_stack` used to do.
+
+Each run happens in a fresh process, so its peak RSS is not inflated by the previous run.
+
+    python -m benchmarks.flat_stack --flats 40 --megapixels 26 --memory-limit 512
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import Timer
+
+def write_flats(folder: str, count: int, megapixels: float) -> list[str]:
+    import fitsio
+    height = int((megapixels * 1e6 / 1.5) ** 0.5)
+    rng = np.random.default_rng(1)
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"flat_{i:03d}.fits")
+        fitsio.write(path, rng.normal(20000, 200, (height, int(height * 1.5))).astype(np.uint16), clobber=True)
+        paths.append(path)
+    return paths
+
+def stack(method: str, paths: list[str], memoryLimit: int) -> tuple[float, float]:
+    import ccdproc as ccdp
+    from ekosuite.plugins.model.images.FITSImage import FITSImage
+    from ekosuite.plugins.model.images.ImageData import ImageData
+
+    flats = [FITSImage(path).image_data for path in paths]
+    bias = ImageData(np.full(flats[0].shape, 500, dtype=np.uint16))
+    with Timer() as t:
+        if method == "chunked":
+            ImageData.flat_stack(flats, bias, memoryLimit=memoryLimit)
+        else:
+            ccdp.combine([flat.bias_subtract(bias) for flat in flats], sigma_clip=True)
+    return t.elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--flats", type=int, default=40)
+    parser.add_argument("--megapixels", type=float, default=26)
+    parser.add_argument("--memory-limit", type=int, default=512, help="MB for the chunked stack")
+    args = parser.parse_args()
+
+    paths = write_flats(tempfile.mkdtemp(prefix="ekosuite-flats-"), args.flats, args.megapixels)
+    print(f"{len(paths)} flats of {args.megapixels} MP, {sum(os.path.getsize(path) for path in paths) / 1e9:.2f} GB")
+    context = multiprocessing.get_context("spawn")
+    for method in ("chunked", "ccdproc"):
+        with context.Pool(1) as pool:
+            elapsed, rss = pool.apply(stack, (method, paths, args.memory_limit * 2 ** 20))
+        print(f"  {method:>8}: {elapsed:8.1f} s, peak RSS {rss:8.0f} MB")
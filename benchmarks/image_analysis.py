@@ -0,0 +1,57 @@
+"""
+Frames/s for analyzing a night of subs with `ImageAnalysis` at several worker counts.
+
+The subs are synthetic star fields registered in a temporary DB and measured uncalibrated, so the
+numbers cover reading, measuring and committing, and scale with the number of cores.
+
+    python -m benchmarks.image_analysis --subs 500 --megapixels 2 --workers 1 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import fitsio
+import numpy as np
+
+from benchmarks.common import Timer, temporary_db
+from ekosuite.plugins.model.images.DBImage import DBImage
+from ekosuite.plugins.model.images.ImageAnalysis import ImageAnalysis
+from ekosuite.plugins.model.project.ProjectDB import FITS_FILE_INSERT
+
+def write_subs(folder: str, count: int, megapixels: float) -> list[tuple]:
+    height = int((megapixels * 1e6 / 1.5) ** 0.5)
+    shape = (height, int(height * 1.5))
+    rng = np.random.default_rng(1)
+    # One star field, shifted between subs like a dithered sequence
+    field = rng.normal(1000, 10, shape)
+    y, x = np.indices((15, 15))
+    star = np.exp(-((x - 7) ** 2 + (y - 7) ** 2) / (2 * 2.0 ** 2))
+    for cy, cx in zip(rng.integers(0, shape[0] - 15, 2000), rng.integers(0, shape[1] - 15, 2000)):
+        field[cy:cy + 15, cx:cx + 15] += rng.uniform(200, 5000) * star
+    rows = []
+    start = datetime(2024, 1, 1, 4, 0, 0)
+    for i in range(count):
+        path = os.path.join(folder, f"light_{i:04d}.fits")
+        fitsio.write(path, np.roll(field, i % 20, axis=1).astype(np.uint16), clobber=True)
+        rows.append((path, start + timedelta(minutes=i), 34.0, -118.0, -7.0, shape[1], shape[0], 3.76, None, 'M 31', 10.0, 41.0,
+                     'Camera', 'Telescope', 'L', 'Light', 60.0, 550.0, 10.0, -10.0, 100.0, 50.0, 20.0, 1.2))
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subs", type=int, default=500)
+    parser.add_argument("--megapixels", type=float, default=2)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    db = temporary_db()
+    db.executemany(FITS_FILE_INSERT, write_subs(tempfile.mkdtemp(prefix="ekosuite-subs-"), args.subs, args.megapixels))
+    ids = [row[0] for row in db.fetchall("SELECT id FROM fits_files ORDER BY id")]
+    print(f"{len(ids)} subs of {args.megapixels} MP")
+    for workers in sorted(set(args.workers)):
+        analysis = ImageAnalysis(db, DBImage.load(ids, db), maxWorkers=workers)
+        with Timer() as t:
+            results = asyncio.run(analysis.analyze(calibrate=False))
+        print(f"  {workers:3d} workers: {len(results) / t.elapsed:8.1f} frames/s")
@@ -0,0 +1,91 @@
+"""
+Selection latency of the image filter on a large `fits_files` table.
+
+Compares the previous statement (quoted values in OR chains, the computed telescope label and an
+unconditional night session join) with the compiled `ImageFilterQuery` for typical selections,
+and listing the options of the filter tree with `SELECT DISTINCT` scans and from the facet counts.
+The previous statement returns fewer rows, as its join drops the calibration frames of the
+synthetic archive, which have no timezone and so no night session.
+
+    python -m benchmarks.image_filter --rows 200000 --repeat 20
+"""
+import argparse
+
+from benchmarks.common import Timer, fill, synthetic_rows, temporary_db
+from ekosuite.plugins.core.ImageFacets import ImageFacets
+from ekosuite.plugins.core.ImageFilterQuery import FilterType, ImageFilterQuery
+
+IMAGE_TYPES = ['LIGHT', 'DARK', 'BIAS', 'FLAT', 'MASTER DARK', 'MASTER BIAS']
+
+def legacy_query(selections: dict[FilterType, list]) -> str:
+    def matches(column: str, values: list) -> str:
+        return '(' + ' OR '.join(f"{column} = '{value}'" for value in values) + ')'
+    columns = {
+        FilterType.NIGHT: 'ns.start_day',
+        FilterType.FILTER: 'ff.filter',
+        FilterType.TARGET: 'ff.object',
+        FilterType.TELESCOPE: "ff.telescope || ' ' || ff.focal_length || 'mm'",
+        FilterType.CAMERA: 'ff.instrument',
+    }
+    elements = [f"""
+        SELECT ff.id AS id
+        FROM fits_files AS ff
+        JOIN night_session_fits_files AS nsff
+            ON nsff.fits_file_id = ff.id
+        JOIN night_sessions AS ns
+            ON nsff.night_session_id = ns.id
+        WHERE image_type_generic IN {'(' + ','.join(f"'{imageType}'" for imageType in IMAGE_TYPES) + ')'}
+        """]
+    for filterType, values in selections.items():
+        labels = [f"{value[0]} {value[1]}mm" if filterType == FilterType.TELESCOPE else value for value in values]
+        elements.append(matches(columns[filterType], labels))
+    return ' AND '.join(elements)
+
+LEGACY_OPTIONS = [
+    "SELECT DISTINCT start_day FROM night_sessions ORDER BY 1 ASC",
+    "SELECT DISTINCT object FROM targets ORDER BY 1 ASC",
+    "SELECT DISTINCT telescope || ' ' || focal_length || 'mm' FROM fits_files ORDER BY 1 ASC",
+    "SELECT DISTINCT instrument FROM fits_files ORDER BY 1 ASC",
+    "SELECT DISTINCT filter FROM fits_files ORDER BY 1 ASC",
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    db = temporary_db()
+    fill(db, synthetic_rows(args.rows))
+    nights = [row[0] for row in db.fetchall("SELECT start_day FROM night_sessions ORDER BY 1")]
+    cases = {
+        "nothing": {},
+        "one filter": {FilterType.FILTER: ['Ha']},
+        "target + filters": {FilterType.TARGET: ['NGC 7'], FilterType.FILTER: ['L', 'R', 'G', 'B']},
+        "telescope + camera": {FilterType.TELESCOPE: [('Esprit 100', 550.0)], FilterType.CAMERA: ['QHY268M']},
+        "night + filter": {FilterType.NIGHT: nights[len(nights) // 2:len(nights) // 2 + 3], FilterType.FILTER: ['OIII']},
+    }
+    for name, selections in cases.items():
+        with Timer() as legacy:
+            for _ in range(args.repeat):
+                legacyIds = db.fetchall(legacy_query(selections))
+        with Timer() as compiled:
+            for _ in range(args.repeat):
+                ids = ImageFilterQuery(IMAGE_TYPES, selections).imageIds(db)
+        print(f"{name:20s}: legacy {legacy.elapsed / args.repeat * 1000:8.2f} ms ({len(legacyIds)} rows), "
+              f"compiled {compiled.elapsed / args.repeat * 1000:8.2f} ms ({len(ids)} rows)")
+
+    facets = ImageFacets(db)
+    with Timer() as legacy:
+        for _ in range(args.repeat):
+            for query in LEGACY_OPTIONS:
+                db.fetchall(query)
+    with Timer() as counted:
+        for _ in range(args.repeat):
+            for filterType in FilterType:
+                facets.options(filterType, IMAGE_TYPES)
+    print(f"{'tree options':20s}: distinct {legacy.elapsed / args.repeat * 1000:8.2f} ms, facets {counted.elapsed / args.repeat * 1000:8.2f} ms")
+    db.close()
+
+if __name__ == "__main__":
+    main()
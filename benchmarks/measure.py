@@ -0,0 +1,46 @@
+"""
+Milliseconds per megapixel for `ImageMeasurement.measure` on synthetic star fields, at full
+resolution and, as quick looks do, on binned pixels including the binning.
+
+    python -m benchmarks.measure --megapixels 4 26 62 --stars-per-megapixel 400 --binning 1 2 4
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import Timer
+from ekosuite.plugins.model.images.ImageData import ImageData
+from ekosuite.plugins.model.images.ImageMeasurement import ImageMeasurement
+
+def star_field(megapixels: float, starsPerMegapixel: int, sigma: float = 2.0) -> np.ndarray:
+    height = int((megapixels * 1e6 / 1.5) ** 0.5)
+    shape = (height, int(height * 1.5))
+    rng = np.random.default_rng(1)
+    pixels = rng.normal(1000, 10, shape).astype(np.float32)
+    y, x = np.indices((21, 21))
+    star = np.exp(-((x - 10) ** 2 + (y - 10) ** 2) / (2 * sigma ** 2)).astype(np.float32)
+    count = int(megapixels * starsPerMegapixel)
+    for cy, cx in zip(rng.integers(0, shape[0] - 21, count), rng.integers(0, shape[1] - 21, count)):
+        pixels[cy:cy + 21, cx:cx + 21] += rng.uniform(200, 5000) * star
+    return pixels
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[4, 26, 62])
+    parser.add_argument("--stars-per-megapixel", type=int, default=400)
+    parser.add_argument("--binning", type=int, nargs="+", default=[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for megapixels in args.megapixels:
+        pixels = star_field(megapixels, args.stars_per_megapixel).astype(np.uint16)
+        for binning in args.binning:
+            def measure() -> ImageMeasurement:
+                if binning == 1:
+                    return ImageMeasurement.measure(pixels)
+                return ImageMeasurement.measure(ImageData(pixels).binned(binning), binning=binning)
+            measure()
+            with Timer() as t:
+                for _ in range(args.repeat):
+                    measurement = measure()
+            print(f"{megapixels:6.1f} MP, bin {binning}: {t.elapsed / args.repeat / megapixels * 1000:8.1f} ms/MP, FWHM {measurement.fwhm:.2f} px")
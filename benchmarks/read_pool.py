@@ -0,0 +1,67 @@
+"""
+Selection latency while a scout is inserting rows one at a time.
+
+Compares reads routed through the writer queue (how `AppDB.fetchall` used to work) against the
+read-only connection pool.
+
+    python -m benchmarks.read_pool --rows 200000
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from benchmarks.common import FITS_FILE_INSERT, Timer, fill, synthetic_rows, temporary_db
+
+SELECTION = """
+SELECT id FROM fits_files
+WHERE image_type_generic = 'LIGHT' AND object = ? AND filter IN ('Ha', 'OIII')
+"""
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def run(rows: int, queries: int):
+    db = temporary_db()
+    data = synthetic_rows(rows + 20000)
+    fill(db, data[:rows])
+
+    stop = threading.Event()
+    def scout():
+        for row in data[rows:]:
+            if stop.is_set():
+                return
+            db.execute(FITS_FILE_INSERT, row)
+    writer = threading.Thread(target=scout, daemon=True)
+    writer.start()
+
+    def measure(read) -> list[float]:
+        latencies = []
+        for i in range(queries):
+            with Timer() as t:
+                read(SELECTION, (f"NGC {i % 59 + 1}",))
+            latencies.append(t.elapsed * 1000)
+        return latencies
+
+    db.writerMetrics.reset()
+    db.readerMetrics.reset()
+    queued = measure(lambda q, p: db.execute(q, p).fetchall())
+    writer_metrics = db.writerMetrics.snapshot()
+    pooled = measure(db.fetchall)
+    reader_metrics = db.readerMetrics.snapshot()
+    stop.set()
+    writer.join()
+
+    for name, latencies in (("writer queue", queued), ("reader pool", pooled)):
+        print(f"{name:>12}: p50 {statistics.median(latencies):7.2f} ms  p95 {percentile(latencies, 0.95):7.2f} ms")
+    print(f"writer metrics: {writer_metrics}")
+    print(f"reader metrics: {reader_metrics}")
+    db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    run(args.rows, args.queries)
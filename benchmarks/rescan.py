@@ -0,0 +1,75 @@
+"""
+Time to find the files a scout has to read in an already ingested tree.
+
+Compares the previous discovery (load every known filename, then os.walk the whole tree) with the
+file manifest on its first scan of a legacy database, on an unchanged tree and after a new night
+was added.
+
+    python -m benchmarks.rescan --nights 500 --files 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import Timer, temporary_db
+from ekosuite.plugins.model.project.FileManifest import FileManifest
+
+def build_tree(root: str, nights: int, files: int) -> list[str]:
+    """
+    Empty image files spread over night and frame type folders. Discovery never opens them.
+    """
+    past = time.time() - 3600
+    paths = []
+    for night in range(nights):
+        for imagetype in ("Light", "Flat", "Dark"):
+            folder = os.path.join(root, f"night_{night:04d}", imagetype)
+            os.makedirs(folder, exist_ok=True)
+            for i in range(files // 3):
+                path = os.path.join(folder, f"frame_{i:05d}.fits")
+                open(path, "wb").close()
+                paths.append(path)
+    for folder, _, _ in os.walk(root):
+        os.utime(folder, (past, past))
+    return paths
+
+def walk(db, root: str) -> list[str]:
+    known = set(row[0] for row in db.fetchall("SELECT filename FROM analyzed_files UNION SELECT filename FROM fits_files"))
+    found = []
+    for folder, _, files in os.walk(root):
+        for file in files:
+            path = os.path.join(folder, file)
+            if file.lower().endswith(('.fit', '.fits', '.xisf')) and path not in known:
+                found.append(path)
+    return found
+
+def manifest_scan(manifest: FileManifest, root: str, label: str):
+    with Timer() as t:
+        scan = manifest.scan(root)
+        changed = list(scan)
+        manifest.commit(scan)
+    print(f"  {label:>22}: {t.elapsed * 1000:10.1f} ms, {len(changed)} changed, {scan.listedDirectories} listed, {scan.skippedDirectories} skipped")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nights", type=int, default=500)
+    parser.add_argument("--files", type=int, default=200)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="ekosuite-tree-")
+    paths = build_tree(root, args.nights, args.files)
+    db = temporary_db()
+    # A database ingested before the manifest existed
+    db.executemany("INSERT INTO analyzed_files (filename) VALUES (?)", [(path,) for path in paths])
+    print(f"{len(paths)} files in {args.nights * 4 + 1} directories")
+
+    with Timer() as t:
+        found = walk(db, root)
+    print(f"  {'os.walk + known set':>22}: {t.elapsed * 1000:10.1f} ms, {len(found)} changed")
+
+    manifest = FileManifest(db)
+    manifest_scan(manifest, root, "manifest, first scan")
+    manifest_scan(manifest, root, "manifest, unchanged")
+    build_tree(os.path.join(root, "new"), 1, args.files)
+    manifest_scan(manifest, root, "manifest, new night")
+    db.close()
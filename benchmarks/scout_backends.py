@@ -0,0 +1,34 @@
+"""
+Files/s for reading a scout's files with the thread pool and with the process pool backend.
+
+Both backends read the same local synthetic corpus through `FileReader.read`. The process pool is
+started before timing, since a real scout pays that cost only once per app run.
+
+    python -m benchmarks.scout_backends --files 4000 --workers 8
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.common import Timer, write_fits_corpus
+from ekosuite.plugins.model.project.ProjectDB import FileReader
+
+def read_all(reader: FileReader, paths: list[str]) -> int:
+    return sum(1 for _, row in reader.read(paths) if row is not None)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=4000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    paths = write_fits_corpus(tempfile.mkdtemp(prefix="ekosuite-corpus-"), args.files)
+    print(f"{len(paths)} files, {args.workers} workers")
+    for backend in ("threads", "processes"):
+        reader = FileReader(maxWorkers=args.workers, backend=backend)
+        # Warm up pools and timezone caches
+        read_all(reader, paths[:args.workers * FileReader.processChunkSize])
+        with Timer() as t:
+            count = read_all(reader, paths)
+        print(f"  {backend:>9}: {count / t.elapsed:10.0f} files/s")
+        reader.shutdown()
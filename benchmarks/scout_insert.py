@@ -0,0 +1,52 @@
+"""
+Rows/s for writing scouted images to the DB.
+
+Compares one commit per row (the previous ingest path) with transaction batching. With --files, also
+scouts a synthetic folder end to end with the old chunk size of 1 and the current chunk size.
+
+    python -m benchmarks.scout_insert --rows 50000 --files 2000
+"""
+import argparse
+import asyncio
+import tempfile
+
+from benchmarks.common import Timer, synthetic_rows, temporary_db, write_fits_corpus
+from ekosuite.plugins.model.project.ProjectDB import FITS_FILE_INSERT, ProjectDB
+
+def insert_rows(rows: list[tuple]):
+    db = temporary_db()
+    with Timer() as t:
+        for row in rows:
+            db.execute(FITS_FILE_INSERT, row)
+    print(f"   commit per row: {len(rows) / t.elapsed:10.0f} rows/s")
+    db.close()
+
+    db = temporary_db()
+    with Timer() as t:
+        for i in range(0, len(rows), ProjectDB.scoutChunkSize):
+            with db.transaction() as tx:
+                tx.executemany(FITS_FILE_INSERT, rows[i:i + ProjectDB.scoutChunkSize])
+    print(f"  batched ({ProjectDB.scoutChunkSize:>4}): {len(rows) / t.elapsed:10.0f} rows/s")
+    db.close()
+
+def scout_folder(files: int):
+    folder = tempfile.mkdtemp(prefix="ekosuite-corpus-")
+    write_fits_corpus(folder, files)
+    for chunk_size in (1, ProjectDB.scoutChunkSize):
+        db = temporary_db()
+        project_db = ProjectDB(db)
+        project_db.scoutChunkSize = chunk_size
+        with Timer() as t:
+            asyncio.run(project_db.scout(folder, progress=lambda p: None))
+        inserted = db.get("SELECT COUNT(*) FROM fits_files")[0]
+        print(f"\n  scout, chunk {chunk_size:>4}: {inserted / t.elapsed:10.0f} rows/s ({inserted} rows)")
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--files", type=int, default=0)
+    args = parser.parse_args()
+    insert_rows(synthetic_rows(args.rows))
+    if args.files > 0:
+        scout_folder(args.files)
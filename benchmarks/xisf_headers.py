@@ -0,0 +1,72 @@
+"""
+Files/s for reading XISF metadata, and time for a metadata plus pixel read.
+
+Compares the xisf package (`XISF(path).get_images_metadata()`, plus a second `XISF` object for
+pixels as `XISFImage` used to do) with the streaming header reader. Masters written by PixInsight
+carry long processing histories and per-frame statistics, emulated with --history FITS keywords
+and --properties vector properties, which the xisf package reads from their data blocks.
+
+    python -m benchmarks.xisf_headers --count 4 --megapixels 62 --history 2000 --properties 40
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+from xisf import XISF
+
+from benchmarks.common import Timer
+from ekosuite.plugins.model.images.XISFHeader import read_xisf_header, read_xisf_image
+
+def write_masters(folder: str, count: int, megapixels: float, history: int, properties: int) -> list[str]:
+    height = int((megapixels * 1e6 / 1.5) ** 0.5)
+    pixels = np.random.default_rng(1).random((height, int(height * 1.5), 1), dtype=np.float32)
+    keywords = {
+        'DATE-OBS': [{'value': "'2023-10-01T19:00:01.123456'", 'comment': ''}],
+        'OBJECT': [{'value': "'M 31'", 'comment': ''}],
+        'HISTORY': [{'value': '', 'comment': f'ImageIntegration step {i}: weighting, rejection and normalization'} for i in range(history)],
+    }
+    statistics = {
+        f'ImageIntegration:Statistic{i}': {'id': f'ImageIntegration:Statistic{i}', 'type': 'F64Vector', 'value': np.linspace(0, 1, 1000)}
+        for i in range(properties)
+    }
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"master_{i}.xisf")
+        XISF.write(path, pixels, image_metadata={'FITSKeywords': keywords, 'XISFProperties': statistics}, xisf_metadata={})
+        paths.append(path)
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=4)
+    parser.add_argument("--megapixels", type=float, default=62)
+    parser.add_argument("--history", type=int, default=2000)
+    parser.add_argument("--properties", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    paths = write_masters(tempfile.mkdtemp(prefix="ekosuite-xisf-"), args.count, args.megapixels, args.history, args.properties)
+    size = sum(os.path.getsize(path) for path in paths) / 1e9
+    print(f"{len(paths)} masters, {size:.2f} GB")
+
+    with Timer() as t:
+        for _ in range(args.repeat):
+            for path in paths:
+                XISF(path).get_images_metadata()[0]['FITSKeywords']
+    print(f"  xisf metadata:      {args.repeat * len(paths) / t.elapsed:10.1f} files/s")
+    with Timer() as t:
+        for _ in range(args.repeat):
+            for path in paths:
+                read_xisf_header(path)['FITSKeywords']
+    print(f"  streaming header:   {args.repeat * len(paths) / t.elapsed:10.1f} files/s")
+
+    with Timer() as t:
+        for path in paths:
+            XISF(path).get_images_metadata()
+            XISF(path).read_image(0)
+    print(f"  xisf, two objects:  {t.elapsed / len(paths) * 1000:10.1f} ms per master")
+    with Timer() as t:
+        for path in paths:
+            read_xisf_image(path, read_xisf_header(path))
+    print(f"  header + pixels:    {t.elapsed / len(paths) * 1000:10.1f} ms per master")
@@ -1,4 +1,5 @@
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import QApplication, QLabel
 import asyncio
 
@@ -17,6 +18,8 @@ async def main():
     sys.exit()
 
 if __name__ == "__main__":
+    # Scout worker processes of the bundled app start from this executable
+    multiprocessing.freeze_support()
     args = sys.argv[1:]
     if args:
         if '--validate-build' in args:
@@ -1,4 +1,4 @@
 from ekosuite.app.AppDB import AppDB
 from ekosuite.plugins.model.project.ProjectDB import ProjectDB
-from ekosuite.app.FileSystemObserver import FileSystemObserver, FileSystemImageChangeListener
+from ekosuite.app.FileSystemObserver import FileSystemObserver, FileSystemImageChangeListener, FileSystemImageBatchListener
 from ekosuite import app
\ No newline at end of file
@@ -2,7 +2,9 @@ import json
 import sys
 from PyQt5.QtWidgets import QApplication, QWidget, QBoxLayout, QLayout, QPushButton, QGridLayout, QMainWindow
 
-from .FileSystemObserver import FileSystemObserver, FileSystemImageChangeListener
+from .FileSystemObserver import FileSystemObserver, FileSystemImageBatchListener
+from .ImageChanges import ImageChanges
+from .IngestService import IngestService
 from ekosuite.app.AppDB import AppDB
 from ekosuite.app.AppSettings import AppSettings
 from ekosuite.plugins.core.PluginLoader import PluginLoader
@@ -12,6 +14,12 @@ from .SelectPlugins import SelectPlugins
 from .DataStream import DataStream
 
 from ekosuite.plugins.model.project.ProjectDB import ProjectDB
+from ekosuite.plugins.model.images.DBImage import DBImage
+from ekosuite.plugins.model.images.ImageDelta import ImageDelta
+from ekosuite.plugins.model.images.QuickLookAnalysis import QuickLookAnalysis
+from ekosuite.plugins.core.PluginScheduler import PluginScheduler
+from ekosuite.ui.MainThreadDispatcher import MainThreadDispatcher
+from ekosuite.ui.ThrottledUpdate import ThrottledUpdate
 import asyncio
 from threading import Thread
 from PyQt5.QtWidgets import QFileDialog
@@ -23,7 +31,11 @@ class App:
         self.author = "Daniel Vancura"
         self.db = AppDB()
         self.projectDB = ProjectDB(self.db)
-        self.fileSystemObserver = FileSystemObserver(self.db)
+        # Plugins and their views learn about new images from ingests and from scouts of selected folders
+        self.imageChanges = ImageChanges(self.db)
+        # New frames get a quick look as soon as they are stored
+        self.quickLookAnalysis = QuickLookAnalysis(self.db)
+        self.ingestService = IngestService(self.projectDB, onIngested=self._didIngest)
         
         self.pluginLoader = PluginLoader()
         self.pluginLoader.queryPlugins()
@@ -32,15 +44,48 @@ class App:
         self.selectPluginWindow: SelectPlugins | None = None
 
         self._app = QApplication(sys.argv)
+        # Plugins execute on the scheduler's workers, their results are handed to their views here
+        self._mainThread = MainThreadDispatcher()
+        self.pluginScheduler = PluginScheduler(self.db, onExecuted=lambda plugin, images, result: self._mainThread.call(self._pluginExecuted, plugin, images, result))
+        self.imageChanges.subscribe(self._receiveImages)
 
         self.activePlugins: list[PluginInterface] = []
         for selection in self.appSettings.pluginSelection.selectedPlugins:
             if selection in self.pluginLoader.plugins:
-                self.activePlugins.append(selection(self.db))
+                self._activate(selection(self.db))
+
+        # Scouts start right away, once the active plugins receive what they write
+        self.fileSystemObserver = FileSystemObserver(self.db, onScouted=lambda imageIds: self.imageChanges.publish(imageIds, backfill=True))
     
-    def _receiveImage(self, image):
+    def _activate(self, plugin: PluginInterface):
+        self.activePlugins.append(plugin)
+        if plugin.processesImages():
+            self.pluginScheduler.add(plugin)
+
+    def _deactivate(self, plugin: PluginInterface):
+        self.activePlugins.remove(plugin)
+        self.pluginScheduler.remove(plugin)
+
+    def _didIngest(self, images, imageIds: list[int]):
+        self.quickLookAnalysis.submit(images)
+        self.imageChanges.publish(imageIds)
+
+    def _imagesAdded(self, delta: ImageDelta):
         for plugin in self.activePlugins:
-            plugin.execute(image, self.db)
+            ui = plugin.getUserInterface()
+            if ui is not None:
+                ui.imagesAdded(delta)
+
+    def _receiveImages(self, delta: ImageDelta):
+        # Plugins get every committed image, ingested or scouted, as a lazily loaded record
+        self.pluginScheduler.submit(DBImage.load(delta.imageIds, self.db), backfill=delta.backfill)
+
+    def _pluginExecuted(self, plugin: PluginInterface, images, result):
+        if plugin not in self.activePlugins:
+            return
+        ui = plugin.getUserInterface()
+        if ui is not None:
+            ui.executed(images, result)
     
     @property
     def activePlugins(self) -> list[PluginInterface]:
@@ -52,11 +97,11 @@ class App:
 
     async def run(self):
         # Start listening to file updates in active folders
-        def insertImage(image):
-            print(f"Received new image: {image.filename}")
-            asyncio.run(self.projectDB.insertImage(image))
+        self.fileSystemObserver.addBatchListener(FileSystemImageBatchListener(lambda images: self.ingestService.submitAll(images)))
 
-        self.fileSystemObserver.addListener(FileSystemImageChangeListener(lambda image: insertImage(image)))
+        # Views are updated on the GUI thread, at most once a second while frames arrive
+        self._viewUpdates = ThrottledUpdate(self._imagesAdded, interval=1.0)
+        self.imageChanges.subscribe(self._viewUpdates.publish)
 
         self._mainWindow = QMainWindow()
         self._mainWindow.setGeometry(100, 100, 800, 600)
@@ -146,11 +191,12 @@ class App:
         self.selectPluginWindow.show()
 
     def didUpdateSelection(self, selection: list[type[PluginInterface]]):
-        for selected in self.activePlugins:
+        for selected in list(self.activePlugins):
             if type(selected) not in selection:
-                self.activePlugins.remove(selected)
+                self._deactivate(selected)
+        activeTypes = [type(plugin) for plugin in self.activePlugins]
         for newly_added in selection:
-            if newly_added not in self.activePlugins:
-                self.activePlugins.append(newly_added(self.db))
+            if newly_added not in activeTypes:
+                self._activate(newly_added(self.db))
 
         self.resetUi()
\ No newline at end of file
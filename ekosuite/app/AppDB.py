@@ -1,13 +1,98 @@
-import os
-import sqlite3
-
 import os
 import sqlite3
 import threading
+import time
+from contextlib import contextmanager
 from queue import Queue, Empty
 
+class QueueMetrics:
+    """
+    Running statistics about how long database work waited before it was served.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = 0
+        self._totalWait = 0.0
+        self._maxWait = 0.0
+        self._depth = 0
+        self._maxDepth = 0
+
+    def record(self, wait: float, depth: int):
+        with self._lock:
+            self._count += 1
+            self._totalWait += wait
+            self._maxWait = max(self._maxWait, wait)
+            self._depth = depth
+            self._maxDepth = max(self._maxDepth, depth)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "count": self._count,
+                "avg_wait": self._totalWait / self._count if self._count else 0.0,
+                "max_wait": self._maxWait,
+                "depth": self._depth,
+                "max_depth": self._maxDepth,
+            }
+
+    def reset(self):
+        with self._lock:
+            self._count = 0
+            self._totalWait = 0.0
+            self._maxWait = 0.0
+            self._depth = 0
+            self._maxDepth = 0
+
+class Transaction:
+    """
+    Collects statements that are executed by the writer thread in a single transaction.
+    """
+    def __init__(self):
+        self._statements: list[tuple[str, object, bool, list | None]] = []
+
+    def execute(self, query, params=()):
+        self._statements.append((query, params, False, None))
+
+    def executemany(self, query, seq_of_params):
+        self._statements.append((query, seq_of_params, True, None))
+
+    def fetchall(self, query, params=()) -> list:
+        """
+        Executes `query` in the transaction, e.g. a SELECT or a statement with RETURNING. Returns the
+        list its rows are added to once the transaction committed.
+        """
+        rows = []
+        self._statements.append((query, params, False, rows))
+        return rows
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def run(self, conn: sqlite3.Connection):
+        query = None
+        try:
+            cursor = conn.cursor()
+            fetched = []
+            for query, params, many, rows in self._statements:
+                if many:
+                    cursor.executemany(query, params)
+                elif rows is None:
+                    cursor.execute(query, params)
+                else:
+                    fetched.append((rows, cursor.execute(query, params).fetchall()))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Interface error in transaction: {query}\n\nResulting Exception: {e}")
+            raise e
+        for rows, result in fetched:
+            rows.extend(result)
+
 class AppDB:
-    def __init__(self, folder=os.path.expanduser("~/.ekosuite/")):
+    # Migration scripts, applied in file name order and recorded in `dbinfo`
+    migrationsFolder = os.path.join(os.path.dirname(__file__), "db")
+
+    def __init__(self, folder=os.path.expanduser("~/.ekosuite/"), readers: int = min(4, os.cpu_count() or 1)):
         self.folder = folder
         if not os.path.exists(self.folder):
             os.makedirs(self.folder)
@@ -20,11 +105,19 @@ class AppDB:
 
         self.__conn: sqlite3.Connection = None
         self.queue = Queue()
+        self.writerMetrics = QueueMetrics()
         self.thread = threading.Thread(target=self._worker, daemon=True)
         self.thread.start()
 
+        # Read-only connections served straight from the calling thread. The schema runs in WAL mode,
+        # so readers see the last committed state and never wait behind the writer thread.
+        self._readerCount = max(1, readers)
+        self._readers = Queue()
+        self.readerMetrics = QueueMetrics()
+
         self._initialize_db()
-    
+        self._initialize_readers()
+
     @property
     def conn(self) -> sqlite3.Connection:
         if self.__conn is None:
@@ -38,29 +131,82 @@ class AppDB:
             cursor.execute("PRAGMA foreign_keys = ON")
             self.__conn.commit()
             self.handleVersions()
-        self.queue.put((init, None))
+        result_queue = Queue()
+        self._enqueue(init, result_queue)
+        # Readers may only connect once the schema exists
+        result = result_queue.get()
+        if isinstance(result, Exception):
+            print(f"Error initializing database: {result}")
+
+    def _initialize_readers(self):
+        for _ in range(self._readerCount):
+            conn = sqlite3.connect(self.dbFile, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            self._readers.put(conn)
 
     def handleVersions(self):
-        db_folder = os.path.join(os.path.dirname(__file__), "db")
+        db_folder = self.migrationsFolder
         if not os.path.exists(db_folder):
             return
 
+        try:
+            applied = set(map(lambda row: row[0], self.__conn.execute("SELECT version FROM dbinfo").fetchall()))
+        except sqlite3.OperationalError:
+            applied = set()
+
         files = os.listdir(db_folder)
         files.sort()
         for file_name in files:
             if file_name.endswith(".sql"):
+                version = file_name[:-len(".sql")]
+                if version in applied:
+                    continue
                 sqlStatement = os.path.join(db_folder, file_name)
                 with open(sqlStatement, 'r') as sqlFile:
-                    sqlScript = sqlFile.read()
-                    self.__conn.executescript(sqlScript)
-        self.__conn.commit()
+                    self._migrate(version, sqlFile.read())
+
+    def _migrate(self, version: str, sqlScript: str):
+        """
+        Applies a migration script and records it in `dbinfo` in one transaction, so an interrupted
+        migration is either applied and recorded or neither. Unlike `executescript`, this does not
+        commit halfway: the script's own BEGIN/COMMIT are skipped, and PRAGMAs, which cannot change
+        the journal mode inside a transaction, run before it starts.
+        """
+        statements = []
+        pending = ""
+        for line in sqlScript.splitlines(keepends=True):
+            pending += line
+            if sqlite3.complete_statement(pending):
+                code = "\n".join(l for l in pending.splitlines() if not l.strip().startswith("--"))
+                statements.append((code.strip().rstrip(";").strip().upper(), pending))
+                pending = ""
+
+        for code, statement in statements:
+            if code.startswith("PRAGMA"):
+                self.__conn.execute(statement)
+        self.__conn.execute("BEGIN")
+        try:
+            for code, statement in statements:
+                if code in ("BEGIN", "BEGIN TRANSACTION", "COMMIT", "END", "END TRANSACTION") or code.startswith("PRAGMA"):
+                    continue
+                self.__conn.execute(statement)
+            self.__conn.execute("INSERT INTO dbinfo (version) VALUES (?)", (version,))
+            self.__conn.commit()
+        except Exception as e:
+            self.__conn.rollback()
+            raise e
+
+    def _enqueue(self, task, result_queue):
+        self.queue.put((task, result_queue, time.perf_counter()))
 
     def _worker(self):
         while True:
+            result_queue = None
             try:
-                task, result_queue = self.queue.get()
+                task, result_queue, enqueued = self.queue.get()
                 if task is None:  # Sentinel to stop the thread
                     break
+                self.writerMetrics.record(time.perf_counter() - enqueued, self.queue.qsize())
                 result = task()
                 if result_queue:
                     result_queue.put(result)
@@ -68,11 +214,41 @@ class AppDB:
                 if result_queue:
                     result_queue.put(e)
 
+    def _read(self, query, params, fetch):
+        started = time.perf_counter()
+        conn = self._readers.get()
+        self.readerMetrics.record(time.perf_counter() - started, self._readerCount - self._readers.qsize())
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return fetch(cursor)
+        except Exception as e:
+            # Mirror the writer thread, which hands errors back as results
+            print(f"Interface error in query: {query}\n\nWith params: {params}\n\nResulting Exception: {e}")
+            return e
+        finally:
+            self._readers.put(conn)
+
+    @property
+    def metrics(self) -> dict:
+        """
+        Queue depth and wait time statistics for the writer thread and the reader pool.
+        """
+        return {
+            "writer": self.writerMetrics.snapshot(),
+            "readers": self.readerMetrics.snapshot(),
+        }
+
     def close(self):
-        self.queue.put((None, None))  # Sentinel to stop the thread
+        self._enqueue(None, None)  # Sentinel to stop the thread
         self.thread.join()
         if self.__conn:
             self.__conn.close()
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except Empty:
+                break
 
     def execute(self, query, params=()) -> sqlite3.Cursor:
         result_queue = Queue()
@@ -85,24 +261,49 @@ class AppDB:
             except Exception as e:
                 print(f"Interface error in query: {query}\n\nWith params: {params}\n\nResulting Exception: {e}")
                 raise e
-        
-        self.queue.put((task, result_queue))
+
+        self._enqueue(task, result_queue)
         return result_queue.get()
 
-    def fetchall(self, query, params=()):
+    def executemany(self, query, seq_of_params) -> sqlite3.Cursor:
+        """
+        Executes `query` for every parameter set and commits once.
+        """
         result_queue = Queue()
         def task():
-            cursor = self.__conn.cursor()
-            cursor.execute(query, params)
-            return cursor.fetchall()
-        self.queue.put((task, result_queue))
+            try:
+                cursor = self.__conn.cursor()
+                result = cursor.executemany(query, seq_of_params)
+                self.__conn.commit()
+                return result
+            except Exception as e:
+                print(f"Interface error in query: {query}\n\nResulting Exception: {e}")
+                raise e
+
+        self._enqueue(task, result_queue)
         return result_queue.get()
 
-    def get(self, query, params=()):
+    @contextmanager
+    def transaction(self):
+        """
+        Groups writes into one transaction and one commit on the writer thread.
+
+            with db.transaction() as tx:
+                tx.executemany("INSERT ...", rows)
+                tx.execute("UPDATE ...")
+        """
+        transaction = Transaction()
+        yield transaction
+        if len(transaction) == 0:
+            return
         result_queue = Queue()
-        def task():
-            cursor = self.__conn.cursor()
-            cursor.execute(query, params)
-            return cursor.fetchone()
-        self.queue.put((task, result_queue))
-        return result_queue.get()
\ No newline at end of file
+        self._enqueue(lambda: transaction.run(self.__conn), result_queue)
+        result = result_queue.get()
+        if isinstance(result, Exception):
+            raise result
+
+    def fetchall(self, query, params=()):
+        return self._read(query, params, lambda cursor: cursor.fetchall())
+
+    def get(self, query, params=()):
+        return self._read(query, params, lambda cursor: cursor.fetchone())
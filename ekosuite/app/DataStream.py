@@ -2,41 +2,122 @@ from ekosuite.plugins.model.images.FITSImage import FITSImage
 from ekosuite.plugins.model.images.Image import Image
 import watchdog.events as wde
 import watchdog.observers as wdo
+from watchdog.observers.api import ObservedWatch
 from typing import Callable
 import threading
+import time
 
 from ekosuite.plugins.model.images.XISFImage import XISFImage
+from .FileEventCoalescer import FileEventCoalescer
 
 class DataStream(wde.FileSystemEventHandler):
-    def __init__(self, directory: str):
+    """
+    Images written to any number of watched directories. All directories share one observer and
+    one coalescer, so adding directories does not add dispatch threads.
+    """
+    def __init__(self, directory: str | None = None, quietPeriod: float = 1.0):
         self._latest: Image | None = None
         self._observers: list[Callable[[Image], None]] = []
+        self._batchObservers: list[Callable[[list[tuple[Image, float]]], None]] = []
         self._lock = threading.Lock()
+        # Capture software writes files in several steps, so only complete files are read
+        self._coalescer = FileEventCoalescer(self.receiveAll, quietPeriod=quietPeriod)
+        self._watches: dict[str, ObservedWatch] = {}
         self._fileObserver = wdo.Observer()
-        self._fileObserver.schedule(self, directory, recursive=True)
         self._fileObserver.start()
-    
+        if directory is not None:
+            self.watch(directory)
+
+    @property
+    def watchedDirectories(self) -> list[str]:
+        with self._lock:
+            return list(self._watches.keys())
+
+    def watch(self, directory: str):
+        """
+        Starts observing `directory` and its subdirectories.
+        """
+        with self._lock:
+            if directory in self._watches:
+                return
+            self._watches[directory] = self._fileObserver.schedule(self, directory, recursive=True)
+
+    def unwatch(self, directory: str):
+        """
+        Stops observing `directory`.
+        """
+        with self._lock:
+            watch = self._watches.pop(directory, None)
+        if watch is not None:
+            self._fileObserver.unschedule(watch)
+
+    # Event handlers run on the watchdog thread and only hand paths to the coalescer
+
     def on_created(self, event):
-        if not event.is_directory and event.src_path.lower().endswith('.fits'):
-            self.receive(event.src_path)
-    
-    def receive(self, source: str):
+        if not event.is_directory:
+            self._coalescer.touch(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._coalescer.touch(event.src_path)
+
+    def on_closed(self, event):
+        if not event.is_directory:
+            self._coalescer.touch(event.src_path, closed=True)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._coalescer.discard(event.src_path)
+            # Files written to a temporary name and renamed when done are complete
+            self._coalescer.touch(event.dest_path, closed=True)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self._coalescer.discard(event.src_path)
+
+    def receiveAll(self, sources: list[tuple[str, float]]):
         """
-        Receives a new FITS image from the source.
+        Receives a batch of complete images from the source, as (path, time) pairs where time is the
+        `time.perf_counter()` at which the file was last written.
         """
         with self._lock:
-            if len(self._observers) == 0:
+            if len(self._observers) == 0 and len(self._batchObservers) == 0:
                 return
-            if source.lower().endswith('.xisf'):
-                self._latest = XISFImage(source)
-            else:
-                self._latest = FITSImage(source)
-            for observer in self._observers:
+            observers = list(self._observers)
+            batchObservers = list(self._batchObservers)
+        images = []
+        for source, writtenAt in sources:
+            try:
+                images.append((self._read(source), writtenAt))
+            except Exception as e:
+                print(f"Error reading file {source}: {e}")
+        if len(images) == 0:
+            return
+        with self._lock:
+            self._latest = images[-1][0]
+        for observer in batchObservers:
+            try:
+                observer(images)
+            except Exception as e:
+                print(f"Error in observer callback: {e}")
+        for image, _ in images:
+            for observer in observers:
                 try:
-                    observer(self._latest)
+                    observer(image)
                 except Exception as e:
                     print(f"Error in observer callback: {e}")
-    
+
+    def receive(self, source: str):
+        """
+        Receives a new FITS image from the source.
+        """
+        self.receiveAll([(source, time.perf_counter())])
+
+    def _read(self, source: str) -> Image:
+        if source.lower().endswith('.xisf'):
+            return XISFImage(source)
+        return FITSImage(source)
+
     def observe(self, callback: Callable[[Image], None], observeInitial: bool = True):
         """
         Observes the latest FITS image.
@@ -46,9 +127,18 @@ class DataStream(wde.FileSystemEventHandler):
                 callback(self._latest)
             self._observers.append(callback)
 
+    def observeBatch(self, callback: Callable[[list[tuple[Image, float]]], None]):
+        """
+        Observes batches of new images, together with the `time.perf_counter()` at which each
+        file was last written.
+        """
+        with self._lock:
+            self._batchObservers.append(callback)
+
     def stop(self):
         """
         Stops the file observer.
         """
         self._fileObserver.stop()
         self._fileObserver.join()
+        self._coalescer.stop()
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+IMAGE_EXTENSIONS = ('.fit', '.fits', '.xisf')
+
+class _PendingFile:
+    __slots__ = ('due', 'signature', 'closed', 'lastEvent')
+
+    def __init__(self, due: float):
+        self.due = due
+        self.signature: tuple | None = None
+        self.closed = False
+        self.lastEvent = time.perf_counter()
+
+class FileEventCoalescer:
+    """
+    Turns bursts of file system events into batches of completed image files.
+
+    Events only record the path, so they return immediately on the watchdog thread. A file is
+    complete once its size and mtime stayed the same for `quietPeriod` seconds, or, after the
+    writer closed it, once it could be checked. Any number of created, modified, moved and closed
+    events for a file result in a single hand off. Completed files are passed to `onReady` in
+    batches of up to `maxBatch`, on a pool of `maxWorkers` threads, as (path, time) pairs where
+    time is the `time.perf_counter()` of the file's last event, usually when it was closed.
+    """
+    def __init__(self, onReady: Callable[[list[tuple[str, float]]], None], quietPeriod: float = 1.0, maxBatch: int = 64, maxWorkers: int = 2):
+        self._onReady = onReady
+        self.quietPeriod = quietPeriod
+        self.maxBatch = maxBatch
+        self._pending: dict[str, _PendingFile] = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._executor = ThreadPoolExecutor(thread_name_prefix="FileEventCoalescer", max_workers=maxWorkers)
+        self._thread = threading.Thread(target=self._run, name="FileEventCoalescer", daemon=True)
+        self._thread.start()
+
+    def touch(self, path: str, closed: bool = False):
+        """
+        Notes that `path` changed. With `closed`, the writer is done with it.
+        """
+        if not path.lower().endswith(IMAGE_EXTENSIONS):
+            return
+        with self._condition:
+            pending = self._pending.get(path)
+            if pending is None:
+                pending = self._pending[path] = _PendingFile(time.monotonic())
+            elif closed:
+                pending.due = time.monotonic()
+            else:
+                pending.due = time.monotonic() + self.quietPeriod
+            pending.closed = closed
+            pending.lastEvent = time.perf_counter()
+            self._condition.notify()
+
+    def discard(self, path: str):
+        """
+        Forgets about `path`, e.g. because it was deleted or moved away.
+        """
+        with self._condition:
+            self._pending.pop(path, None)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    now = time.monotonic()
+                    due = [path for path, pending in self._pending.items() if pending.due <= now]
+                    if len(due) > 0:
+                        break
+                    timeout = min((pending.due for pending in self._pending.values()), default=now + 3600) - now
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                checks = [(path, self._pending[path]) for path in due]
+
+            # Stat outside the lock, so events are never held up by slow storage
+            ready = []
+            for path, pending in checks:
+                try:
+                    stat = os.stat(path)
+                    signature = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    signature = None
+                with self._condition:
+                    if self._pending.get(path) is not pending or pending.due > time.monotonic():
+                        # Another event arrived in the meantime
+                        continue
+                    if signature is None:
+                        del self._pending[path]
+                    elif signature == pending.signature or (pending.closed and signature[0] > 0):
+                        del self._pending[path]
+                        ready.append((path, pending.lastEvent))
+                    else:
+                        pending.signature = signature
+                        pending.due = time.monotonic() + self.quietPeriod
+
+            for i in range(0, len(ready), self.maxBatch):
+                self._executor.submit(self._dispatch, ready[i:i + self.maxBatch])
+
+    def _dispatch(self, batch: list[tuple[str, float]]):
+        try:
+            self._onReady(batch)
+        except Exception as e:
+            print(f"Error handling files {[path for path, _ in batch]}: {e}")
@@ -1,5 +1,7 @@
 import asyncio
+from queue import Queue
 from threading import Thread
+from typing import Callable
 from .AppDB import AppDB
 from .DataStream import DataStream
 from ekosuite.plugins.model.project.ProjectDB import ProjectDB
@@ -11,37 +13,95 @@ class FileSystemImageChangeListener:
     def listen(self, image):
         self._listen(image)
 
+class FileSystemImageBatchListener:
+    """
+    Receives new images in batches, each with the `time.perf_counter()` at which its file was last written.
+    """
+    def __init__(self, listen):
+        self._listen = listen
+
+    def listen(self, images):
+        self._listen(images)
+
 class FileSystemObserver:
-    def __init__(self, db: AppDB, listeners: set[FileSystemImageChangeListener] = set()):
+    """
+    Watches the selected folders for new images and scouts each folder once it is selected.
+    `onScouted` is called with the ids of the frames a scout wrote, after every chunk it committed,
+    on the scout thread.
+    """
+    def __init__(self, db: AppDB, listeners: set[FileSystemImageChangeListener] = set(), onScouted: Callable[[list[int]], None] | None = None):
         self._db = db
-        self._folderObservers = dict[str: DataStream]()
-        self._listeners = listeners
+        self._onScouted = onScouted
+        self._listeners = set(listeners)
+        self._batchListeners = set[FileSystemImageBatchListener]()
         self._projectDB = ProjectDB(self._db)
-        self._activeThreads = dict[str: Thread]()
+        # One observer and one batching dispatcher for all selected folders
+        self._dataStream = DataStream()
+        self._dataStream.observe(lambda image: self.listen(image), observeInitial=True)
+        self._dataStream.observeBatch(lambda images: self.listenBatch(images))
+        # Folders are scouted one after another on a single thread
+        self._scoutQueue = Queue()
+        self._scoutThread = Thread(target=self._scoutWorker, name="FolderScout", daemon=True)
+        self._scoutThread.start()
         self.setupObservers()
     
     def setupObservers(self):
-        for folder in self._projectDB.selectedFolders:
-            if self._folderObservers.get(folder) is None:
-                self._folderObservers[folder] = DataStream(directory=folder)
-                self._folderObservers[folder].observe(lambda image: self.listen(image), observeInitial=True)
-                def run_scout():
-                    asyncio.run(self._projectDB.scout(folder, progress=lambda p: print(p)))
-
-                scout_thread = Thread(target=run_scout)
-                scout_thread.start()
-                self._activeThreads[folder] = scout_thread
-        for folder in self._folderObservers.keys():
-            if folder not in self._projectDB.selectedFolders:
-                self._folderObservers[folder] = None
-                self._activeThreads[folder].join()
+        selectedFolders = self._projectDB.selectedFolders
+        watchedFolders = self._dataStream.watchedDirectories
+        for folder in selectedFolders:
+            if folder not in watchedFolders:
+                try:
+                    self._dataStream.watch(folder)
+                except OSError as e:
+                    print(f"Error observing folder {folder}: {e}")
+                    continue
+                self._scoutQueue.put(folder)
+        for folder in watchedFolders:
+            if folder not in selectedFolders:
+                self._dataStream.unwatch(folder)
+
+    def _scoutWorker(self):
+        loop = asyncio.new_event_loop()
+        while True:
+            folder = self._scoutQueue.get()
+            if folder is None:  # Sentinel to stop the thread
+                break
+            if folder not in self._dataStream.watchedDirectories:
+                # Deselected while waiting for its turn
+                continue
+            try:
+                # Each folder is scouted once when it is selected or the app starts, and watched afterwards.
+                # Verifying catches files that were rewritten in place while nobody watched, which leaves
+                # their directory unchanged.
+                loop.run_until_complete(self._projectDB.scout(folder, progress=lambda p: print(p), verify=True, onInserted=self._onScouted))
+            except Exception as e:
+                print(f"Error scouting folder {folder}: {e}")
+        loop.close()
+
+    def stop(self):
+        """
+        Stops observing all folders once the running scout is done.
+        """
+        self._scoutQueue.put(None)
+        self._scoutThread.join()
+        self._dataStream.stop()
     
     def listen(self, image):
         for listener in self._listeners:
             listener.listen(image)
     
+    def listenBatch(self, images):
+        for listener in self._batchListeners:
+            listener.listen(images)
+
     def addListener(self, listener: FileSystemImageChangeListener):
         self._listeners.add(listener)
     
     def removeListener(self, listener: FileSystemImageChangeListener):
-        self._listeners.remove(listener)
\ No newline at end of file
+        self._listeners.remove(listener)
+
+    def addBatchListener(self, listener: FileSystemImageBatchListener):
+        self._batchListeners.add(listener)
+
+    def removeBatchListener(self, listener: FileSystemImageBatchListener):
+        self._batchListeners.remove(listener)
@@ -0,0 +1,35 @@
+from typing import Callable, Sequence
+from ekosuite.app.AppDB import AppDB
+from ekosuite.plugins.model.images.ImageDelta import ImageDelta
+
+class ImageChanges:
+    """
+    Tells listeners which images were added to or changed in the DB. Writers `publish` the ids of
+    the frames they committed, and listeners receive an `ImageDelta` of them on the writer's thread.
+    """
+    def __init__(self, db: AppDB):
+        self._db = db
+        self._listeners: list[Callable[[ImageDelta], None]] = []
+
+    def subscribe(self, listener: Callable[[ImageDelta], None]):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[ImageDelta], None]):
+        self._listeners.remove(listener)
+
+    def publish(self, imageIds: Sequence[int], backfill: bool = False):
+        """
+        Publishes the committed frames `imageIds`. With `backfill`, they are historical frames,
+        e.g. found by a scout, otherwise they were just taken.
+        """
+        if len(imageIds) == 0:
+            return
+        delta = ImageDelta.of(self._db, imageIds, backfill)
+        if isinstance(delta, Exception):
+            print(f"Error reading {len(imageIds)} changed images: {delta}")
+            return
+        for listener in list(self._listeners):
+            try:
+                listener(delta)
+            except Exception as e:
+                print(f"Error handling {len(delta)} changed images: {e}")
@@ -0,0 +1,81 @@
+import threading
+import time
+from queue import Queue, Empty
+from typing import Callable
+from ekosuite.app.AppDB import QueueMetrics
+from ekosuite.plugins.model.images.Image import Image
+from ekosuite.plugins.model.project.ProjectDB import ProjectDB
+
+class IngestService:
+    """
+    Long-lived writer for images arriving from watched folders.
+
+    Images are collected into micro batches of up to `maxBatch` images, or of whatever arrived
+    within `maxDelay` seconds of the first one, and each batch is inserted with one transaction.
+    `latency` tracks the time from a file's last write to its row being committed. `onIngested` is
+    called with every committed batch and the ids of the frames it wrote, on the service's thread.
+    """
+    def __init__(self, projectDB: ProjectDB, maxBatch: int = 64, maxDelay: float = 0.5, onIngested: Callable[[list[Image], list[int]], None] | None = None):
+        self._projectDB = projectDB
+        self._onIngested = onIngested
+        self.maxBatch = maxBatch
+        self.maxDelay = maxDelay
+        self.latency = QueueMetrics()
+        self._queue = Queue()
+        self._thread = threading.Thread(target=self._worker, name="IngestService", daemon=True)
+        self._thread.start()
+
+    def submit(self, image: Image, writtenAt: float | None = None):
+        """
+        Queues `image` for insertion. `writtenAt` is the `time.perf_counter()` at which its file
+        was last written, now if omitted.
+        """
+        self._queue.put((image, time.perf_counter() if writtenAt is None else writtenAt))
+
+    def submitAll(self, images: list[tuple[Image, float]]):
+        for image, writtenAt in images:
+            self.submit(image, writtenAt)
+
+    def stop(self):
+        """
+        Inserts everything submitted so far and stops the worker.
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+    def _worker(self):
+        stopped = False
+        while not stopped:
+            item = self._queue.get()
+            if item is None:  # Sentinel to stop the thread
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.maxDelay
+            while len(batch) < self.maxBatch:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.perf_counter()))
+                except Empty:
+                    break
+                if item is None:
+                    stopped = True
+                    break
+                batch.append(item)
+            self._ingest(batch)
+
+    def _ingest(self, batch: list[tuple[Image, float]]):
+        images = [image for image, _ in batch]
+        try:
+            imageIds = self._projectDB.insertImages(images)
+        except Exception as e:
+            print(f"Error inserting {len(batch)} images: {e}")
+            return
+        committed = time.perf_counter()
+        for _, writtenAt in batch:
+            self.latency.record(committed - writtenAt, self._queue.qsize())
+        latency = self.latency.snapshot()
+        print(f"Inserted {len(batch)} new images, average latency {latency['avg_wait']:.3f}s, max {latency['max_wait']:.3f}s")
+        if self._onIngested is not None:
+            try:
+                self._onIngested(images, imageIds)
+            except Exception as e:
+                print(f"Error handling {len(images)} inserted images: {e}")
@@ -0,0 +1,85 @@
+BEGIN;
+
+-- Night session of every fits file, kept up to date by the triggers below.
+-- This replaces the night_session_fits_files view, which had to compare every fits file
+-- with every night session because no index can serve its date predicate.
+CREATE TABLE IF NOT EXISTS fits_file_night_sessions (
+    fits_file_id INTEGER PRIMARY KEY,
+    night_session_id INTEGER NOT NULL,
+    FOREIGN KEY (fits_file_id) REFERENCES fits_files(id) ON DELETE CASCADE,
+    FOREIGN KEY (night_session_id) REFERENCES night_sessions(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_fits_file_night_sessions_night_session_id ON fits_file_night_sessions(night_session_id);
+
+INSERT OR IGNORE INTO fits_file_night_sessions (fits_file_id, night_session_id)
+SELECT fits_file_id, night_session_id FROM night_session_fits_files;
+
+-- VIEWS
+
+-- Keep the view so existing queries read from the indexed table.
+DROP VIEW IF EXISTS night_session_fits_files;
+CREATE VIEW night_session_fits_files AS
+SELECT
+    night_session_id,
+    fits_file_id
+FROM
+    fits_file_night_sessions;
+
+-- TRIGGERS
+
+-- When a new fits file is inserted, link it to the night session it belongs to.
+-- If the session does not exist yet, insert_night_session creates it and link_night_session_files
+-- links this file.
+CREATE TRIGGER IF NOT EXISTS link_night_session_on_insert
+AFTER INSERT ON fits_files
+WHEN NEW.timezone_offset IS NOT NULL
+BEGIN
+    INSERT OR REPLACE INTO fits_file_night_sessions (fits_file_id, night_session_id)
+    SELECT NEW.id, ns.id
+    FROM night_sessions ns
+    WHERE ns.start_day =
+        CASE WHEN TIME(DATETIME(NEW.create_time, (NEW.timezone_offset || ' hours'))) > '12:00:00' THEN
+            DATE(DATETIME(NEW.create_time, (NEW.timezone_offset || ' hours')))
+        ELSE
+            DATE(DATETIME(NEW.create_time, (NEW.timezone_offset || ' hours')), '-1 day')
+        END;
+END;
+
+-- When the time or timezone of a fits file changes (e.g. timezone backfill of calibration frames),
+-- move it to the matching night session. Like the view this replaces, this does not create sessions.
+CREATE TRIGGER IF NOT EXISTS link_night_session_on_update
+AFTER UPDATE OF create_time, timezone_offset ON fits_files
+BEGIN
+    DELETE FROM fits_file_night_sessions WHERE fits_file_id = NEW.id;
+    INSERT INTO fits_file_night_sessions (fits_file_id, night_session_id)
+    SELECT NEW.id, ns.id
+    FROM night_sessions ns
+    WHERE NEW.timezone_offset IS NOT NULL
+    AND ns.start_day =
+        CASE WHEN TIME(DATETIME(NEW.create_time, (NEW.timezone_offset || ' hours'))) > '12:00:00' THEN
+            DATE(DATETIME(NEW.create_time, (NEW.timezone_offset || ' hours')))
+        ELSE
+            DATE(DATETIME(NEW.create_time, (NEW.timezone_offset || ' hours')), '-1 day')
+        END;
+END;
+
+-- When a new night session is created, link all fits files that fall into it.
+-- Timezone offsets range from -12 to +14 hours, so candidates are found with a range scan on create_time.
+CREATE TRIGGER IF NOT EXISTS link_night_session_files
+AFTER INSERT ON night_sessions
+BEGIN
+    INSERT OR IGNORE INTO fits_file_night_sessions (fits_file_id, night_session_id)
+    SELECT ff.id, NEW.id
+    FROM fits_files ff
+    WHERE ff.create_time BETWEEN DATETIME(NEW.start_day, '-1 day') AND DATETIME(NEW.start_day, '+3 days')
+    AND ff.timezone_offset IS NOT NULL
+    AND NEW.start_day =
+        CASE WHEN TIME(DATETIME(ff.create_time, (ff.timezone_offset || ' hours'))) > '12:00:00' THEN
+            DATE(DATETIME(ff.create_time, (ff.timezone_offset || ' hours')))
+        ELSE
+            DATE(DATETIME(ff.create_time, (ff.timezone_offset || ' hours')), '-1 day')
+        END;
+END;
+
+COMMIT;
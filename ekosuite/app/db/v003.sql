@@ -0,0 +1,2 @@
+-- Serves the (instrument, create_time) window lookup of the calibration frame timezone backfill.
+CREATE INDEX IF NOT EXISTS idx_fits_files_instrument_create_time ON fits_files(instrument, create_time);
@@ -0,0 +1,28 @@
+BEGIN;
+
+-- What the last scout saw on disk, so rescans only look at directories and files that changed.
+
+-- Every image file a scout has looked at, whether it could be read or not.
+-- A file whose size, mtime or inode differs from its entry is read again.
+CREATE TABLE IF NOT EXISTS file_manifest (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_file_manifest_directory ON file_manifest(directory);
+
+-- Every directory a scout has listed. Adding, removing or renaming an entry changes the mtime of
+-- its directory, so a directory with an unchanged mtime does not need to be listed again.
+-- A NULL mtime_ns means the directory changed while it was listed and has to be listed again.
+CREATE TABLE IF NOT EXISTS directory_manifest (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_directory_manifest_parent ON directory_manifest(parent);
+
+COMMIT;
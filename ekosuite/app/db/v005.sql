@@ -0,0 +1,18 @@
+BEGIN;
+
+-- Calibration products (master flats, bias subtracted darks) kept on disk between runs.
+
+-- One row per product. `key` is derived from the ids, sizes and mtimes of the frames it was built
+-- from, so a product whose frames changed no longer matches and is rebuilt. `last_used` orders
+-- the products for eviction once the cache exceeds its disk budget.
+CREATE TABLE IF NOT EXISTS calibration_cache (
+    name TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_calibration_cache_last_used ON calibration_cache(last_used);
+
+COMMIT;
@@ -0,0 +1,7 @@
+BEGIN;
+
+-- One analysis per image, so analyzing an image again replaces its measures.
+DELETE FROM image_analysis WHERE id NOT IN (SELECT MAX(id) FROM image_analysis GROUP BY image_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_image_analysis_image_id ON image_analysis(image_id);
+
+COMMIT;
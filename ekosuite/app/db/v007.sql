@@ -0,0 +1,10 @@
+BEGIN;
+
+-- Background noise per unbinned pixel, and whether the measures are a quick look on binned
+-- pixels that a full analysis should replace.
+ALTER TABLE image_analysis ADD COLUMN noise REAL;
+ALTER TABLE image_analysis ADD COLUMN approximate INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_image_analysis_approximate ON image_analysis(approximate) WHERE approximate = 1;
+
+COMMIT;
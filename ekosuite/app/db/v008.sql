@@ -0,0 +1,2 @@
+-- Serves the telescope selections of ImageFilter, which match (telescope, focal_length) pairs.
+CREATE INDEX IF NOT EXISTS idx_fits_files_telescope_focal_length ON fits_files(telescope, focal_length);
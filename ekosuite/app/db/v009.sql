@@ -0,0 +1,118 @@
+BEGIN;
+
+-- Number of fits files per image type and value of every ImageFilter dimension, so the filter tree
+-- can list its options with counts without scanning fits_files. Kept up to date by the triggers
+-- below. Values that no file has any more stay with a count of 0.
+-- Facets are named after ImageFilter's filter types. Telescopes are counted per focal length,
+-- which is in detail.
+CREATE TABLE IF NOT EXISTS facet_counts (
+    facet TEXT NOT NULL,
+    image_type TEXT NOT NULL,
+    value,
+    detail REAL,
+    count INTEGER NOT NULL
+);
+
+-- Unique per value including NULL, which the conflict targets of the counting upserts name.
+-- A blob never equals a text or real value.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_facet_counts_value ON facet_counts(facet, image_type, IFNULL(value, X''), IFNULL(detail, X''));
+
+-- The image type each night session link was counted with, so the link is uncounted with the
+-- same type even when the file's type changed or the file is gone.
+ALTER TABLE fits_file_night_sessions ADD COLUMN image_type TEXT;
+
+UPDATE fits_file_night_sessions
+SET image_type = (SELECT image_type_generic FROM fits_files WHERE id = fits_file_id);
+
+INSERT INTO facet_counts (facet, image_type, value, detail, count)
+SELECT 'filter', image_type_generic, filter, NULL, COUNT(*) FROM fits_files GROUP BY 2, 3
+UNION ALL
+SELECT 'camera', image_type_generic, instrument, NULL, COUNT(*) FROM fits_files GROUP BY 2, 3
+UNION ALL
+SELECT 'target', image_type_generic, object, NULL, COUNT(*) FROM fits_files GROUP BY 2, 3
+UNION ALL
+SELECT 'telescope', image_type_generic, telescope, focal_length, COUNT(*) FROM fits_files GROUP BY 2, 3, 4
+UNION ALL
+SELECT 'night', ffns.image_type, ns.start_day, NULL, COUNT(*)
+FROM fits_file_night_sessions AS ffns JOIN night_sessions AS ns ON ns.id = ffns.night_session_id
+GROUP BY 2, 3;
+
+-- TRIGGERS
+
+CREATE TRIGGER IF NOT EXISTS count_facets_on_insert
+AFTER INSERT ON fits_files
+BEGIN
+    INSERT INTO facet_counts (facet, image_type, value, detail, count)
+    VALUES
+        ('filter', NEW.image_type_generic, NEW.filter, NULL, 1),
+        ('camera', NEW.image_type_generic, NEW.instrument, NULL, 1),
+        ('target', NEW.image_type_generic, NEW.object, NULL, 1),
+        ('telescope', NEW.image_type_generic, NEW.telescope, NEW.focal_length, 1)
+    ON CONFLICT (facet, image_type, IFNULL(value, X''), IFNULL(detail, X'')) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS count_facets_on_update
+AFTER UPDATE OF filter, instrument, object, telescope, focal_length, imagetype ON fits_files
+BEGIN
+    INSERT INTO facet_counts (facet, image_type, value, detail, count)
+    VALUES
+        ('filter', OLD.image_type_generic, OLD.filter, NULL, -1),
+        ('camera', OLD.image_type_generic, OLD.instrument, NULL, -1),
+        ('target', OLD.image_type_generic, OLD.object, NULL, -1),
+        ('telescope', OLD.image_type_generic, OLD.telescope, OLD.focal_length, -1),
+        ('filter', NEW.image_type_generic, NEW.filter, NULL, 1),
+        ('camera', NEW.image_type_generic, NEW.instrument, NULL, 1),
+        ('target', NEW.image_type_generic, NEW.object, NULL, 1),
+        ('telescope', NEW.image_type_generic, NEW.telescope, NEW.focal_length, 1)
+    ON CONFLICT (facet, image_type, IFNULL(value, X''), IFNULL(detail, X'')) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS count_facets_on_delete
+AFTER DELETE ON fits_files
+BEGIN
+    INSERT INTO facet_counts (facet, image_type, value, detail, count)
+    VALUES
+        ('filter', OLD.image_type_generic, OLD.filter, NULL, -1),
+        ('camera', OLD.image_type_generic, OLD.instrument, NULL, -1),
+        ('target', OLD.image_type_generic, OLD.object, NULL, -1),
+        ('telescope', OLD.image_type_generic, OLD.telescope, OLD.focal_length, -1)
+    ON CONFLICT (facet, image_type, IFNULL(value, X''), IFNULL(detail, X'')) DO UPDATE SET count = count + excluded.count;
+END;
+
+-- Night sessions are counted through their links, which the night session triggers insert and
+-- delete. A new link takes the type of its file, and the update below counts it.
+CREATE TRIGGER IF NOT EXISTS type_night_session_link
+AFTER INSERT ON fits_file_night_sessions
+BEGIN
+    UPDATE fits_file_night_sessions
+    SET image_type = (SELECT image_type_generic FROM fits_files WHERE id = NEW.fits_file_id)
+    WHERE fits_file_id = NEW.fits_file_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS retype_night_session_link
+AFTER UPDATE OF imagetype ON fits_files
+WHEN OLD.image_type_generic IS NOT NEW.image_type_generic
+BEGIN
+    UPDATE fits_file_night_sessions SET image_type = NEW.image_type_generic WHERE fits_file_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS count_night_session_facet_on_update
+AFTER UPDATE OF image_type ON fits_file_night_sessions
+BEGIN
+    INSERT INTO facet_counts (facet, image_type, value, detail, count)
+    SELECT 'night', OLD.image_type, start_day, NULL, -1 FROM night_sessions WHERE id = OLD.night_session_id AND OLD.image_type IS NOT NULL
+    UNION ALL
+    SELECT 'night', NEW.image_type, start_day, NULL, 1 FROM night_sessions WHERE id = NEW.night_session_id AND NEW.image_type IS NOT NULL
+    ON CONFLICT (facet, image_type, IFNULL(value, X''), IFNULL(detail, X'')) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS count_night_session_facet_on_delete
+AFTER DELETE ON fits_file_night_sessions
+WHEN OLD.image_type IS NOT NULL
+BEGIN
+    INSERT INTO facet_counts (facet, image_type, value, detail, count)
+    SELECT 'night', OLD.image_type, start_day, NULL, -1 FROM night_sessions WHERE id = OLD.night_session_id
+    ON CONFLICT (facet, image_type, IFNULL(value, X''), IFNULL(detail, X'')) DO UPDATE SET count = count + excluded.count;
+END;
+
+COMMIT;
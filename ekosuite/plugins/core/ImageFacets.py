@@ -0,0 +1,41 @@
+from typing import Sequence
+
+from ekosuite.app.AppDB import AppDB
+from ekosuite.plugins.core.ImageFilterQuery import FilterType, ImageType
+
+class ImageFacets:
+    """
+    Options of the image filter dimensions with their number of frames, read from the small
+    `facet_counts` table that triggers keep up to date as files are inserted, changed or removed.
+    Listing them never scans `fits_files`.
+    """
+    def __init__(self, db: AppDB):
+        self._db = db
+
+    def options(self, filterType: FilterType, imageTypes: Sequence[ImageType | str]) -> list[tuple[str | None, object, int]] | Exception:
+        """
+        Returns the `(label, value, count)` of every option of `filterType` that frames of
+        `imageTypes` have, ordered by label. `value` is what `ImageFilterQuery` selects the option
+        with, and `count` how many frames of these types it selects.
+        """
+        imageTypes = [imageType.value if isinstance(imageType, ImageType) else imageType for imageType in imageTypes]
+        if len(imageTypes) == 0:
+            return []
+        # Only objects that became targets are offered, like the targets table lists them
+        targets = "AND value IN (SELECT object FROM targets)" if filterType == FilterType.TARGET else ""
+        # Same label as the previous SELECT DISTINCT over fits_files gave, which was NULL for
+        # telescopes without name or focal length
+        label = "IFNULL(value, 'Unknown telescope') || IFNULL(' ' || detail || 'mm', '')" if filterType == FilterType.TELESCOPE else "value"
+        rows = self._db.fetchall(f"""
+            SELECT {label}, value, detail, SUM(count)
+            FROM facet_counts
+            WHERE facet = ? AND image_type IN ({', '.join('?' * len(imageTypes))}) {targets}
+            GROUP BY value, detail
+            HAVING SUM(count) > 0
+            ORDER BY 1 ASC
+        """, (filterType.value, *imageTypes))
+        if isinstance(rows, Exception):
+            return rows
+        if filterType == FilterType.TELESCOPE:
+            return [(label, (value, detail), count) for label, value, detail, count in rows]
+        return [(label, value, count) for label, value, _, count in rows]
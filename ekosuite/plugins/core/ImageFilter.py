@@ -2,30 +2,20 @@ from typing import Callable, List, Sequence, Set
 from PyQt5.QtWidgets import QWidget
 
 from ekosuite.app.AppDB import AppDB
-from enum import Enum
 from PyQt5.QtWidgets import QComboBox, QVBoxLayout, QLabel
 
+from ekosuite.plugins.core.ImageFacets import ImageFacets
+from ekosuite.plugins.core.ImageFilterQuery import FilterType, ImageFilterQuery, ImageType
 from ekosuite.plugins.model.images.DBImage import DBImage
 from ekosuite.plugins.model.images.Image import Image
+from ekosuite.plugins.model.images.ImageRecord import ImageRecordSession
 from PyQt5.QtWidgets import QTreeWidget, QTreeWidgetItem, QAbstractItemView
-from PyQt5.QtCore import QModelIndex
-
-class FilterType(Enum):
-    NIGHT = "night"
-    TARGET = "target"
-    TELESCOPE = "telescope"
-    CAMERA = "camera"
-    FILTER = "filter"
-
-class ImageType(Enum):
-    LIGHT = 'LIGHT'
-    DARK = 'DARK'
-    BIAS = 'BIAS'
-    FLAT = 'FLAT'
-    MASTER_DARK = 'MASTER DARK'
-    MASTER_BIAS = 'MASTER BIAS'
+from PyQt5.QtCore import QModelIndex, Qt
 
 class ImageFilter(QWidget):
+    # Above this many added images, e.g. after a folder was scouted, selecting everything again is
+    # cheaper than matching them one by one
+    maxRefreshIds = 1000
       
     def __init__(self, db: AppDB, 
                  onFilterChange: Callable[[Sequence[Image]], None], 
@@ -36,6 +26,9 @@ class ImageFilter(QWidget):
         self._allowedFilters = allowedFilters
         self._allowedImageTypes = allowedImageTypes
         self._onFilterChange = onFilterChange
+        self._session = ImageRecordSession(db)
+        self._facets = ImageFacets(db)
+        self._filterItems: dict[FilterType, QTreeWidgetItem] = {}
         self.makeDropdownMenu()
         self._selectedImageIds: list[int] = list()
     
@@ -43,10 +36,11 @@ class ImageFilter(QWidget):
         layout = QVBoxLayout(self)
 
         tree_widget = QTreeWidget(self)
-        tree_widget.setHeaderLabels(["Filter Type", "Options"])
+        tree_widget.setHeaderLabels(["Filter Type", "Options", "Frames"])
         tree_widget.setSelectionMode(QAbstractItemView.MultiSelection)
         tree_widget.setRootIsDecorated(True)
         tree_widget.setItemsExpandable(True)
+        self._tree = tree_widget
 
         def disableTopLevelSelection(item: QTreeWidgetItem, column: int):
             if not item.parent():
@@ -59,10 +53,8 @@ class ImageFilter(QWidget):
         for filter_type in self._allowedFilters:
             parent_item = QTreeWidgetItem(tree_widget)
             parent_item.setText(0, self.dropdownNameFor(filter_type))
-
-            for target in self.dropdownTargetsFor(filter_type):
-                child_item = QTreeWidgetItem(parent_item)
-                child_item.setText(1, target[0])
+            self._filterItems[filter_type] = parent_item
+            self._addOptions(parent_item, filter_type, set())
 
         layout.addWidget(tree_widget)
 
@@ -72,72 +64,83 @@ class ImageFilter(QWidget):
         self.setLayout(layout)
 
         self.selectionChanged([])
+
+    def _addOptions(self, parent_item: QTreeWidgetItem, filterType: FilterType, selected: set):
+        for label, value, count in self.dropdownTargetsFor(filterType):
+            child_item = QTreeWidgetItem(parent_item)
+            child_item.setText(1, label)
+            child_item.setText(2, str(count))
+            # The value the query matches, which for telescopes is not the label
+            child_item.setData(1, Qt.UserRole, value)
+            child_item.setSelected(value in selected)
+
+    def refresh(self, imageIds: Sequence[int] | None = None) -> bool:
+        """
+        Updates the options and their counts after images were added or changed, keeping the selection.
+        Without `imageIds` the matching images are selected again. With the ids of the added or
+        changed images, only those are matched again and reloaded, unless there are many. Returns
+        whether the selection changed, in which case `onFilterChange` was called.
+        """
+        for filterType, parent_item in self._filterItems.items():
+            # Items no longer report their selection once taken out of the tree
+            selected = set(parent_item.child(i).data(1, Qt.UserRole) for i in range(parent_item.childCount()) if parent_item.child(i).isSelected())
+            parent_item.takeChildren()
+            self._addOptions(parent_item, filterType, selected)
+        if imageIds is None or len(imageIds) > self.maxRefreshIds:
+            self.selectionChanged(self._tree.selectedItems())
+            return True
+
+        ids = ImageFilterQuery(self._allowedImageTypes, self._selections, within=imageIds).imageIds(self._db)
+        if isinstance(ids, Exception):
+            print(f"Error filtering images: {ids}")
+            return False
+        # Changed images are read again, and dropped if they no longer match
+        within = set(imageIds)
+        matching = set(ids)
+        self._session.invalidate(within)
+        kept = [image if image.id not in within else DBImage(image.id, self._db, self._session)
+                for image in self.selectedImages if image.id not in within or image.id in matching]
+        keptIds = set(image.id for image in kept)
+        added = [id for id in ids if id not in keptIds]
+        if len(added) == 0 and not any(image.id in within for image in self.selectedImages):
+            return False
+        self.selectedImages = kept + DBImage.load(added, self._db, self._session)
+        self.itemCountLabel.setText(f'{len(self.selectedImages)} images selected')
+        if self._onFilterChange:
+            self._onFilterChange(self.selectedImages)
+        return True
     
     def dropdownNameFor(self, filterType: FilterType):
         return filterType.value.capitalize()
     
-    def dropdownTargetsFor(self, filterType: FilterType) -> List[str]:
-        match filterType:
-            case FilterType.NIGHT:
-                return self._db.fetchall("SELECT DISTINCT start_day FROM night_sessions ORDER BY 1 ASC")
-            case FilterType.TARGET:
-                return self._db.fetchall("SELECT DISTINCT object FROM targets ORDER BY 1 ASC")
-            case FilterType.TELESCOPE:
-                return self._db.fetchall("SELECT DISTINCT telescope || ' ' || focal_length || 'mm' FROM fits_files ORDER BY 1 ASC")
-            case FilterType.CAMERA:
-                return self._db.fetchall("SELECT DISTINCT instrument FROM fits_files ORDER BY 1 ASC")
-            case FilterType.FILTER:
-                return self._db.fetchall("SELECT DISTINCT filter FROM fits_files ORDER BY 1 ASC")
-            case _:
-                return "Unknown Filter"
+    def dropdownTargetsFor(self, filterType: FilterType) -> list[tuple[str | None, object, int]]:
+        """
+        Returns the label, value and number of frames of every option of `filterType`.
+        """
+        options = self._facets.options(filterType, self._allowedImageTypes)
+        if isinstance(options, Exception):
+            print(f"Error reading {filterType.value} options: {options}")
+            return []
+        return options
     
     def selectionChanged(self, items: List[QTreeWidgetItem]):
-        def getFilters(filterType: FilterType, items: List[QTreeWidgetItem]) -> List[QTreeWidgetItem]:
-            return list(filter(
-                lambda item:
-                (
-                    (parent := item.parent()) is not None
-                    and parent.text(0) == self.dropdownNameFor(filterType)
-                ), 
-                items))
-        
-        def getQuery(match_type: str, values: List[QTreeWidgetItem]) -> str:
-            stmts = []
-            for value in values:
-                stmts.append(match_type + " = '" + value.text(1) + "'")
-            return '(' + ' OR '.join(stmts) + ')'
-
-        query_elements = [f"""
-        SELECT ff.id AS id 
-        FROM fits_files AS ff 
-        JOIN night_session_fits_files AS nsff 
-            ON nsff.fits_file_id = ff.id
-        JOIN night_sessions AS ns
-            ON nsff.night_session_id = ns.id
-        WHERE image_type_generic IN {'(' + ','.join([f"'{imageType}'" for imageType in self._allowedImageTypes]) + ')'}
-        """]
-
-        night_filters = getFilters(FilterType.NIGHT, items)
-        if len(night_filters) > 0:
-            query_elements.append(getQuery('ns.start_day', night_filters))
-        
-        filter_filters = getFilters(FilterType.FILTER, items)
-        if len(filter_filters) > 0:
-            query_elements.append(getQuery('ff.filter', filter_filters))
-        
-        target_filters = getFilters(FilterType.TARGET, items)
-        if len(target_filters) > 0:
-            query_elements.append(getQuery('ff.object', target_filters))
-        
-        telescope_filters = getFilters(FilterType.TELESCOPE, items)
-        if len(telescope_filters) > 0:
-            query_elements.append(getQuery("ff.telescope || ' ' || ff.focal_length || 'mm'", telescope_filters))
-        
-        camera_filters = getFilters(FilterType.CAMERA, items)
-        if len(camera_filters) > 0:
-            query_elements.append(getQuery('ff.instrument', camera_filters))
-        
-        self.selectedImages = list(map(lambda val: DBImage(val[0], self._db), self._db.fetchall(' AND '.join(query_elements))))
+        selections: dict[FilterType, list] = {}
+        for item in items:
+            parent = item.parent()
+            if parent is None:
+                continue
+            for filterType in self._allowedFilters:
+                if parent.text(0) == self.dropdownNameFor(filterType):
+                    selections.setdefault(filterType, []).append(item.data(1, Qt.UserRole))
+
+        self._selections = selections
+        ids = ImageFilterQuery(self._allowedImageTypes, selections).imageIds(self._db)
+        if isinstance(ids, Exception):
+            print(f"Error filtering images: {ids}")
+            ids = []
+        # Records are cached per selection, a new selection reads them again
+        self._session = ImageRecordSession(self._db)
+        self.selectedImages = DBImage.load(ids, self._db, self._session)
         self.itemCountLabel.setText(f'{len(self.selectedImages)} images selected')
 
         if self._onFilterChange:
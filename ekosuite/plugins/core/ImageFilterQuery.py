@@ -0,0 +1,137 @@
+from enum import Enum
+from functools import lru_cache
+from typing import Mapping, Sequence
+
+from ekosuite.app.AppDB import AppDB
+
+class FilterType(Enum):
+    NIGHT = "night"
+    TARGET = "target"
+    TELESCOPE = "telescope"
+    CAMERA = "camera"
+    FILTER = "filter"
+
+class ImageType(Enum):
+    LIGHT = 'LIGHT'
+    DARK = 'DARK'
+    BIAS = 'BIAS'
+    FLAT = 'FLAT'
+    MASTER_DARK = 'MASTER DARK'
+    MASTER_BIAS = 'MASTER BIAS'
+
+# Indexed column every filter type matches, see idx_fits_files_*
+_COLUMNS = {
+    FilterType.TARGET: "ff.object",
+    FilterType.CAMERA: "ff.instrument",
+    FilterType.FILTER: "ff.filter",
+}
+
+class ImageFilterQuery:
+    """
+    Ids of the `fits_files` of some image types that match a selection of filter values. Values of
+    one filter type are alternatives, filter types must all match.
+
+    Night values are `night_sessions.start_day`s and telescope values `(telescope, focal_length)`
+    pairs, all other values are the column values themselves, None for NULL.
+
+    Selections are compiled to SQL with bound `IN (?, ...)` lists. The statement only depends on the
+    shape of the selection, which filter types are used and roughly how many values each has, so
+    the compiled text is cached and SQLite's statement cache keeps it prepared.
+
+    With `within`, only these ids are considered, e.g. to check which new images match.
+    """
+    def __init__(self, imageTypes: Sequence[ImageType | str], selections: Mapping[FilterType, Sequence] = {}, within: Sequence[int] | None = None):
+        self.imageTypes = [imageType.value if isinstance(imageType, ImageType) else imageType for imageType in imageTypes]
+        self.selections = {filterType: list(values) for filterType, values in selections.items() if len(values) > 0}
+        self.within = list(within) if within is not None else None
+
+    def compile(self) -> tuple[str, tuple]:
+        """
+        Returns the statement and its parameters.
+        """
+        shape = []
+        params = list(_padded(self.imageTypes))
+        # Filter types in a fixed order, so equal selections share a statement
+        for filterType in FilterType:
+            values = self.selections.get(filterType)
+            if values is None:
+                continue
+            if filterType == FilterType.TELESCOPE:
+                selected = list(dict.fromkeys(tuple(value) for value in values))
+                pairs = _padded([pair for pair in selected if None not in pair])
+                nullPairs = _padded([pair for pair in selected if None in pair])
+                # The telescope list lets the (telescope, focal_length) index search, the pairs
+                # then pick the focal lengths
+                params += [telescope for telescope, _ in pairs]
+                params += [value for pair in pairs for value in pair]
+                params += [value for pair in nullPairs for value in pair]
+                shape.append((filterType, len(pairs), len(nullPairs)))
+            else:
+                hasNull = None in values
+                present = _padded(list(dict.fromkeys(value for value in values if value is not None)))
+                params += present
+                shape.append((filterType, len(present), hasNull))
+        within = None
+        if self.within is not None:
+            within = _padded(list(self.within))
+            params += within
+        return _compile(len(_padded(self.imageTypes)), tuple(shape), None if within is None else len(within)), tuple(params)
+
+    def imageIds(self, db: AppDB) -> list[int] | Exception:
+        query, params = self.compile()
+        rows = db.fetchall(query, params)
+        if isinstance(rows, Exception):
+            return rows
+        return [row[0] for row in rows]
+
+def _padded(values: list) -> list:
+    """
+    Pads `values` to the next power of two by repeating the last one, which bounds the number of
+    distinct statements without changing what an `IN` list matches.
+    """
+    if len(values) == 0:
+        return values
+    size = 1 << (len(values) - 1).bit_length()
+    return values + [values[-1]] * (size - len(values))
+
+def _placeholders(count: int) -> str:
+    return ", ".join("?" * count)
+
+@lru_cache(maxsize=256)
+def _compile(imageTypeCount: int, shape: tuple[tuple[FilterType, int, bool | int], ...], withinCount: int | None = None) -> str:
+    # Every filter type has the number of its values and whether NULL is selected, telescopes the
+    # number of (telescope, focal_length) pairs with a NULL instead
+    predicates = [f"ff.image_type_generic IN ({_placeholders(imageTypeCount)})" if imageTypeCount > 0 else "0"]
+    for filterType, count, hasNull in shape:
+        if filterType == FilterType.NIGHT:
+            # Only night selections read the sessions. As a subquery on the file id, the few files of
+            # the selected nights are found through the session indexes, where a join would let
+            # SQLite start from a much less selective fits_files index.
+            predicates.append(f"""ff.id IN (
+            SELECT ffns.fits_file_id
+            FROM night_sessions AS ns
+            JOIN fits_file_night_sessions AS ffns ON ffns.night_session_id = ns.id
+            WHERE ns.start_day IN ({_placeholders(count)}))""")
+            continue
+        alternatives = []
+        if filterType == FilterType.TELESCOPE:
+            if count > 0:
+                pairs = ", ".join(["(?, ?)"] * count)
+                alternatives.append(f"(ff.telescope IN ({_placeholders(count)}) AND (ff.telescope, ff.focal_length) IN (VALUES {pairs}))")
+            # Row values never equal NULL, pairs with a NULL are compared with IS
+            alternatives += ["(ff.telescope IS ? AND ff.focal_length IS ?)"] * hasNull
+            predicates.append("(" + " OR ".join(alternatives) + ")")
+            continue
+        column = _COLUMNS[filterType]
+        if count > 0:
+            alternatives.append(f"{column} IN ({_placeholders(count)})")
+        if hasNull:
+            alternatives.append(f"{column} IS NULL")
+        predicates.append("(" + " OR ".join(alternatives) + ")")
+    if withinCount is not None:
+        predicates.append(f"ff.id IN ({_placeholders(withinCount)})" if withinCount > 0 else "0")
+    return f"""
+        SELECT ff.id
+        FROM fits_files AS ff
+        WHERE {' AND '.join(predicates)}
+    """
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import TypeVar, Generic
+from typing import TypeVar, Generic, Sequence
 from ekosuite.app.AppDB import AppDB
 from ekosuite.plugins.core.PluginUserInterface import PluginUserInterface
 
@@ -25,10 +25,25 @@ class PluginInterface(ABC, Generic[Input]):
         """Return the user interface for the plugin or `None` if it doesn't apply."""
         return None
 
-    @abstractmethod
     def execute(self, input: Input, db: AppDB):
-        """Execute the plugin's main functionality."""
-        pass
+        """Execute the plugin's main functionality. Plugins that process images implement this or `executeBatch`."""
+        raise NotImplementedError(f"{type(self).__name__} does not execute on images")
+
+    def processesImages(self) -> bool:
+        """
+        Whether new images are handed to `executeBatch`. Plugins that only show them in their view,
+        through `PluginUserInterface.imagesAdded`, return False and are not scheduled.
+        """
+        return True
+
+    def executeBatch(self, inputs: Sequence[Input], db: AppDB, backfill: bool = False):
+        """
+        Execute the plugin for several inputs at once, e.g. all frames of a night, and return the
+        result that is handed to the user interface. `backfill` inputs are historical frames found
+        by a scout, otherwise they were just taken. By default, `execute` runs for every input and
+        the list of its results is returned. Override this method to handle a batch in one pass.
+        """
+        return [self.execute(input, db) for input in inputs]
 
     @abstractmethod
     def terminate(self):
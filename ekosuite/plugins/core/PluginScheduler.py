@@ -0,0 +1,157 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Sequence
+
+from ekosuite.app.AppDB import AppDB
+from ekosuite.plugins.core.PluginInterface import PluginInterface
+
+class _PluginSlot:
+    __slots__ = ('plugin', 'name', 'pending', 'running', 'removed', 'batches', 'images', 'errors', 'totalExecute', 'maxExecute', 'lastExecute', 'totalWait', 'maxWait')
+
+    def __init__(self, plugin: PluginInterface):
+        self.plugin = plugin
+        self.name = type(plugin).name()
+        # (image, time.perf_counter() it was submitted at, backfill)
+        self.pending: list[tuple[Any, float, bool]] = []
+        self.running = False
+        self.removed = False
+        self.batches = 0
+        self.images = 0
+        self.errors = 0
+        self.totalExecute = 0.0
+        self.maxExecute = 0.0
+        self.lastExecute = 0.0
+        self.totalWait = 0.0
+        self.maxWait = 0.0
+
+class PluginScheduler:
+    """
+    Runs the `executeBatch` of the active plugins on a pool of `maxWorkers` threads, so neither the GUI
+    nor the threads that deliver images wait for plugins. Plugin work is mostly DB queries and file
+    reads, so the pool is not sized by the number of CPUs.
+
+    Every plugin has its own input queue. Images that arrive while a plugin is busy are coalesced
+    and handed to it together, up to `maxBatch` at a time, in its next batch. Backfill and live
+    images are never mixed in a batch. A plugin runs at most one batch at a time, so a slow plugin
+    occupies one worker and the others keep running. `onExecuted` is called with the plugin, the
+    batch and the result of `executeBatch` after every batch, on the worker thread.
+    """
+    # Batches that take longer than this many seconds are reported
+    slowBatch = 5.0
+
+    def __init__(self, db: AppDB, maxWorkers: int = 4, maxBatch: int = 4096, onExecuted: Callable[[PluginInterface, list, Any], None] | None = None):
+        self._db = db
+        self.maxBatch = maxBatch
+        self._onExecuted = onExecuted
+        self._lock = threading.Lock()
+        self._slots: dict[int, _PluginSlot] = {}
+        self._executor = ThreadPoolExecutor(thread_name_prefix="PluginScheduler", max_workers=maxWorkers)
+
+    def add(self, plugin: PluginInterface):
+        with self._lock:
+            self._slots.setdefault(id(plugin), _PluginSlot(plugin))
+
+    def remove(self, plugin: PluginInterface):
+        """
+        Stops handing images to `plugin`. Its pending images are dropped, a running batch finishes.
+        """
+        with self._lock:
+            slot = self._slots.pop(id(plugin), None)
+            if slot is not None:
+                slot.removed = True
+                slot.pending.clear()
+
+    def submit(self, images: Sequence, backfill: bool = False):
+        """
+        Queues `images` for every plugin and returns right away. `backfill` images are historical
+        frames, e.g. found by a scout.
+        """
+        if len(images) == 0:
+            return
+        submitted = time.perf_counter()
+        with self._lock:
+            for slot in self._slots.values():
+                slot.pending.extend((image, submitted, backfill) for image in images)
+                self._schedule(slot)
+
+    def metrics(self) -> dict[str, dict]:
+        """
+        Execution statistics of every plugin, by name. Errors count failed batches, times are in
+        seconds and waits run from an image's submission to the start of its batch.
+        """
+        with self._lock:
+            return {slot.name: {
+                "batches": slot.batches,
+                "images": slot.images,
+                "errors": slot.errors,
+                "pending": len(slot.pending),
+                "running": slot.running,
+                "avg_execute": slot.totalExecute / slot.batches if slot.batches else 0.0,
+                "max_execute": slot.maxExecute,
+                "last_execute": slot.lastExecute,
+                "avg_wait": slot.totalWait / slot.images if slot.images else 0.0,
+                "max_wait": slot.maxWait,
+            } for slot in self._slots.values()}
+
+    def stop(self, wait: bool = True):
+        """
+        Drops pending images and stops the workers, after running batches finished with `wait`.
+        """
+        with self._lock:
+            for slot in self._slots.values():
+                slot.removed = True
+                slot.pending.clear()
+            self._slots.clear()
+        self._executor.shutdown(wait=wait)
+
+    def _schedule(self, slot: _PluginSlot):
+        # Called with the lock held
+        if slot.running or slot.removed or len(slot.pending) == 0:
+            return
+        slot.running = True
+        self._executor.submit(self._run, slot)
+
+    def _run(self, slot: _PluginSlot):
+        with self._lock:
+            backfill = slot.pending[0][2] if slot.pending else False
+            size = 0
+            while size < min(self.maxBatch, len(slot.pending)) and slot.pending[size][2] == backfill:
+                size += 1
+            batch = slot.pending[:size]
+            del slot.pending[:size]
+            if slot.removed or size == 0:
+                # Removed, or its images were dropped, after the batch was scheduled
+                slot.running = False
+                return
+        start = time.perf_counter()
+        images = [image for image, _, _ in batch]
+        result = None
+        errors = 0
+        try:
+            result = slot.plugin.executeBatch(images, self._db, backfill)
+        except Exception as e:
+            print(f"Error executing plugin {slot.name} for {len(images)} images: {e}")
+            errors = 1
+        elapsed = time.perf_counter() - start
+        if elapsed > self.slowBatch:
+            print(f"Plugin {slot.name} took {elapsed:.1f}s for {len(images)} images")
+
+        with self._lock:
+            slot.batches += 1
+            slot.images += len(images)
+            slot.errors += errors
+            slot.totalExecute += elapsed
+            slot.maxExecute = max(slot.maxExecute, elapsed)
+            slot.lastExecute = elapsed
+            for _, submitted, _ in batch:
+                slot.totalWait += start - submitted
+                slot.maxWait = max(slot.maxWait, start - submitted)
+        if self._onExecuted is not None and not slot.removed:
+            try:
+                self._onExecuted(slot.plugin, images, result)
+            except Exception as e:
+                print(f"Error handling results of plugin {slot.name}: {e}")
+        with self._lock:
+            slot.running = False
+            self._schedule(slot)
@@ -11,7 +11,7 @@ class PluginSelection:
     def __init__(self, pluginLoader: PluginLoader, db: AppDB):
         self.availablePlugins: list[type[PluginInterface]] = pluginLoader.plugins
         self.db = db
-        self._didUpdate = {}
+        self._didUpdate = set()
     
     def didUpdateSelection(self, callback):
         """
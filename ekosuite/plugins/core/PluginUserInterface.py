@@ -1,5 +1,7 @@
 from PyQt5.QtWidgets import QWidget
 
+from ekosuite.plugins.model.images.ImageDelta import ImageDelta
+
 class PluginUserInterface:
     """
     Interface for a QT view that can be embedded inside a window.
@@ -19,6 +21,21 @@ class PluginUserInterface:
         Override this method to define the layout and widgets.
         """
         raise NotImplementedError("Subclasses must implement the setup_ui method.")
+
+    def executed(self, images: list, result):
+        """
+        Called on the GUI thread after the plugin's `executeBatch` ran for `images` on a worker
+        thread, with what it returned.
+        """
+        pass
+
+    def imagesAdded(self, delta: ImageDelta):
+        """
+        Called on the GUI thread with the images added since the previous call, at a throttled rate.
+        Override this method to update the parts of the view that show these images, instead of
+        building it again.
+        """
+        pass
     
     def clearLayout(self, layout):
         while layout.count():  # Check if there are items in the layout
@@ -0,0 +1,162 @@
+import hashlib
+import os
+import time
+import numpy as np
+from contextlib import contextmanager
+from typing import Callable, Sequence
+from astropy.nddata import CCDData, StdDevUncertainty
+from ekosuite.app.AppDB import AppDB
+from .DBImage import DBImage
+
+class CalibrationCache:
+    """
+    Calibration products, like master flats, stored as `.npz` files under the app folder's `cache`
+    directory and indexed in the `calibration_cache` table.
+
+    A product is stored under a name and the key of the frames it was built from. When any of these
+    frames is replaced or rewritten its key changes, and the product is built again the next time
+    it is asked for. The least recently used products are removed once the files take more than
+    `diskBudget` bytes, except for the products used inside a `pinned` block.
+    """
+    def __init__(self, db: AppDB, folder: str | None = None, diskBudget: int = 4 * 2 ** 30):
+        self._db = db
+        self.folder = folder if folder is not None else os.path.join(db.folder, "cache")
+        self.diskBudget = diskBudget
+        # Names of the products used inside `pinned` blocks, which are not evicted while these run
+        self._pinned: set[str] = set()
+        self._pinDepth = 0
+        os.makedirs(self.folder, exist_ok=True)
+
+    @contextmanager
+    def pinned(self):
+        """
+        Keeps the products stored, read or located inside the block from being evicted until it
+        ends, for readers that were only handed their `location`. The cache is brought back within
+        `diskBudget` afterwards.
+        """
+        self._pinDepth += 1
+        try:
+            yield self
+        finally:
+            self._pinDepth -= 1
+            if self._pinDepth == 0:
+                self._pinned.clear()
+                self._evict()
+
+    def _pin(self, name: str):
+        if self._pinDepth > 0:
+            self._pinned.add(name)
+
+    @staticmethod
+    def key(frames: Sequence[DBImage]) -> str:
+        """
+        Key of a product built from `frames`, from their ids and the size and mtime of their files.
+        """
+        digest = hashlib.sha1()
+        for frame in sorted(frames, key=lambda frame: frame.id):
+            try:
+                stat = os.stat(frame.filename)
+                signature = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                signature = None
+            digest.update(repr((frame.id, signature)).encode())
+        return digest.hexdigest()
+
+    def get(self, name: str, key: str) -> CCDData | None:
+        """
+        Returns the product stored as `name` if it was built from frames with `key`.
+        """
+        row = self._db.get("SELECT key, path FROM calibration_cache WHERE name = ?", (name,))
+        if isinstance(row, Exception):
+            print(f"Error reading calibration cache: {row}")
+            return None
+        if row is None:
+            return None
+        stored_key, path = row
+        if stored_key != key:
+            # A contributing frame changed
+            self._remove(name, path)
+            return None
+        try:
+            ccd = CalibrationCache.load(path)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Error loading calibration product {path}: {e}")
+            self._remove(name, path)
+            return None
+        self._pin(name)
+        self._db.execute("UPDATE calibration_cache SET last_used = ? WHERE name = ?", (time.time(), name))
+        return ccd
+
+    def put(self, name: str, key: str, ccd: CCDData):
+        """
+        Stores `ccd` as the product `name` built from frames with `key`, replacing an older version.
+        """
+        path = os.path.join(self.folder, f"{hashlib.sha1(name.encode()).hexdigest()}-{key}.npz")
+        temporary = path + ".tmp"
+        with open(temporary, 'wb') as f:
+            np.savez(f,
+                data=ccd.data,
+                mask=ccd.mask if ccd.mask is not None else np.zeros(ccd.shape, dtype=bool),
+                uncertainty=ccd.uncertainty.array if ccd.uncertainty is not None else np.zeros(ccd.shape))
+        os.replace(temporary, path)
+        self._pin(name)
+
+        previous = self._db.get("SELECT path FROM calibration_cache WHERE name = ?", (name,))
+        self._db.execute("""
+            INSERT INTO calibration_cache (name, key, path, size, last_used) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET key = excluded.key, path = excluded.path, size = excluded.size, last_used = excluded.last_used
+        """, (name, key, path, os.path.getsize(path), time.time()))
+        if isinstance(previous, tuple) and previous[0] != path:
+            self._removeFile(previous[0])
+        self._evict()
+
+    def getOrBuild(self, name: str, frames: Sequence[DBImage], build: Callable[[], CCDData]) -> CCDData:
+        """
+        Returns the product `name` of `frames`, building and storing it with `build` if needed.
+        """
+        key = CalibrationCache.key(frames)
+        ccd = self.get(name, key)
+        if ccd is None:
+            ccd = build()
+            self.put(name, key, ccd)
+        return ccd
+
+    @staticmethod
+    def load(path: str) -> CCDData:
+        """
+        Reads a product file written by `put`.
+        """
+        with np.load(path) as arrays:
+            return CCDData(arrays['data'], mask=arrays['mask'], uncertainty=StdDevUncertainty(arrays['uncertainty']), unit='adu')
+
+    def location(self, name: str) -> str | None:
+        """
+        Path of the file holding the product `name`, for readers in other processes.
+        """
+        row = self._db.get("SELECT path FROM calibration_cache WHERE name = ?", (name,))
+        if not isinstance(row, tuple):
+            return None
+        self._pin(name)
+        return row[0]
+
+    def _evict(self):
+        rows = self._db.fetchall("SELECT name, path, size FROM calibration_cache ORDER BY last_used DESC")
+        if isinstance(rows, Exception):
+            print(f"Error reading calibration cache: {rows}")
+            return
+        total = 0
+        for i, (name, path, size) in enumerate(rows):
+            total += size
+            # The most recent product stays, even on its own over budget
+            if total > self.diskBudget and i > 0 and name not in self._pinned:
+                self._remove(name, path)
+
+    def _remove(self, name: str, path: str):
+        self._db.execute("DELETE FROM calibration_cache WHERE name = ? AND path = ?", (name, path))
+        self._removeFile(path)
+
+    def _removeFile(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
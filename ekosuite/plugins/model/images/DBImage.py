@@ -1,16 +1,45 @@
+from typing import Sequence
 from .Image import Image
 from .ImageData import ImageData
 from .FITSImage import FITSImage
 from .XISFImage import XISFImage
+from .ImageRecord import ImageRecord, ImageRecordSession
 from ekosuite.app.AppDB import AppDB
 from datetime import datetime
 
 class DBImage(Image):
-    def __init__(self, id: int, db: AppDB):
+    def __init__(self, id: int, db: AppDB, session: ImageRecordSession | None = None):
         super().__init__()
         self._db = db
         self._id = id
-    
+        self._session = session
+        self._record: ImageRecord | None = None
+
+    @staticmethod
+    def load(ids: Sequence[int], db: AppDB, session: ImageRecordSession | None = None) -> list["DBImage"]:
+        """
+        Creates images for `ids` that share one session. Their rows are fetched together with a
+        single query the first time any of them is read.
+        """
+        session = session if session is not None else ImageRecordSession(db)
+        session.register(ids)
+        return [DBImage(id, db, session) for id in ids]
+
+    @property
+    def id(self) -> int:
+        return self._id
+
+    @property
+    def record(self) -> ImageRecord:
+        """
+        The image's row in `fits_files`, loaded once.
+        """
+        if self._record is None:
+            if self._session is None:
+                self._session = ImageRecordSession(self._db)
+            self._record = self._session.get(self._id)
+        return self._record
+
     @property
     def image_data(self) -> ImageData:
         if self.filename.split(".")[-1] == "fits":
@@ -23,154 +52,96 @@ class DBImage(Image):
 
     @property
     def filename(self) -> str:
-        result = self._db.conn.cursor().execute("SELECT filename FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        if result:
-            return result[0]
-        else:
-            raise ValueError(f"Image with ID {self._id} not found in database.")
+        return self.record.filename
 
     @property
     def create_time(self) -> datetime:
-        result = self._db.conn.cursor().execute("SELECT create_time FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        if result:
-            return datetime.fromisoformat(result[0])
-        else:
-            raise ValueError(f"Image with ID {self._id} not found in database.")
-    
+        return datetime.fromisoformat(self.record.create_time)
+
     @property
     def latitude(self) -> float:
-        result = self._db.conn.cursor().execute("SELECT lat FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        if result:
-            return result[0]
-        else:
-            raise ValueError(f"Image with ID {self._id} not found in database.")
-    
+        return self.record.lat
+
     @property
     def longitude(self) -> float:
-        result = self._db.conn.cursor().execute("SELECT lon FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        if result:
-            return result[0]
-        else:
-            raise ValueError(f"Image with ID {self._id} not found in database.")
+        return self.record.lon
+
+    @property
+    def timezone_offset(self) -> float | None:
+        return self.record.timezone_offset
 
     @property
     def image_width(self) -> int:
-        result = self._db.conn.cursor().execute("SELECT image_width FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        if result:
-            return result[0]
-        else:
-            raise ValueError(f"Image with ID {self._id} not found in database.")
+        return self.record.image_width
 
     @property
     def image_height(self) -> int:
-        result = self._db.conn.cursor().execute("SELECT image_height FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        if result:
-            return result[0]
-        else:
-            raise ValueError(f"Image with ID {self._id} not found in database.")
+        return self.record.image_height
 
     @property
     def pixel_size(self) -> float:
-        result = self._db.conn.cursor().execute("SELECT pixel_size FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        if result:
-            return result[0]
-        else:
-            raise ValueError(f"Image with ID {self._id} not found in database.")
+        return self.record.pixel_size
 
     @property
     def object(self) -> str:
-        result = self._db.conn.cursor().execute("SELECT object FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        if result:
-            return result[0]
-        else:
-            raise ValueError(f"Image with ID {self._id} not found in database.")
+        return self.record.object
 
     @property
     def ra(self) -> float:
-        result = self._db.conn.cursor().execute("SELECT ra FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        if result:
-            return result[0]
-        else:
-            raise ValueError(f"Image with ID {self._id} not found in database.")
+        return self.record.ra
 
     @property
     def dec(self) -> float:
-        result = self._db.conn.cursor().execute("SELECT dec FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        if result:
-            return result[0]
-        else:
-            raise ValueError(f"Image with ID {self._id} not found in database.")
-    
+        return self.record.dec
+
     @property
     def instrument(self) -> str:
-        result = self._db.conn.cursor().execute("SELECT instrument FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        return result[0]
+        return self.record.instrument
 
     @property
     def telescope(self) -> str:
-        result = self._db.conn.cursor().execute("SELECT telescope FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        return result[0]
+        return self.record.telescope
 
     @property
-    def filter(self) -> str | None:        
-        result = self._db.conn.cursor().execute("SELECT filter FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        return result[0]
+    def filter(self) -> str | None:
+        return self.record.filter
 
     @property
     def imagetype(self) -> str:
-        result = self._db.conn.cursor().execute("SELECT imagetype FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        if result:
-            return result[0]
-        else:
-            raise ValueError(f"Image with ID {self._id} not found in database.")
+        return self.record.imagetype
 
     @property
     def exptime(self) -> float:
-        result = self._db.conn.cursor().execute("SELECT exptime FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        if result:
-            return result[0]
-        else:
-            raise ValueError(f"Image with ID {self._id} not found in database.")
+        return self.record.exptime
 
     @property
-    def focal_length(self) -> float | None:        
-        result = self._db.conn.cursor().execute("SELECT focal_length FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        return result[0]
+    def focal_length(self) -> float | None:
+        return self.record.focal_length
 
     @property
-    def temperature(self) -> float | None: 
-        result = self._db.conn.cursor().execute("SELECT temperature FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        return result[0]
+    def temperature(self) -> float | None:
+        return self.record.temperature
 
     @property
     def sensor_temperature(self) -> float | None:
-        result = self._db.conn.cursor().execute("SELECT sensor_temperature FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        return result[0]
+        return self.record.sensor_temperature
 
     @property
     def gain(self) -> float | None:
-        result = self._db.conn.cursor().execute("SELECT gain FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        return result[0]
+        return self.record.gain
 
     @property
     def bias(self) -> float | None:
-        result = self._db.conn.cursor().execute("SELECT bias FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        return result[0]
+        return self.record.bias
 
     @property
     def airmass(self) -> float | None:
-        result = self._db.conn.cursor().execute("SELECT airmass FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        return result[0]
+        return self.record.airmass
 
     @property
     def mpsas(self) -> float | None:
-        result = self._db.conn.cursor().execute("SELECT mpsas FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        return result[0]
-    
+        return self.record.mpsas
+
     @property
     def scale(self) -> float:
-        result = self._db.conn.cursor().execute("SELECT scale FROM fits_files WHERE id = ?", (self._id,)).fetchone()
-        if result:
-            return result[0]
-        else:
-            raise ValueError(f"Image with ID {self._id} not found in database.")
\ No newline at end of file
+        return self.record.scale
\ No newline at end of file
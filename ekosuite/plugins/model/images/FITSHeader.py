@@ -0,0 +1,137 @@
+import mmap
+import numpy as np
+from datetime import datetime
+from .Image import Image
+
+BLOCK_SIZE = 2880
+CARD_SIZE = 80
+
+# Keywords that end up in `fits_files`
+STORED_KEYWORDS = frozenset((
+    'DATE-OBS', 'SITELAT', 'SITELONG', 'NAXIS1', 'NAXIS2', 'XPIXSZ', 'OBJECT', 'RA', 'DEC', 'INSTRUME',
+    'TELESCOP', 'FILTER', 'IMAGETYP', 'EXPTIME', 'FOCALLEN', 'FOCUSTEM', 'CCD-TEMP', 'GAIN', 'OFFSET',
+    'MPSAS', 'AIRMASS',
+))
+
+# Keywords that describe the primary data array
+DATA_KEYWORDS = frozenset(('BITPIX', 'NAXIS', 'NAXIS1', 'NAXIS2', 'NAXIS3', 'NAXIS4', 'BZERO', 'BSCALE'))
+BITPIX_DTYPES = {
+    8: np.dtype('u1'),
+    16: np.dtype('>i2'),
+    32: np.dtype('>i4'),
+    64: np.dtype('>i8'),
+    -32: np.dtype('>f4'),
+    -64: np.dtype('>f8'),
+}
+
+def _parse_value(field: str):
+    """
+    Parses the value part of a header card (everything after "= ") the way fitsio reports it.
+    """
+    field = field.lstrip()
+    if field.startswith("'"):
+        # Strings end at the first single quote that isn't escaped as ''
+        value = []
+        i = 1
+        while i < len(field):
+            if field[i] == "'":
+                if i + 1 < len(field) and field[i + 1] == "'":
+                    value.append("'")
+                    i += 2
+                    continue
+                break
+            value.append(field[i])
+            i += 1
+        return ''.join(value).rstrip()
+
+    field = field.split('/', 1)[0].strip()
+    if field == '':
+        return None
+    if field == 'T':
+        return True
+    if field == 'F':
+        return False
+    try:
+        return int(field)
+    except ValueError:
+        pass
+    try:
+        return float(field.replace('D', 'E'))
+    except ValueError:
+        return field
+
+def _read_header(path: str, keywords: frozenset[str]) -> tuple[dict, int]:
+    """
+    Reads `keywords` from the primary header and returns them with the offset of the primary data.
+    """
+    header = {}
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            if m[:8] != b'SIMPLE  ':
+                raise ValueError(f"Not a FITS file: {path}")
+            for offset in range(0, len(m) - len(m) % CARD_SIZE, CARD_SIZE):
+                card = m[offset:offset + CARD_SIZE].decode('ascii', errors='replace')
+                keyword = card[:8].rstrip()
+                if keyword == 'END':
+                    # Data starts with the block after the one holding END
+                    return header, (offset // BLOCK_SIZE + 1) * BLOCK_SIZE
+                if keyword in keywords and card[8:10] == '= ' and keyword not in header:
+                    header[keyword] = _parse_value(card[10:])
+    raise ValueError(f"FITS header has no END card: {path}")
+
+def read_primary_header(path: str, keywords: frozenset[str] = STORED_KEYWORDS) -> dict:
+    """
+    Reads `keywords` from the primary header of a FITS file without touching its data.
+    Only the header's 2880 byte blocks are paged in.
+    """
+    return _read_header(path, keywords)[0]
+
+def map_primary_data(path: str) -> tuple[np.memmap, float, float]:
+    """
+    Memory maps the primary data array of an uncompressed FITS file without reading or scaling it.
+    Returns the array in FITS (big endian) byte order with the BZERO and BSCALE to apply to it.
+    """
+    header, offset = _read_header(path, DATA_KEYWORDS)
+    naxis = header.get('NAXIS', 0)
+    if naxis == 0 or naxis > 4 or header.get('BITPIX') not in BITPIX_DTYPES:
+        raise ValueError(f"FITS file has no primary image: {path}")
+    # FITS lists the fastest varying axis first
+    shape = tuple(header[f'NAXIS{axis}'] for axis in range(naxis, 0, -1))
+    data = np.memmap(path, dtype=BITPIX_DTYPES[header['BITPIX']], mode='r', offset=offset, shape=shape)
+    return data, header.get('BZERO', 0), header.get('BSCALE', 1)
+
+def read_fits_row(path: str) -> tuple:
+    """
+    Reads the `fits_files` row of a FITS file from its primary header.
+    Values and defaults match what `FITSImage` reports.
+    """
+    header = read_primary_header(path)
+    create_time = datetime.strptime(header.get('DATE-OBS', None), '%Y-%m-%dT%H:%M:%S.%f')
+    latitude = header.get('SITELAT', None)
+    longitude = header.get('SITELONG', None)
+    return (
+        path,
+        create_time,
+        latitude,
+        longitude,
+        Image.timezoneOffsetAt(latitude, longitude, create_time),
+        header.get('NAXIS1', -1),
+        header.get('NAXIS2', -1),
+        header.get('XPIXSZ', -1),
+        None,
+        header.get('OBJECT', 'Unknown'),
+        header.get('RA', -1),
+        header.get('DEC', -1),
+        header.get('INSTRUME', 'Unknown'),
+        header.get('TELESCOP', 'Unknown'),
+        header.get('FILTER', None),
+        header.get('IMAGETYP', 'Unknown'),
+        header.get('EXPTIME', -1),
+        header.get('FOCALLEN', None),
+        header.get('FOCUSTEM', None),
+        header.get('CCD-TEMP', None),
+        header.get('GAIN', None),
+        header.get('OFFSET', None),
+        header.get('MPSAS', None),
+        header.get('AIRMASS', None),
+    )
@@ -2,9 +2,8 @@ import fitsio
 from fitsio import FITS, FITSHDR
 from .Image import Image
 from .ImageData import ImageData
+from .FITSHeader import map_primary_data
 from datetime import datetime
-from timezonefinder import TimezoneFinder
-from pytz import timezone, utc
 import time
 
 class FITSImage(Image):
@@ -32,8 +31,14 @@ class FITSImage(Image):
 
     @property
     def image_data(self) -> ImageData:
-        image_data = fitsio.read(self._source)
-        return ImageData(image_data)
+        if not hasattr(self, '_image_data'):
+            try:
+                # Pixels are paged in from the file as they are used
+                self._image_data = ImageData(*map_primary_data(self._source))
+            except ValueError:
+                # Compressed or extension images
+                self._image_data = ImageData(fitsio.read(self._source))
+        return self._image_data
 
     @property
     def fits(self) -> FITS:
@@ -1,9 +1,8 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
 from haversine import haversine, Unit
-from timezonefinder import TimezoneFinder
-from pytz import timezone, utc
 from .ImageData import ImageData
+from .TimezoneResolver import TimezoneResolver
 
 class Image(ABC):
     """
@@ -48,14 +47,17 @@ class Image(ABC):
     @property
     def timezone_offset(self) -> float | None:
         """
-        Returns the timezone offset for where the image was taken or None if timezone is unknown
+        Returns the timezone offset for where and when the image was taken or None if timezone is unknown
         """
-        if self.latitude is not None and self.longitude is not None:
-            tf = TimezoneFinder()
-            timezone_str = tf.timezone_at(lat=float(self.latitude), lng=float(self.longitude))
-            local_tz = timezone(timezone_str)
-            utc_offset = local_tz.utcoffset(datetime.now())
-            return utc_offset.total_seconds() / 3600
+        return Image.timezoneOffsetAt(self.latitude, self.longitude, self.create_time)
+
+    @staticmethod
+    def timezoneOffsetAt(latitude: float | None, longitude: float | None, at: datetime | None = None) -> float | None:
+        """
+        Returns the timezone offset in hours at the given location and UTC time or None if it is unknown
+        """
+        if latitude is not None and longitude is not None:
+            return TimezoneResolver.shared().offset(latitude, longitude, at)
         else:
             return None
 
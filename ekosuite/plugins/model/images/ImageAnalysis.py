@@ -1,141 +1,385 @@
+from astropy.nddata import CCDData
 from ekosuite.app.AppDB import AppDB
-from ekosuite.plugins.models.images.ImageData import ImageData
-from ekosuite.plugins.models.images.Image import Image
-from ekosuite.plugins.models.images.DBImage import DBImage
+from ekosuite.plugins.model.images.CalibrationCache import CalibrationCache
+from ekosuite.plugins.model.images.ImageData import ImageData
+from ekosuite.plugins.model.images.Image import Image
+from ekosuite.plugins.model.images.DBImage import DBImage
+from ekosuite.plugins.model.images.ImageMeasurement import ImageMeasurement
+from ekosuite.plugins.model.images.FITSImage import FITSImage
+from ekosuite.plugins.model.images.XISFImage import XISFImage
 import ekosuite.sql.image_queries as sql
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from typing import Callable, Iterator, Sequence
 import asyncio
+import multiprocessing
+import os
+
+# Approximate measures never replace a full analysis
+IMAGE_ANALYSIS_UPSERT = """
+INSERT INTO image_analysis (image_id, fwhm, snr, eccentricity, median, noise, approximate) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(image_id) DO UPDATE SET
+    fwhm = excluded.fwhm,
+    snr = excluded.snr,
+    eccentricity = excluded.eccentricity,
+    median = excluded.median,
+    noise = excluded.noise,
+    approximate = excluded.approximate
+WHERE excluded.approximate = 0 OR image_analysis.approximate = 1
+"""
+
+# Calibration frames read by this worker process, by file, least recently used first
+_workerFrames: OrderedDict[str, ImageData | CCDData] = OrderedDict()
+
+def _workerFrame(path: str, load: Callable[[str], ImageData | CCDData], memoryBudget: int) -> ImageData | CCDData:
+    frame = _workerFrames.pop(path, None)
+    if frame is None:
+        frame = load(path)
+    _workerFrames[path] = frame
+    # The frame in use always stays
+    while len(_workerFrames) > 1 and sum(_footprint(cached) for cached in _workerFrames.values()) > memoryBudget:
+        _workerFrames.popitem(last=False)
+    return frame
+
+def _footprint(frame: ImageData | CCDData) -> int:
+    if isinstance(frame, ImageData):
+        # The bias is mapped, only its scaled pixels take memory
+        return frame.data.nbytes if frame._data is not None and frame._data is not frame._raw_data else 0
+    size = frame.data.nbytes
+    if frame.mask is not None:
+        size += frame.mask.nbytes
+    if frame.uncertainty is not None:
+        size += frame.uncertainty.array.nbytes
+    return size
+
+def _openImage(path: str) -> ImageData:
+    image = XISFImage(path) if path.lower().endswith('.xisf') else FITSImage(path)
+    return image.image_data
+
+def _analyzeFrame(task: tuple) -> tuple:
+    """
+    Process pool worker. Calibrates and measures one frame and returns its `image_analysis` row.
+    Errors are raised to the parent, which reports them.
+    """
+    image_id, filename, bias_file, dark_file, flat_file, memoryBudget = task
+    light = _openImage(filename)
+    if flat_file is None:
+        data = light.data
+    else:
+        bias = _workerFrame(bias_file, _openImage, memoryBudget)
+        master_dark = _workerFrame(dark_file, CalibrationCache.load, memoryBudget)
+        flat = _workerFrame(flat_file, CalibrationCache.load, memoryBudget)
+        data = light.calibrate(bias, None, flat, master_dark).data
+    return ImageMeasurement.measure(data).row(image_id)
 
 class AnalysisResult:
-    def __init__(self, db: AppDB, id: int):
-        self._db = db
-        self._id = id
+    """
+    Immutable snapshot of an image's row in `image_analysis`.
+    """
+    COLUMNS = ('image_id', 'fwhm', 'snr', 'eccentricity', 'median', 'noise', 'approximate')
+    __slots__ = ('_row',)
+    # Stay below SQLite's limit of bound parameters per statement
+    _chunkSize = 900
+
+    def __init__(self, row: Sequence):
+        object.__setattr__(self, '_row', tuple(row))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @staticmethod
+    def load(image_ids: Sequence[int], db: AppDB) -> list["AnalysisResult"]:
+        """
+        Results of the analyzed images among `image_ids`, in their order, loaded with one query per
+        chunk of ids.
+        """
+        rows = {}
+        columns = ', '.join(AnalysisResult.COLUMNS)
+        for i in range(0, len(image_ids), AnalysisResult._chunkSize):
+            chunk = list(image_ids[i:i + AnalysisResult._chunkSize])
+            result = db.fetchall(f"SELECT {columns} FROM image_analysis WHERE image_id IN ({', '.join(['?'] * len(chunk))})", chunk)
+            if isinstance(result, Exception):
+                raise result
+            rows.update((row[0], row) for row in result)
+        return [AnalysisResult(rows[image_id]) for image_id in image_ids if image_id in rows]
 
     @property
-    def fwhm(self) -> float:
+    def image_id(self) -> int:
+        return self._row[0]
+
+    @property
+    def fwhm(self) -> float | None:
         """
         Full Width at Half Maximum (FWHM) of the image.
         :return: FWHM value.
         """
-        return self._db.fetchall("SELECT fwhm FROM image_analysis WHERE id = ?", (self._id,))[0]
+        return self._row[1]
     
     @property
-    def snr(self) -> float:
+    def snr(self) -> float | None:
         """
         Signal-to-Noise Ratio (SNR) of the image.
         :return: SNR value.
         """
-        return self._db.fetchall("SELECT snr FROM image_analysis WHERE id = ?", (self._id,))[0]
+        return self._row[2]
     
     @property
-    def eccentricity(self) -> float:
+    def eccentricity(self) -> float | None:
         """
         Eccentricity of stars in the image.
         :return: Eccentricity value.
         """
-        return self._db.fetchall("SELECT eccentricity FROM image_analysis WHERE id = ?", (self._id,))[0]
+        return self._row[3]
     
     @property
-    def median(self) -> float:
+    def median(self) -> float | None:
         """
         Median value of the image.
         :return: Median value.
         """
-        return self._db.fetchall("SELECT median FROM image_analysis WHERE id = ?", (self._id,))[0]
+        return self._row[4]
+
+    @property
+    def noise(self) -> float | None:
+        """
+        Background noise per pixel of the image.
+        :return: Noise value.
+        """
+        return self._row[5]
+
+    @property
+    def approximate(self) -> bool:
+        """
+        Whether the values come from a quick look that a full analysis has not replaced yet.
+        """
+        return bool(self._row[6])
 
 class ImageAnalysisCache:
-    def __init__(self, db: AppDB):
+    """
+    Master flats and bias subtracted darks for the images being analyzed. Products are kept for the
+    run and, through `CalibrationCache`, on disk, so analyzing a session again does not rebuild them.
+    """
+    def __init__(self, db: AppDB, calibrationCache: CalibrationCache | None = None):
         self._db = db
-        self._master_flats = {}
-        self._processed_flats = []
-    
-    def master_flat(self, image: Image) -> ImageData | None:
+        self._calibrationCache = calibrationCache if calibrationCache is not None else CalibrationCache(db)
+        # By the night session, filter, telescope and instrument of the flats
+        self._master_flats: dict[tuple, CCDData | None] = {}
+        # By the ids of the master dark and master bias
+        self._master_darks: dict[tuple[int, int], CCDData] = {}
+
+    def _flat_key(self, image: DBImage) -> tuple:
+        return (sql.night_session_for_image(self._db, image.id), image.filter, image.telescope, image.instrument)
+
+    @staticmethod
+    def _flat_name(key: tuple) -> str:
+        return "master_flat:" + ":".join(str(part) for part in key)
+
+    @staticmethod
+    def _dark_name(dark_id: int, bias_id: int) -> str:
+        return f"master_dark:{dark_id}:{bias_id}"
+
+    @contextmanager
+    def pinned(self):
         """
-        Get the master flat for the image.
-        :param image: The image to get the master flat for.
-        :return: The master flat image.
+        Keeps the products made or located inside the block on disk until it ends. Their files may
+        be evicted afterwards, so the products are forgotten and the next block locates them again.
         """
-        night_session_id = self._db.fetchall("""
-            SELECT night_session_id FROM night_session_fits_files
-            WHERE fits_file_id = ?
-            LIMIT 1
-        """, (image.id,))[0]
-        
-        return self._master_flats[night_session_id]
+        try:
+            with self._calibrationCache.pinned():
+                yield self
+        finally:
+            self._master_flats.clear()
+            self._master_darks.clear()
 
-    async def make(self, image: Image):
+    def master_flat_location(self, image: DBImage) -> str | None:
+        """
+        File of the image's master flat once it was made, for analysis workers.
+        """
+        if self.master_flat(image) is None:
+            return None
+        return self._calibrationCache.location(self._flat_name(self._flat_key(image)))
+
+    def master_dark_location(self, dark_id: int, bias_id: int) -> str | None:
+        """
+        File of the bias subtracted master dark, made if needed, for analysis workers.
+        """
+        self.master_dark(dark_id, bias_id)
+        return self._calibrationCache.location(self._dark_name(dark_id, bias_id))
+
+    def master_flat(self, image: DBImage) -> CCDData | None:
         """
         Get the master flat for the image.
         :param image: The image to get the master flat for.
-        :return: The master flat image.
+        :return: The master flat, None if it has no flats or master bias.
         """
-        night_session_id = sql.night_session_for_image(self._db, image.id)
+        return self._master_flats.get(self._flat_key(image))
 
-        if night_session_id not in self._processed_flats:
-            self._processed_flats.append(night_session_id)
-        else:
+    def master_dark(self, dark_id: int, bias_id: int) -> CCDData:
+        """
+        Get the master dark with the master bias subtracted.
+        """
+        key = (dark_id, bias_id)
+        if key not in self._master_darks:
+            dark, bias = DBImage.load([dark_id, bias_id], self._db)
+            self._master_darks[key] = self._calibrationCache.getOrBuild(
+                self._dark_name(dark_id, bias_id),
+                [dark, bias],
+                lambda: dark.image_data.bias_subtract(bias.image_data)
+            )
+        return self._master_darks[key]
+
+    async def make(self, image: DBImage):
+        """
+        Make the master flat for the image, unless it was made before.
+        :param image: The image to make the master flat for.
+        """
+        key = self._flat_key(image)
+        if key in self._master_flats:
             return
+        self._master_flats[key] = None
 
         flat_frame_ids = sql.flat_frames_for_image(self._db, image.id)
+        master_bias_id = sql.master_bias_for_image(self._db, image.id)
+        if not flat_frame_ids or master_bias_id is None:
+            return
 
-        master_bias_id = self._db.fetchall("""
-            SELECT id FROM fits_files
-            WHERE image_type_generic = 'MASTER BIAS'
-            ORDER BY ABS(TIMEDIFF(created_date, ?)) ASC
-            LIMIT 1
-        """, (image.created_date,))[0]
-
-        self._master_flats[night_session_id] = ImageData.flat_stack(
-            (DBImage(self._db, flat_id).image_data for flat_id in (flat_frame_ids if flat_frame_ids else [])), 
-            DBImage(self._db, master_bias_id).image_data
+        frames = DBImage.load([*flat_frame_ids, master_bias_id], self._db)
+        flats, bias = frames[:-1], frames[-1]
+        self._master_flats[key] = self._calibrationCache.getOrBuild(
+            self._flat_name(key),
+            frames,
+            lambda: ImageData.flat_stack([flat.image_data for flat in flats], bias.image_data)
         )
     
 class ImageAnalysis:
-    def __init__(self, db: AppDB, images: list[Image]):
+    """
+    Calibrates and measures images on a pool of worker processes and stores the measures in
+    `image_analysis`.
+
+    Calibration products are made once in this process and read by the workers from the
+    calibration cache. Every worker analyzes one frame at a time and keeps the products it read
+    while they fit in `workerMemory` bytes. At most two frames per worker are queued, and results
+    are committed every `commitBatch` frames.
+    """
+    def __init__(self, db: AppDB, images: list[DBImage], maxWorkers: int = os.cpu_count() or 1, workerMemory: int = 2 * 2 ** 30, commitBatch: int = 32, calibrationCache: CalibrationCache | None = None):
         self._images = images
         self._db = db
-        self._cache = ImageAnalysisCache(db)
-
-    async def analyze(self, calibrate: bool):
-        """
-        Analyze the image and return the analysis result.
-        :param calibrate: If True, perform calibration on the image.
-        :return: Analysis result.
-        """
-        analyzed_images = []
-        if calibrate:
-            for image in self._images:
-                asyncio.create_task(self._cache.make(image))
-            
-            for image in self._images:
-                flat = self._cache.master_flat(image)
-                    
-                dark = sql.master_dark_for_image(self._db, image.id)
-                bias = sql.master_bias_for_image(self._db, image.id)
-                if flat is None:
-                    raise ValueError("No flats found for the image.")
-                if dark is None:
-                    raise ValueError("No darks found for the image.")
-                if bias is None:
-                    raise ValueError("No biases found for the image.")
-                analyzed_images.append(self.calibrate(image, flat, dark, bias))
-        else:
-            for image in self._images:
-                analyzed_images.append(image.image_data._ccdData)
-        # Perform analysis on the image
-        results = (self.analyze_calibrated(image) for image in analyzed_images)
-        return results
-
-    def analyze_calibrated(self, image: Image) -> AnalysisResult:
-        pass
-
-    def calibrate(self, light: Image, flat: Image, master_dark: Image, master_bias: Image):
+        self._cache = ImageAnalysisCache(db, calibrationCache)
+        self.maxWorkers = maxWorkers
+        self.workerMemory = workerMemory
+        self.commitBatch = commitBatch
+        # Ids of the images that could not be analyzed in the last run
+        self.failed: list[int] = []
+
+    async def analyze(self, calibrate: bool) -> list[AnalysisResult]:
+        """
+        Analyze the images and store the analysis results.
+        :param calibrate: If True, perform calibration on the images.
+        :return: Analysis results of the images that could be analyzed, the ids of the others are in `failed`.
+        """
+        # The workers read calibration products from their files, which must outlive the run
+        with self._cache.pinned():
+            tasks = []
+            if calibrate:
+                for image in self._images:
+                    await self._cache.make(image)
+
+                for image in self._images:
+                    flat = self._cache.master_flat_location(image)
+                    dark = sql.master_dark_for_image(self._db, image.id)
+                    bias = sql.master_bias_for_image(self._db, image.id)
+                    if flat is None:
+                        raise ValueError("No flats found for the image.")
+                    if dark is None:
+                        raise ValueError("No darks found for the image.")
+                    if bias is None:
+                        raise ValueError("No biases found for the image.")
+                    tasks.append((image.id, image.filename, DBImage(bias, self._db).filename, self._cache.master_dark_location(dark, bias), flat, self.workerMemory))
+            else:
+                for image in self._images:
+                    tasks.append((image.id, image.filename, None, None, None, self.workerMemory))
+            # Waiting for the workers must not block the event loop
+            image_ids = await asyncio.get_running_loop().run_in_executor(None, self._run, tasks)
+        return AnalysisResult.load(image_ids, self._db)
+
+    @staticmethod
+    def approximated(db: AppDB) -> list[DBImage]:
+        """
+        Images that only have quick look results, to analyze in full when there is time.
+        """
+        rows = db.fetchall("SELECT image_id FROM image_analysis WHERE approximate = 1 ORDER BY image_id")
+        if isinstance(rows, Exception):
+            print(f"Error reading approximate analyses: {rows}")
+            return []
+        return DBImage.load([row[0] for row in rows], db)
+
+    def _run(self, tasks: list[tuple]) -> list[int]:
+        # Spawn rather than fork, the app's DB and UI threads must not be copied into workers
+        executor = ProcessPoolExecutor(max_workers=self.maxWorkers, mp_context=multiprocessing.get_context('spawn'))
+        self.failed = []
+        analyzed = []
+        batch = []
+        try:
+            for row in self._stream(executor, tasks):
+                if row is None:
+                    continue
+                batch.append(row)
+                if len(batch) >= self.commitBatch:
+                    analyzed.extend(self._commit(batch))
+                    batch = []
+            analyzed.extend(self._commit(batch))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return analyzed
+
+    def _stream(self, executor: Executor, tasks: list[tuple]) -> Iterator[tuple | None]:
+        maxInFlight = 2 * self.maxWorkers
+        inFlight = {}
+        for task in tasks:
+            if len(inFlight) >= maxInFlight:
+                yield from self._collect(inFlight)
+            inFlight[executor.submit(_analyzeFrame, task)] = task
+        while len(inFlight) > 0:
+            yield from self._collect(inFlight)
+
+    def _collect(self, inFlight: dict) -> Iterator[tuple | None]:
+        """
+        Waits for the next frames to be done and yields their rows, or None for frames that failed.
+        """
+        done, _ = wait(inFlight, return_when=FIRST_COMPLETED)
+        for future in done:
+            image_id, filename = inFlight.pop(future)[:2]
+            try:
+                row = future.result()
+            except Exception as e:
+                print(f"Error analyzing {filename}: {e}")
+                self.failed.append(image_id)
+                row = None
+            yield row
+
+    def _commit(self, rows: list[tuple]) -> list[int]:
+        if len(rows) == 0:
+            return []
+        result = self._db.executemany(IMAGE_ANALYSIS_UPSERT, rows)
+        if isinstance(result, Exception):
+            print(f"Error storing the analysis of {len(rows)} images: {result}")
+            return []
+        return [row[0] for row in rows]
+
+    def analyze_calibrated(self, image: CCDData) -> ImageMeasurement:
+        return ImageMeasurement.measure(image.data)
+
+    def calibrate(self, light: Image, flat: CCDData, master_dark: int, master_bias: int):
         """
         Calibrate the image.
-        :return: None
+        :return: The calibrated image.
         """
+        bias = DBImage(master_bias, self._db).image_data
         calibrated_image = light.image_data.calibrate(
-            DBImage(self._db, master_bias).image_data,
-            DBImage(self._db, master_dark).image_data,
-            DBImage(self._db, flat).image_data
+            bias,
+            DBImage(master_dark, self._db).image_data,
+            flat,
+            self._cache.master_dark(master_dark, master_bias)
         )
-        return calibrated_image
\ No newline at end of file
+        return calibrated_image
@@ -1,19 +1,114 @@
+import mmap
+import numpy as np
 from numpy import ndarray
 from numpy import float64
 
 from astropy import nddata
-from astropy.nddata import CCDData
+from astropy.nddata import CCDData, StdDevUncertainty
 import ccdproc as ccdp
 
 class ImageData:
-    def __init__(self, raw_data: ndarray):
+    """
+    Pixels of an image. `raw_data` may be a memory map of the file, in which case pixels are only
+    read when they are used. BZERO/BSCALE are applied on first access of `data`, and `data` and
+    `ccdData` are kept until `release`.
+    """
+    def __init__(self, raw_data: ndarray, bzero: float = 0, bscale: float = 1):
         self._raw_data = raw_data
+        self._bzero = bzero
+        self._bscale = bscale
+        self._data: ndarray | None = None
+        self._ccdData: CCDData | None = None
+
+    @property
+    def data(self) -> ndarray:
+        """
+        Returns the physical pixel values. Unscaled data is the raw array itself, without a copy.
+        """
+        if self._data is None:
+            self._data = ImageData._scaled(self._raw_data, self._bzero, self._bscale)
+        return self._data
+
+    @staticmethod
+    def _scaled(raw: ndarray, bzero: float, bscale: float) -> ndarray:
+        # Same result types as fitsio: the FITS unsigned integer conventions give unsigned arrays,
+        # other scaling gives floats
+        if bzero == 0 and bscale == 1:
+            return raw
+        bits = raw.dtype.itemsize * 8
+        if bscale == 1 and raw.dtype.kind == 'i' and bzero == 2 ** (bits - 1):
+            unsigned = raw.dtype.newbyteorder('=').str.replace('i', 'u')
+            return np.bitwise_xor(raw.view(raw.dtype.str.replace('i', 'u')), 1 << (bits - 1), dtype=unsigned)
+        if bscale == 1 and raw.dtype.kind == 'u' and bits == 8 and bzero == -128:
+            return np.bitwise_xor(raw, 0x80, dtype=np.uint8).view(np.int8)
+        dtype = np.float32 if raw.dtype.itemsize <= 2 else np.float64
+        return raw.astype(dtype) * dtype(bscale) + dtype(bzero)
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self._raw_data.shape
+
+    def rows(self, start: int, stop: int) -> ndarray:
+        """
+        Returns the physical values of rows `start` to `stop`. For mapped files only these rows are
+        read, and their pages are handed back to the kernel afterwards, so reading a file band by
+        band never keeps more than a band resident.
+        """
+        if self._data is not None:
+            return self._data[start:stop]
+        raw = self._raw_data
+        rows = ImageData._scaled(raw[start:stop], self._bzero, self._bscale)
+        if rows.base is not None:
+            # The band still refers to the mapping
+            rows = rows.copy()
+        ImageData._dropPages(raw, start, stop)
+        return rows
+
+    @staticmethod
+    def _dropPages(raw: ndarray, start: int, stop: int):
+        # Only where madvise exists (not on Windows), and for arrays that map a file directly, so the
+        # band's position in the mapping is known
+        if not hasattr(mmap, "MADV_DONTNEED") or not isinstance(raw, np.memmap) or not isinstance(raw.base, mmap.mmap) or not raw.flags.c_contiguous:
+            return
+        # np.memmap maps from the allocation granularity boundary before the array's offset
+        arrayStart = raw.offset % mmap.ALLOCATIONGRANULARITY
+        begin = arrayStart + start * raw.strides[0]
+        begin -= begin % mmap.PAGESIZE
+        end = min(arrayStart + stop * raw.strides[0], len(raw.base))
+        if end > begin:
+            raw.base.madvise(mmap.MADV_DONTNEED, begin, end - begin)
+
+    def binned(self, factor: int) -> ndarray:
+        """
+        Returns the means of `factor` x `factor` blocks of pixels as float32, for quick looks.
+        Colour images are binned on the mean of their channels, the shortest axis. Rows and
+        columns that do not fill a block are left out.
+        """
+        data = self.data
+        if data.ndim == 3:
+            data = data.mean(axis=int(np.argmin(data.shape)), dtype=np.float32)
+        height, width = data.shape[0] // factor * factor, data.shape[1] // factor * factor
+        # Summing strided views is several times faster than a mean over a reshaped block axis
+        binned = np.zeros((height // factor, width // factor), dtype=np.float32)
+        for row in range(factor):
+            for column in range(factor):
+                binned += data[row:height:factor, column:width:factor]
+        binned *= 1 / factor ** 2
+        return binned
+
+    def release(self):
+        """
+        Drops the cached pixel arrays, so they can be freed once nothing else refers to them.
+        """
+        self._data = None
+        self._ccdData = None
     
     def bias_subtract(self, bias: "ImageData") -> CCDData:
         """
-        Subtracts the bias from the raw data.
+        Subtracts the bias from the raw data. The result is floating point, so noise below the
+        bias level does not wrap around.
         """
-        return ccdp.subtract_bias(self.ccdData, bias.ccdData)
+        return ccdp.subtract_bias(self._floatCCDData(), bias.ccdData)
     
     def dark_subtract(self, dark: "ImageData") -> CCDData:
         """
@@ -22,19 +117,72 @@ class ImageData:
         return ccdp.subtract_dark(self.ccdData, dark.ccdData)
     
     @staticmethod
-    def flat_stack(flats: list["ImageData"], bias: "ImageData") -> CCDData:
+    def flat_stack(flats: list["ImageData"], bias: "ImageData", method: str = 'average', memoryLimit: int = 512 * 2 ** 20) -> CCDData:
         """
-        Stacks the flats.
+        Stacks the bias subtracted flats like `ccdproc.combine(..., sigma_clip=True)`: pixels more
+        than 3 sigma from the mean of their stack are rejected, then the rest are averaged, or
+        with `method='median'` medianed.
+
+        The flats are combined in bands of rows, reading only one band of every flat at a time, so
+        memory use stays around `memoryLimit` bytes regardless of the number of flats.
         """
-        flat_data = [flat.bias_subtract(bias) for flat in flats]
-        return ccdp.combine(flat_data, sigma_clip=True)
+        if method not in ('average', 'median'):
+            raise ValueError(f"Unknown combine method: {method}")
+        flats = list(flats)
+        if len(flats) == 0:
+            raise ValueError("No flats to stack")
+        shape = flats[0].shape
+        # The float64 stack of a band and about as much again for the clipping's temporaries
+        rowBytes = 2 * len(flats) * float64().itemsize * int(np.prod(shape[1:], dtype=np.int64))
+        bandRows = max(1, memoryLimit // rowBytes)
+
+        combined = np.empty(shape, dtype=float64)
+        uncertainty = np.empty(shape, dtype=float64)
+        mask = np.empty(shape, dtype=bool)
+        for start in range(0, shape[0], bandRows):
+            stop = min(start + bandRows, shape[0])
+            biasRows = bias.rows(start, stop)
+            stack = np.empty((len(flats), stop - start, *shape[1:]), dtype=float64)
+            for i, flat in enumerate(flats):
+                np.subtract(flat.rows(start, stop), biasRows, out=stack[i])
+            combined[start:stop], uncertainty[start:stop], mask[start:stop] = ImageData._clippedCombine(stack, method)
+            del stack
+
+        result = CCDData(combined, mask=mask, uncertainty=StdDevUncertainty(uncertainty), unit='adu')
+        result.meta['NCOMBINE'] = len(flats)
+        return result
+
+    @staticmethod
+    def _clippedCombine(stack: ndarray, method: str) -> tuple[ndarray, ndarray, ndarray]:
+        """
+        Combines a band of frames stacked along the first axis with one round of 3 sigma clipping.
+        Returns the combined band, its uncertainty and the mask of pixels that were all rejected.
+        """
+        center = stack.mean(axis=0)
+        deviation = stack.std(axis=0)
+        rejected = np.abs(stack - center) > 3 * deviation
+        stack[rejected] = np.nan
+        count = len(stack) - rejected.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if method == 'average':
+                combined = np.nanmean(stack, axis=0)
+                uncertainty = np.nanstd(stack, axis=0)
+            else:
+                combined = np.nanmedian(stack, axis=0)
+                # ccdproc's sigma_func, the median absolute deviation scaled to a standard deviation
+                uncertainty = 1.482602218505602 * np.nanmedian(np.abs(stack - combined), axis=0)
+            uncertainty /= np.sqrt(count)
+        return combined, uncertainty, count == 0
     
-    def calibrate(self, bias: "ImageData", dark: "ImageData", flat: "ImageData") -> CCDData:
+    def calibrate(self, bias: "ImageData", dark: "ImageData", flat: CCDData, master_dark: CCDData | None = None) -> CCDData:
         """
         Calibrates the raw data by subtracting the bias and dark, and dividing by the flat.
+        `master_dark` is the bias subtracted dark, if it was already made.
         """
-        master_dark = dark.bias_subtract(bias)
-        dark_corrected = ccdp.subtract_dark(self.ccdData, master_dark)
+        if master_dark is None:
+            master_dark = dark.bias_subtract(bias)
+        # Master darks are matched to the light's exposure time, so they are subtracted unscaled
+        dark_corrected = self.bias_subtract(bias).subtract(master_dark)
         return ccdp.flat_correct(dark_corrected, flat)
     
     def flat_correct(self, flat: "ImageData") -> CCDData:
@@ -43,9 +191,17 @@ class ImageData:
         """
         return ccdp.flat_correct(self.ccdData, flat.ccdData)
     
+    def _floatCCDData(self) -> CCDData:
+        data = self.data
+        if data.dtype.kind != 'f':
+            data = data.astype(np.float32)
+        return CCDData(data, unit='adu')
+
     @property
     def ccdData(self) -> CCDData:
         """
-        Returns the raw data as a CCDData object.
+        Returns the data as a CCDData object, created once and shared by all calibration steps.
         """
-        return CCDData(self._raw_data, unit='adu')
\ No newline at end of file
+        if self._ccdData is None:
+            self._ccdData = CCDData(self.data, unit='adu')
+        return self._ccdData
\ No newline at end of file
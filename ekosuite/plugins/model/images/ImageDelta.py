@@ -0,0 +1,54 @@
+import json
+from typing import Iterable, Sequence
+from ekosuite.app.AppDB import AppDB
+
+class ImageDelta:
+    """
+    Images that were added to or changed in `fits_files`, with the night sessions (`start_day`), targets
+    (`object`) and generic image types they touch, so views can update only what they show of these.
+    `backfill` deltas hold historical frames found by a scout rather than frames taken live.
+    """
+    def __init__(self, imageIds: Iterable[int] = (), nights: Iterable[str] = (), targets: Iterable[str] = (), imageTypes: Iterable[str] = (), backfill: bool = False):
+        self.imageIds = list(imageIds)
+        self.nights = set(nights)
+        self.targets = set(targets)
+        self.imageTypes = set(imageTypes)
+        self.backfill = backfill
+
+    def __len__(self) -> int:
+        return len(self.imageIds)
+
+    def merged(self, other: "ImageDelta") -> "ImageDelta":
+        """
+        Returns the images of this delta or `other`.
+        """
+        return ImageDelta(
+            list(dict.fromkeys(self.imageIds + other.imageIds)),
+            self.nights | other.nights,
+            self.targets | other.targets,
+            self.imageTypes | other.imageTypes,
+            self.backfill and other.backfill
+        )
+
+    @staticmethod
+    def of(db: AppDB, imageIds: Sequence[int], backfill: bool = False) -> "ImageDelta | Exception":
+        """
+        Returns the images `imageIds` as they are stored now.
+        """
+        rows = db.fetchall("""
+            SELECT ff.id, ns.start_day, ff.object, ff.image_type_generic
+            FROM fits_files AS ff
+            LEFT JOIN fits_file_night_sessions AS ffns ON ffns.fits_file_id = ff.id
+            LEFT JOIN night_sessions AS ns ON ns.id = ffns.night_session_id
+            WHERE ff.id IN (SELECT value FROM json_each(?))
+            ORDER BY ff.id
+        """, (json.dumps(list(imageIds)),))
+        if isinstance(rows, Exception):
+            return rows
+        return ImageDelta(
+            [row[0] for row in rows],
+            [row[1] for row in rows if row[1] is not None],
+            [row[2] for row in rows if row[2] is not None],
+            [row[3] for row in rows],
+            backfill
+        )
@@ -0,0 +1,226 @@
+import math
+import numpy as np
+from numpy import ndarray
+from scipy import ndimage
+from scipy.spatial import cKDTree
+
+# FWHM of a Gaussian in units of its standard deviation
+FWHM_PER_SIGMA = 2 * math.sqrt(2 * math.log(2))
+
+class ImageMeasurement:
+    """
+    Quality measures of a frame, as stored in `image_analysis`. `median` and `noise` are those of
+    the background. `fwhm` (pixels), `snr` (peak over background noise) and `eccentricity` are
+    medians over the detected stars, None if no star was found. `approximate` measures were taken
+    on binned pixels.
+    """
+    # Side of the boxes the background is estimated in, and the step pixels are sampled with
+    backgroundBox = 64
+    backgroundSample = 2
+    # Detection threshold in background standard deviations
+    threshold = 5.0
+    # Peaks must be the maximum within this many pixels
+    peakRadius = 2
+    # Half size of the window each star is measured in
+    window = 10
+    # Only pixels above this fraction of a star's peak are weighted, which keeps noise and
+    # neighbours out of its moments. The moments are corrected for the truncation.
+    truncation = 0.1
+    # Peaks with fewer pixels above half their height are taken for hot pixels, cosmic rays or noise
+    minStarPixels = 3
+
+    def __init__(self, fwhm: float | None, snr: float | None, eccentricity: float | None, median: float, noise: float | None = None, approximate: bool = False):
+        self.fwhm = fwhm
+        self.snr = snr
+        self.eccentricity = eccentricity
+        self.median = median
+        self.noise = noise
+        self.approximate = approximate
+
+    @staticmethod
+    def measure(data: ndarray, binning: int = 1) -> "ImageMeasurement":
+        """
+        Measures a calibrated frame. Stars are local maxima above the background, and their size
+        and shape come from their intensity weighted second moments, computed for all stars at once.
+
+        `data` may be binned by `binning`, see `ImageData.binned`. The noise and FWHM are then
+        converted to unbinned pixels and the measurement is approximate.
+        """
+        data = ImageMeasurement._plane(data)
+        # Boxes and windows cover the same sky at any binning
+        window = max(3, ImageMeasurement.window // binning)
+        step = ImageMeasurement.backgroundSample
+        background, median = ImageMeasurement._background(data, step, binning)
+        residual = np.subtract(data, background, out=background)
+        noise = ImageMeasurement._noise(residual, step)
+        approximate = binning > 1
+        # Averaging binning x binning pixels divides uncorrelated noise by binning
+        pixelNoise = noise * binning
+        if noise <= 0:
+            return ImageMeasurement(None, None, None, median, pixelNoise, approximate)
+        peaks = ImageMeasurement._peaks(residual, noise)
+        inside = ImageMeasurement._inside(residual.shape, peaks, window)
+        if not np.any(inside):
+            return ImageMeasurement(None, None, None, median, pixelNoise, approximate)
+
+        peak, fwhm, eccentricity = ImageMeasurement._stars(residual, peaks, inside, window, binning)
+        if len(peak) == 0:
+            return ImageMeasurement(None, None, None, median, pixelNoise, approximate)
+        return ImageMeasurement(
+            float(np.median(fwhm)),
+            float(np.median(peak / noise)),
+            float(np.median(eccentricity)),
+            median,
+            pixelNoise,
+            approximate
+        )
+
+    @staticmethod
+    def _plane(data: ndarray) -> ndarray:
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim == 3:
+            # Colour images are measured on the mean of their channels, the shortest axis
+            data = data.mean(axis=int(np.argmin(data.shape)))
+        return data
+
+    @staticmethod
+    def _background(data: ndarray, step: int, binning: int = 1) -> tuple[ndarray, float]:
+        """
+        Background of every pixel, interpolated from the medians of a grid of boxes, and the median
+        background. Boxes are sampled every `step` pixels.
+        """
+        sample = data[::step, ::step]
+        box = max(1, ImageMeasurement.backgroundBox // binning // step)
+        ny, nx = max(1, sample.shape[0] // box), max(1, sample.shape[1] // box)
+        by, bx = sample.shape[0] // ny, sample.shape[1] // nx
+        cells = sample[:ny * by, :nx * bx].reshape(ny, by, nx, bx).transpose(0, 2, 1, 3).reshape(ny, nx, by * bx)
+        cellMedian = np.median(cells, axis=2)
+        # Boxes dominated by a bright star or nebula are replaced by their neighbourhood
+        grid = ndimage.median_filter(cellMedian, size=3, mode='nearest')
+        background = ImageMeasurement._interpolate(grid.astype(np.float32), data.shape)
+        return background, float(np.median(grid))
+
+    @staticmethod
+    def _noise(residual: ndarray, step: int) -> float:
+        """
+        Background noise from the median absolute deviation of the background subtracted pixels,
+        which stars barely move, sampled every `step` pixels.
+        """
+        sample = residual[::step, ::step]
+        return 1.4826 * float(np.median(np.abs(sample - np.median(sample))))
+
+    @staticmethod
+    def _interpolate(grid: ndarray, shape: tuple[int, int]) -> ndarray:
+        """
+        Bilinear interpolation of `grid`, whose values are at the centres of equal boxes covering an
+        image of `shape`. One axis at a time, as two weighted gathers per axis.
+        """
+        def axis(cells: int, size: int) -> tuple[ndarray, ndarray, ndarray]:
+            position = np.clip((np.arange(size, dtype=np.float32) + 0.5) * cells / size - 0.5, 0, cells - 1)
+            lower = np.minimum(position.astype(np.intp), max(cells - 2, 0))
+            upper = np.minimum(lower + 1, cells - 1)
+            return lower, upper, (position - lower).astype(np.float32)
+        lower, upper, fraction = axis(grid.shape[0], shape[0])
+        rows = grid[lower] * (1 - fraction)[:, None] + grid[upper] * fraction[:, None]
+        lower, upper, fraction = axis(grid.shape[1], shape[1])
+        background = rows[:, lower]
+        background *= 1 - fraction
+        background += rows[:, upper] * fraction
+        return background
+
+    @staticmethod
+    def _peaks(residual: ndarray, noise: float) -> tuple[ndarray, ndarray]:
+        """
+        Coordinates of the local maxima above the detection threshold. Only the pixels above the
+        threshold are compared with their neighbours, one neighbour offset at a time for all of
+        them, nearest first, so most candidates are dropped after the first few comparisons.
+        """
+        ys, xs = np.nonzero(residual > ImageMeasurement.threshold * noise)
+        values = residual[ys, xs]
+        r = ImageMeasurement.peakRadius
+        offsets = sorted(((dy, dx) for dy in range(-r, r + 1) for dx in range(-r, r + 1) if dy != 0 or dx != 0), key=lambda offset: offset[0] ** 2 + offset[1] ** 2)
+        for dy, dx in offsets:
+            neighbours = residual[np.clip(ys + dy, 0, residual.shape[0] - 1), np.clip(xs + dx, 0, residual.shape[1] - 1)]
+            maxima = neighbours <= values
+            ys, xs, values = ys[maxima], xs[maxima], values[maxima]
+        return ys, xs
+
+    @staticmethod
+    def _inside(shape: tuple[int, int], peaks: tuple[ndarray, ndarray], window: int) -> ndarray:
+        """
+        Which peaks have windows that fit in the image.
+        """
+        ys, xs = peaks
+        r = window
+        return (ys >= r) & (ys < shape[0] - r) & (xs >= r) & (xs < shape[1] - r)
+
+    @staticmethod
+    def _stars(residual: ndarray, peaks: tuple[ndarray, ndarray], inside: ndarray, window: int, binning: int = 1) -> tuple[ndarray, ndarray, ndarray]:
+        """
+        Peak, FWHM and eccentricity of the stars among the `inside` peaks, from their windows stacked
+        into one array. Hot pixels, cosmic rays and stars with a close neighbour are left out.
+        """
+        # Neighbours would widen the moments
+        isolated = ImageMeasurement._isolated(peaks, window)
+        ys, xs = peaks[0][inside & isolated], peaks[1][inside & isolated]
+        r = window
+        offsets = np.arange(-r, r + 1, dtype=np.float32)
+        index = np.arange(-r, r + 1)
+        stamps = residual[ys[:, None, None] + index[None, :, None], xs[:, None, None] + index[None, None, :]]
+        peak = stamps[:, r, r]
+        stars = np.count_nonzero(stamps >= 0.5 * peak[:, None, None], axis=(1, 2)) >= ImageMeasurement.minStarPixels
+        stamps, peak = stamps[stars], peak[stars]
+        weights = np.where(stamps >= ImageMeasurement.truncation * peak[:, None, None], stamps, 0)
+
+        flux = weights.sum(axis=(1, 2))
+        mx = np.einsum('nij,j->n', weights, offsets) / flux
+        my = np.einsum('nij,i->n', weights, offsets) / flux
+        mxx = np.einsum('nij,j->n', weights, offsets ** 2) / flux - mx ** 2
+        myy = np.einsum('nij,i->n', weights, offsets ** 2) / flux - my ** 2
+        mxy = np.einsum('nij,i,j->n', weights, offsets, offsets) / flux - mx * my
+        # For a Gaussian, the intensity weighted moments above a fraction t of the peak are those of
+        # the full profile times 1 - U t / (1 - t) with U = -ln t
+        t = ImageMeasurement.truncation
+        correction = 1 - (-math.log(t)) * t / (1 - t)
+        mxx, myy, mxy = mxx / correction, myy / correction, mxy / correction
+        if binning > 1:
+            # A binned pixel averages binning samples along each axis, which widens a star by the
+            # variance (binning ** 2 - 1) / 12 of that box, in unbinned pixels
+            scale = binning ** 2
+            mxx = scale * mxx - (scale - 1) / 12
+            myy = scale * myy - (scale - 1) / 12
+            mxy = scale * mxy
+        fwhm, eccentricity = ImageMeasurement._shape(mxx, myy, mxy)
+        return peak, fwhm, eccentricity
+
+    @staticmethod
+    def _isolated(peaks: tuple[ndarray, ndarray], window: int) -> ndarray:
+        """
+        Which peaks have no other peak so close that its light reaches into their window.
+        """
+        points = np.column_stack(peaks)
+        if len(points) < 2:
+            return np.ones(len(points), dtype=bool)
+        # Distance to the nearest other peak along the larger axis, as windows are square
+        distance, _ = cKDTree(points).query(points, k=2, p=np.inf)
+        return distance[:, 1] > window + window // 2
+
+    @staticmethod
+    def _shape(mxx: ndarray, myy: ndarray, mxy: ndarray) -> tuple[ndarray, ndarray]:
+        """
+        FWHM and eccentricity from the second moments of stars, through the eigenvalues of their
+        covariance matrices.
+        """
+        half_trace = (mxx + myy) / 2
+        root = np.sqrt(((mxx - myy) / 2) ** 2 + mxy ** 2)
+        major = np.maximum(half_trace + root, 1e-12)
+        minor = np.clip(half_trace - root, 0, None)
+        fwhm = FWHM_PER_SIGMA * np.sqrt((major + minor) / 2)
+        eccentricity = np.sqrt(1 - minor / major)
+        return fwhm, eccentricity
+
+    def row(self, image_id: int) -> tuple:
+        """
+        The `image_analysis` row of the image with `image_id`.
+        """
+        return (image_id, self.fwhm, self.snr, self.eccentricity, self.median, self.noise, int(self.approximate))
@@ -0,0 +1,110 @@
+from typing import Iterable, Sequence
+from ekosuite.app.AppDB import AppDB
+
+class ImageRecord:
+    """
+    Immutable snapshot of a row in `fits_files`.
+    """
+    COLUMNS = (
+        'id',
+        'filename',
+        'create_time',
+        'lat',
+        'lon',
+        'timezone_offset',
+        'image_width',
+        'image_height',
+        'pixel_size',
+        'scale',
+        'object',
+        'ra',
+        'dec',
+        'instrument',
+        'telescope',
+        'filter',
+        'imagetype',
+        'image_type_generic',
+        'exptime',
+        'focal_length',
+        'temperature',
+        'sensor_temperature',
+        'gain',
+        'bias',
+        'mpsas',
+        'airmass',
+    )
+    __slots__ = COLUMNS
+
+    def __init__(self, row: Sequence):
+        for column, value in zip(self.COLUMNS, row):
+            object.__setattr__(self, column, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __repr__(self) -> str:
+        return f"ImageRecord(id={self.id}, filename={self.filename!r})"
+
+class ImageRecordSession:
+    """
+    Identity map of image records. Each id is loaded from the database at most once per session,
+    and ids registered up front are loaded together with a single query on first access.
+    """
+    # Stay below SQLite's limit of bound parameters per statement
+    _chunkSize = 900
+
+    def __init__(self, db: AppDB):
+        self._db = db
+        self._records: dict[int, ImageRecord] = {}
+        self._pending: dict[int, None] = {}
+
+    def register(self, ids: Iterable[int]):
+        """
+        Marks ids to be loaded in bulk the next time any record is requested.
+        """
+        for id in ids:
+            if id not in self._records:
+                self._pending[id] = None
+
+    def get(self, id: int) -> ImageRecord:
+        record = self._records.get(id)
+        if record is None:
+            self.register([id])
+            self._loadPending()
+            record = self._records.get(id)
+        if record is None:
+            raise ValueError(f"Image with ID {id} not found in database.")
+        return record
+
+    def load(self, ids: Sequence[int]) -> list[ImageRecord]:
+        """
+        Returns the records for `ids` in order, loading all missing ones at once.
+        """
+        self.register(ids)
+        self._loadPending()
+        return [self.get(id) for id in ids]
+
+    def invalidate(self, ids: Iterable[int] | None = None):
+        """
+        Drops cached records so they are reloaded on next access.
+        """
+        if ids is None:
+            self._records.clear()
+            return
+        for id in ids:
+            self._records.pop(id, None)
+
+    def _loadPending(self):
+        pending = list(self._pending)
+        self._pending.clear()
+        columns = ', '.join(ImageRecord.COLUMNS)
+        for i in range(0, len(pending), self._chunkSize):
+            chunk = pending[i:i + self._chunkSize]
+            rows = self._db.fetchall(f"SELECT {columns} FROM fits_files WHERE id IN ({', '.join(['?'] * len(chunk))})", chunk)
+            if isinstance(rows, Exception):
+                raise rows
+            for row in rows:
+                self._records[row[0]] = ImageRecord(row)
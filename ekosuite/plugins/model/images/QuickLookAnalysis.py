@@ -0,0 +1,73 @@
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from ekosuite.app.AppDB import AppDB
+from .Image import Image
+from .ImageAnalysis import IMAGE_ANALYSIS_UPSERT
+from .ImageMeasurement import ImageMeasurement
+
+class QuickLookAnalysis:
+    """
+    Approximate analysis of frames as they arrive, for monitoring a running session.
+
+    Frames are measured uncalibrated on 2x2 or 4x4 binned pixels, which takes a fraction of the
+    time of a full analysis. Results are stored in `image_analysis` marked as approximate, and a
+    later `ImageAnalysis` of the frame replaces them, see `ImageAnalysis.approximated`.
+    """
+    def __init__(self, db: AppDB, binning: int = 2):
+        if binning not in (2, 4):
+            raise ValueError(f"Unsupported binning: {binning}")
+        self._db = db
+        self.binning = binning
+        # One thread, frames are analyzed in the order they arrived
+        self._executor = ThreadPoolExecutor(thread_name_prefix="QuickLookAnalysis", max_workers=1)
+
+    def measure(self, image: Image) -> ImageMeasurement:
+        image_data = image.image_data
+        return ImageMeasurement.measure(image_data.binned(self.binning), binning=self.binning)
+
+    def analyze(self, images: list[Image]) -> list[ImageMeasurement]:
+        """
+        Measures `images` and stores the results of those that are in `fits_files`.
+        """
+        ids = self._imageIds([image.filename for image in images])
+        measurements = []
+        rows = []
+        for image in images:
+            try:
+                measurement = self.measure(image)
+            except Exception as e:
+                print(f"Error measuring {image.filename}: {e}")
+                continue
+            measurements.append(measurement)
+            if image.filename in ids:
+                rows.append(measurement.row(ids[image.filename]))
+        if len(rows) > 0:
+            result = self._db.executemany(IMAGE_ANALYSIS_UPSERT, rows)
+            if isinstance(result, Exception):
+                raise result
+        return measurements
+
+    def submit(self, images: list[Image]) -> Future:
+        """
+        Analyzes `images` on the quick look thread. Errors are reported there and kept in the future.
+        """
+        return self._executor.submit(self._analyzeReporting, images)
+
+    def _analyzeReporting(self, images: list[Image]) -> list[ImageMeasurement]:
+        try:
+            return self.analyze(images)
+        except Exception as e:
+            print(f"Error in the quick look of {len(images)} images: {e}")
+            raise
+
+    def stop(self):
+        self._executor.shutdown(wait=True)
+
+    def _imageIds(self, filenames: list[str]) -> dict[str, int]:
+        if len(filenames) == 0:
+            return {}
+        # One bound parameter however many frames arrived together
+        rows = self._db.fetchall("SELECT filename, id FROM fits_files WHERE filename IN (SELECT value FROM json_each(?))", (json.dumps(filenames),))
+        if isinstance(rows, Exception):
+            raise rows
+        return dict(rows)
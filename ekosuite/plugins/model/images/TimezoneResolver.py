@@ -0,0 +1,59 @@
+import threading
+from datetime import datetime
+from functools import lru_cache
+from timezonefinder import TimezoneFinder
+from pytz import timezone, utc
+
+class TimezoneResolver:
+    """
+    Process-wide timezone lookup for image coordinates.
+
+    Coordinates are rounded before lookup, so frames from the same observatory share one cached
+    timezone and `TimezoneFinder` loads its polygon data only once.
+    """
+    _shared: "TimezoneResolver | None" = None
+    _sharedLock = threading.Lock()
+
+    def __init__(self, precision: int = 2):
+        self._precision = precision
+        self._finder: TimezoneFinder | None = None
+        self._finderLock = threading.Lock()
+        self._zoneAt = lru_cache(maxsize=4096)(self._lookupZone)
+        self._offsetAt = lru_cache(maxsize=16384)(self._lookupOffset)
+
+    @classmethod
+    def shared(cls) -> "TimezoneResolver":
+        with cls._sharedLock:
+            if cls._shared is None:
+                cls._shared = TimezoneResolver()
+            return cls._shared
+
+    def _lookupZone(self, latitude: float, longitude: float) -> str | None:
+        with self._finderLock:
+            if self._finder is None:
+                self._finder = TimezoneFinder()
+            return self._finder.timezone_at(lat=latitude, lng=longitude)
+
+    @staticmethod
+    def _lookupOffset(zone: str, at: datetime) -> float:
+        return utc.localize(at).astimezone(timezone(zone)).utcoffset().total_seconds() / 3600
+
+    def zone(self, latitude: float, longitude: float) -> str | None:
+        """
+        Returns the name of the timezone at the given location or None if there is none
+        """
+        return self._zoneAt(round(float(latitude), self._precision), round(float(longitude), self._precision))
+
+    def offset(self, latitude: float, longitude: float, at: datetime | None = None) -> float | None:
+        """
+        Returns the UTC offset in hours at the given location and UTC time (now if omitted)
+        """
+        zone = self.zone(latitude, longitude)
+        if zone is None:
+            return None
+        if at is None:
+            at = datetime.now(utc)
+        if at.tzinfo is not None:
+            at = at.astimezone(utc).replace(tzinfo=None)
+        # Timezone transitions happen on quarter hours, so all frames of a quarter hour share one lookup
+        return self._offsetAt(zone, at.replace(minute=at.minute - at.minute % 15, second=0, microsecond=0))
@@ -0,0 +1,108 @@
+import xml.etree.ElementTree as ET
+import numpy as np
+from xisf import XISF
+
+SIGNATURE = b"XISF0100"
+XISF_NAMESPACE = "{http://www.pixinsight.com/xisf}"
+_IMAGE_END = b"</Image>"
+# Header bytes read at once while looking for the end of the first image
+_chunkSize = 64 * 1024
+# Sample formats by their canonical and alternate names
+_SAMPLE_FORMATS = {
+    "UInt8": np.dtype("uint8"), "Byte": np.dtype("uint8"),
+    "UInt16": np.dtype("uint16"), "UShort": np.dtype("uint16"),
+    "UInt32": np.dtype("uint32"), "UInt": np.dtype("uint32"),
+    "Float32": np.dtype("float32"), "Float": np.dtype("float32"),
+    "Float64": np.dtype("float64"), "Double": np.dtype("float64"),
+}
+
+def read_xisf_header(path: str) -> dict:
+    """
+    Reads the metadata of the first image in a monolithic XISF file without touching its data
+    blocks. The XML header is read in chunks and only parsed up to the end of the first `Image`,
+    so properties, thumbnails and further images that follow it are skipped.
+
+    Returns a dict like `XISF.get_images_metadata()[0]` with the image's 'geometry', 'location',
+    'dtype', optional 'compression' and 'FITSKeywords'. XISF properties are not parsed.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(SIGNATURE)) != SIGNATURE:
+            raise ValueError(f"Not a XISF file: {path}")
+        remaining = int.from_bytes(f.read(4), byteorder="little")
+        f.read(4)  # Reserved
+
+        header = b""
+        end = -1
+        while remaining > 0 and end < 0:
+            chunk = f.read(min(_chunkSize, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            # The closing tag may straddle chunks
+            start = max(0, len(header) - len(_IMAGE_END))
+            header += chunk
+            end = header.find(_IMAGE_END, start)
+
+        root = None
+        if end >= 0:
+            try:
+                # Close the root element right after the first image. The C parser is several times
+                # faster than walking the elements with a pull parser.
+                root = ET.fromstring(header[:end + len(_IMAGE_END)] + b"</xisf>")
+            except ET.ParseError:
+                pass
+        if root is None:
+            # Unusual layout, parse the complete header like the xisf package does
+            header += f.read(remaining)
+            root = ET.fromstring(header.rstrip(b"\0"))
+
+    image = root.find(XISF_NAMESPACE + "Image")
+    if image is None:
+        raise ValueError(f"XISF header has no image: {path}")
+    fits_keywords = {}
+    for keyword in image.iterfind(XISF_NAMESPACE + "FITSKeyword"):
+        # Same normalization as the xisf package, values stay strings
+        fits_keywords.setdefault(keyword.attrib["name"], []).append({
+            "value": keyword.attrib["value"].strip("'").strip(" "),
+            "comment": keyword.attrib.get("comment", ""),
+        })
+    return _imageMetadata(image.attrib, fits_keywords)
+
+def _imageMetadata(attributes: dict, fits_keywords: dict) -> dict:
+    # The attribute formats of the XISF 1.0 specification, parsed into the values the xisf package uses
+    location = attributes["location"].split(":")
+    if location[0] not in ("inline", "embedded", "attachment"):
+        raise ValueError(f"Unknown XISF data block location: {attributes['location']}")
+    if attributes["sampleFormat"] not in _SAMPLE_FORMATS:
+        raise ValueError(f"Unsupported XISF sample format: {attributes['sampleFormat']}")
+    metadata = {
+        **attributes,
+        "geometry": tuple(int(size) for size in attributes["geometry"].split(":")),
+        "location": (location[0], int(location[1]), int(location[2])) if location[0] == "attachment" else location,
+        "dtype": _SAMPLE_FORMATS[attributes["sampleFormat"]],
+        "FITSKeywords": fits_keywords,
+    }
+    if "compression" in attributes:
+        # codec, uncompressed size and, with byte shuffling, the item size
+        compression = attributes["compression"].split(":")
+        metadata["compression"] = (compression[0], int(compression[1]), int(compression[2]) if len(compression) == 3 else None)
+    return metadata
+
+def read_xisf_image(path: str, metadata: dict) -> np.ndarray:
+    """
+    Reads the pixels of the image described by `metadata` from `read_xisf_header`, in the
+    channels last layout of `XISF.read_image`. Uncompressed attachments are memory mapped, other
+    images are read with the xisf package.
+    """
+    method = metadata["location"][0]
+    if method != "attachment" or "compression" in metadata:
+        # Inline and embedded blocks live in the XML header and compressed blocks are decoded
+        # completely anyway, leave them to the xisf package
+        return XISF(path).read_image(0)
+    _, position, _ = metadata["location"]
+    width, height, channels = metadata["geometry"]
+    dtype = np.dtype(metadata["dtype"])
+    if metadata.get("byteOrder") == "big":
+        dtype = dtype.newbyteorder('>')
+    pixels = np.memmap(path, dtype=dtype, mode='r', offset=position, shape=(channels, height, width))
+    return np.transpose(pixels, (1, 2, 0))
@@ -1,7 +1,6 @@
-from xisf import XISF
-
 from .Image import Image
 from .ImageData import ImageData
+from .XISFHeader import read_xisf_header, read_xisf_image
 from datetime import datetime
 
 class XISFImage(Image):
@@ -11,7 +10,9 @@ class XISFImage(Image):
     """
     def __init__(self, source: str):
         self._source = source
-        self._header = XISF(self._source).get_images_metadata()[0]['FITSKeywords']
+        # Parsed once, pixel reads locate the data block from it
+        self._metadata = read_xisf_header(self._source)
+        self._header = self._metadata['FITSKeywords']
     
     def _fetchValue(self, key: str, default: any = None) -> any:
         values = self._header.get(key)
@@ -21,8 +22,9 @@ class XISFImage(Image):
     
     @property
     def image_data(self) -> ImageData:
-        image_data = XISF(self._source).read_image(0)
-        return ImageData(image_data)
+        if not hasattr(self, '_image_data'):
+            self._image_data = ImageData(read_xisf_image(self._source, self._metadata))
+        return self._image_data
     
     @property
     def mpsas(self) -> float:
@@ -0,0 +1,196 @@
+import os
+import time
+from typing import Iterable, Iterator
+from ekosuite.app.AppDB import AppDB
+
+IMAGE_EXTENSIONS = ('.fit', '.fits', '.xisf')
+
+def _subtree(path: str) -> tuple[str, str]:
+    """
+    Bounds of the paths below `path`, for a range scan on an indexed path column.
+    """
+    prefix = path if path.endswith(os.sep) else path + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+class ManifestScan:
+    """
+    A scan of the image files below `root` that are new or changed since the last committed scan.
+    Iterating the scan walks the tree lazily and yields the files that have to be read.
+
+    The manifest only learns about a file once it is passed to `FileManifest.commit`, so files are
+    looked at again if ingesting them is interrupted.
+    """
+    def __init__(self, manifest: "FileManifest", root: str, verify: bool):
+        self.root = root
+        self.verify = verify
+        self.listedDirectories = 0
+        self.skippedDirectories = 0
+        self._manifest = manifest
+        # Entries of files that still have to be read, by path
+        self._files: dict[str, tuple] = {}
+        # Entries of files that need no reading and can be recorded right away
+        self._knownFiles: list[tuple] = []
+        self._removedFiles: list[str] = []
+        self._directories: list[tuple] = []
+        self._removedDirectories: list[str] = []
+
+    def __iter__(self) -> Iterator[str]:
+        return self._manifest._walk(self)
+
+class FileManifest:
+    """
+    Persisted (size, mtime, inode) of every scouted image file and the mtime of every scouted directory.
+
+    Directories whose mtime did not change are not listed again, only their known subdirectories are
+    visited. Files in listed directories are read again if their size, mtime or inode changed, which
+    covers files that were replaced or rewritten.
+    """
+    # Directories modified this shortly before they were listed are listed again on the next scan,
+    # since further changes within the file system's mtime granularity would not change their mtime.
+    settleTime = 2.0
+    # Stay below SQLite's limit of bound parameters per statement
+    _chunkSize = 900
+
+    def __init__(self, db: AppDB):
+        self._db = db
+
+    def scan(self, foldername: str, verify: bool = False) -> ManifestScan:
+        """
+        Starts a scan of `foldername`. With `verify`, files in unchanged directories are checked as well,
+        which catches files that were modified in place.
+        """
+        return ManifestScan(self, foldername.rstrip(os.sep) or os.sep, verify)
+
+    def commit(self, scan: ManifestScan, paths: Iterable[str] | None = None):
+        """
+        Records the state of the files in `paths` once they are ingested. Without `paths`, records
+        everything `scan` has seen, which completes the scan.
+        """
+        if paths is None:
+            files = list(scan._files.values())
+            scan._files.clear()
+        else:
+            files = [scan._files.pop(path) for path in paths if path in scan._files]
+        files.extend(scan._knownFiles)
+        scan._knownFiles = []
+        with self._db.transaction() as tx:
+            tx.executemany("INSERT OR REPLACE INTO file_manifest (path, directory, size, mtime_ns, inode) VALUES (?, ?, ?, ?, ?)", files)
+            if paths is not None:
+                return
+            for path in scan._removedDirectories:
+                prefix, end = _subtree(path)
+                tx.execute("DELETE FROM directory_manifest WHERE path = ? OR (path >= ? AND path < ?)", (path, prefix, end))
+                tx.execute("DELETE FROM file_manifest WHERE directory = ? OR (directory >= ? AND directory < ?)", (path, prefix, end))
+            tx.executemany("DELETE FROM file_manifest WHERE path = ?", [(path,) for path in scan._removedFiles])
+            # Directories come last, so an interrupted scan lists them again
+            tx.executemany("INSERT OR REPLACE INTO directory_manifest (path, parent, mtime_ns) VALUES (?, ?, ?)", scan._directories)
+
+    def _walk(self, scan: ManifestScan) -> Iterator[str]:
+        root = scan.root
+        if not os.path.isdir(root):
+            # Unmounted drives keep their manifest
+            return
+
+        prefix, end = _subtree(root)
+        rows = self._fetchall("SELECT path, parent, mtime_ns FROM directory_manifest WHERE path = ? OR (path >= ? AND path < ?)", (root, prefix, end))
+        directories = {}
+        children: dict[str, list[str]] = {}
+        for path, parent, mtime_ns in rows:
+            directories[path] = mtime_ns
+            children.setdefault(parent, []).append(path)
+
+        settled = time.time_ns() - int(self.settleTime * 1e9)
+        stack = [root]
+        while len(stack) > 0:
+            path = stack.pop()
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                scan._removedDirectories.append(path)
+                continue
+            if mtime_ns == directories.get(path):
+                scan.skippedDirectories += 1
+                stack.extend(children.get(path, []))
+                if scan.verify:
+                    yield from self._verifyDirectory(path, scan)
+                continue
+            subdirectories, changed = self._listDirectory(path, scan)
+            stack.extend(subdirectories)
+            for child in set(children.get(path, [])) - set(subdirectories):
+                scan._removedDirectories.append(child)
+            scan._directories.append((path, os.path.dirname(path), mtime_ns if mtime_ns < settled else None))
+            yield from changed
+
+    def _listDirectory(self, path: str, scan: ManifestScan) -> tuple[list[str], list[str]]:
+        scan.listedDirectories += 1
+        known = {row[0]: tuple(row[1:]) for row in self._fetchall("SELECT path, size, mtime_ns, inode FROM file_manifest WHERE directory = ?", (path,))}
+        subdirectories = []
+        changed = []
+        unknown = []
+        seen = set()
+        try:
+            entries = list(os.scandir(path))
+        except OSError as e:
+            print(f"Error listing {path}: {e}")
+            return subdirectories, changed
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    # Like os.walk, do not descend into symlinked directories
+                    if not entry.is_symlink():
+                        subdirectories.append(entry.path)
+                    continue
+                if not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            seen.add(entry.path)
+            signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            previous = known.get(entry.path)
+            if previous == signature:
+                continue
+            scan._files[entry.path] = (entry.path, path, *signature)
+            if previous is None:
+                unknown.append(entry.path)
+            else:
+                changed.append(entry.path)
+        ingested = self._ingested(unknown)
+        for file in unknown:
+            if file in ingested:
+                scan._knownFiles.append(scan._files.pop(file))
+            else:
+                changed.append(file)
+        scan._removedFiles.extend(set(known) - seen)
+        return subdirectories, changed
+
+    def _verifyDirectory(self, path: str, scan: ManifestScan) -> Iterator[str]:
+        for file, size, mtime_ns, inode in self._fetchall("SELECT path, size, mtime_ns, inode FROM file_manifest WHERE directory = ?", (path,)):
+            try:
+                stat = os.stat(file)
+            except OSError:
+                scan._removedFiles.append(file)
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            if signature != (size, mtime_ns, inode):
+                scan._files[file] = (file, path, *signature)
+                yield file
+
+    def _ingested(self, paths: list[str]) -> set[str]:
+        """
+        Files among `paths` that were ingested without a manifest entry, by scouts that predate the
+        manifest or by the folder watcher.
+        """
+        ingested = set()
+        for i in range(0, len(paths), self._chunkSize):
+            chunk = paths[i:i + self._chunkSize]
+            placeholders = ', '.join(['?'] * len(chunk))
+            for table in ('fits_files', 'analyzed_files'):
+                ingested.update(row[0] for row in self._fetchall(f"SELECT filename FROM {table} WHERE filename IN ({placeholders})", chunk))
+        return ingested
+
+    def _fetchall(self, query: str, params) -> list[tuple]:
+        rows = self._db.fetchall(query, params)
+        if isinstance(rows, Exception):
+            raise rows
+        return rows
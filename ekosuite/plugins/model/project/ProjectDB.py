@@ -1,30 +1,58 @@
 from datetime import datetime
 import json
 import time
-from typing import Callable, Iterable
-from ekosuite.app.AppDB import AppDB
+from typing import Callable, Iterable, Iterator, Sequence
+from ekosuite.app.AppDB import AppDB, Transaction
 from ekosuite.plugins.model.images.FITSImage import FITSImage
+from ekosuite.plugins.model.images.FITSHeader import read_fits_row
 from ekosuite.plugins.model.images.Image import Image
 from ekosuite.plugins.model.images.XISFImage import XISFImage
 from .ImagingProject import ImagingProject
 from .ImagingTarget import ImagingTarget
 from .NightSession import NightSession
+from .FileManifest import FileManifest, ManifestScan
 from ekosuite.plugins.model.images.DBImage import DBImage
+from ekosuite.plugins.model.images.ImageRecord import ImageRecordSession
 from sqlite3 import Cursor, Row
 import os
 import asyncio
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+SCOUT_BACKENDS = ('threads', 'processes')
+
+def _readImageChunk(paths: list[str]) -> list[tuple[str, tuple | None]]:
+    """
+    Process pool worker. Reads a chunk of files and returns plain tuples, so a whole chunk crosses
+    the process boundary in one message.
+    """
+    return [(path, FileReader._readImage(path)) for path in paths]
 
 class FileReader:
-    def __init__(self):
-        self.executor = ThreadPoolExecutor(thread_name_prefix="FileReader", max_workers=os.cpu_count())  # Limit threads
-        self.lock = threading.Lock()
-        self.futures = []
-        self.analyzed_files = []
+    # Files handed to a worker process at once, to amortize pickling and IPC per file
+    processChunkSize = 64
+
+    def __init__(self, maxWorkers: int = os.cpu_count() or 1, backend: str = 'threads'):
+        self.executor = ThreadPoolExecutor(thread_name_prefix="FileReader", max_workers=maxWorkers)  # Limit threads
+        self.maxWorkers = maxWorkers
+        # Files read ahead of the consumer, enough to keep every worker busy
+        self.maxInFlight = 4 * maxWorkers
+        # Header parsing holds the GIL, so threads stop scaling after a few workers. Processes
+        # scale with the cores but cost a start up and don't share the timezone cache.
+        self.backend = backend
+        self._processExecutor: ProcessPoolExecutor | None = None
+        self._processLock = threading.Lock()
 
-    def _readImage(self, path: str):
-        image = self._getFits(path)
+    @staticmethod
+    def _readImage(path: str):
+        if not path.lower().endswith('.xisf'):
+            try:
+                return read_fits_row(path)
+            except Exception:
+                # Fall back to the full reader, which reports what is wrong with the file
+                pass
+        image = FileReader._getFits(path)
         if image is None:
             return None
         try:
@@ -57,7 +85,8 @@ class FileReader:
         except Exception as e:
             return None
     
-    def _getFits(self, path: str) -> Image | None:
+    @staticmethod
+    def _getFits(path: str) -> Image | None:
         result = None
         try:
             if path.lower().endswith('.xisf'):
@@ -70,23 +99,161 @@ class FileReader:
         finally:
             return result
 
-    def scout(self, foldername: str, known_files: set, progress: Callable[[float], None]) -> list[threading.Thread]:
-        """Recursively scan directories and submit file reading tasks."""
-        print(f"Scouting folder: {foldername}")
+    def read(self, paths: Iterable[str]) -> Iterator[tuple[str, tuple | None]]:
+        """
+        Reads `paths` on the thread or process pool and yields (path, row) as reads complete. Paths
+        are only pulled from the iterable while fewer than `maxInFlight` files are pending, so neither
+        discovery nor results run ahead of the consumer.
+        """
+        if self.backend == 'processes':
+            return self._stream(self._processes(), _readImageChunk, self._chunks(paths, self.processChunkSize), self.maxInFlight // self.processChunkSize + self.maxWorkers)
+        return self._stream(self.executor, lambda path: [(path, self._readImage(path))], paths, self.maxInFlight)
+
+    def _stream(self, executor: Executor, work: Callable, items: Iterable, maxInFlight: int) -> Iterator[tuple[str, tuple | None]]:
+        inFlight = set()
+        for item in items:
+            if len(inFlight) >= maxInFlight:
+                done, inFlight = wait(inFlight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+            inFlight.add(executor.submit(work, item))
+        while len(inFlight) > 0:
+            done, inFlight = wait(inFlight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+    @staticmethod
+    def _chunks(paths: Iterable[str], size: int) -> Iterator[list[str]]:
+        chunk = []
+        for path in paths:
+            chunk.append(path)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if len(chunk) > 0:
+            yield chunk
+
+    def _processes(self) -> ProcessPoolExecutor:
+        with self._processLock:
+            if self._processExecutor is None:
+                # Spawn rather than fork, the app's DB and UI threads must not be copied into workers
+                self._processExecutor = ProcessPoolExecutor(max_workers=self.maxWorkers, mp_context=multiprocessing.get_context('spawn'))
+            return self._processExecutor
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self._processLock:
+            if self._processExecutor is not None:
+                self._processExecutor.shutdown(wait=False, cancel_futures=True)
+                self._processExecutor = None
 
-        for root, _, files in os.walk(foldername):
-            for file in files:
-                filepath = os.path.join(root, file)
-                if file.lower().endswith(('.fit', '.fits', '.xisf')) and filepath not in known_files:
-                    # Submit the file reading task to the thread pool
-                    future = self.executor.submit(self._readImage, filepath)
-                    with self.lock:
-                        self.futures.append(future)
-                        self.analyzed_files.append(filepath)
+FITS_FILE_INSERT = """
+INSERT INTO fits_files (
+    filename,
+    create_time,
+    lat,
+    lon,
+    timezone_offset,
+    image_width,
+    image_height,
+    pixel_size,
+    scale,
+    object,
+    ra,
+    dec,
+    instrument,
+    telescope,
+    filter,
+    imagetype,
+    exptime,
+    focal_length,
+    temperature,
+    sensor_temperature,
+    gain,
+    bias,
+    mpsas,
+    airmass
+) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+-- Files that changed on disk are read again and replace their row, keeping its id
+ON CONFLICT (filename) DO UPDATE SET
+    create_time = excluded.create_time,
+    lat = excluded.lat,
+    lon = excluded.lon,
+    -- Keep the timezone backfilled for frames without location
+    timezone_offset = IFNULL(excluded.timezone_offset, fits_files.timezone_offset),
+    image_width = excluded.image_width,
+    image_height = excluded.image_height,
+    pixel_size = excluded.pixel_size,
+    scale = excluded.scale,
+    object = excluded.object,
+    ra = excluded.ra,
+    dec = excluded.dec,
+    instrument = excluded.instrument,
+    telescope = excluded.telescope,
+    filter = excluded.filter,
+    imagetype = excluded.imagetype,
+    exptime = excluded.exptime,
+    focal_length = excluded.focal_length,
+    temperature = excluded.temperature,
+    sensor_temperature = excluded.sensor_temperature,
+    gain = excluded.gain,
+    bias = excluded.bias,
+    mpsas = excluded.mpsas,
+    airmass = excluded.airmass
+"""
 
-        return self.futures
+TIMEZONE_BACKFILL = """
+WITH written AS (
+    -- Frames the write inserted or updated, given as a JSON array of file names. Upserts keep the
+    -- ids of rows that existed, so these cannot be told apart by id.
+    SELECT fits_files.id, fits_files.instrument, fits_files.create_time, fits_files.timezone_offset
+    FROM json_each(:filenames) AS written_file
+    JOIN fits_files ON fits_files.filename = written_file.value
+), candidates AS (
+    -- Written frames without timezone
+    SELECT id FROM written
+    WHERE timezone_offset IS NULL
+    UNION
+    -- Other frames without timezone that a written frame with timezone can now serve
+    SELECT candidate.id
+    FROM written AS new
+    JOIN fits_files AS candidate
+        ON candidate.instrument = new.instrument
+        AND candidate.create_time BETWEEN DATETIME(new.create_time, '-12 hours') AND DATETIME(new.create_time, '+12 hours')
+    WHERE new.timezone_offset IS NOT NULL
+        AND candidate.timezone_offset IS NULL
+), nearest AS (
+    SELECT
+        target.id AS id,
+        source.timezone_offset AS timezone_offset,
+        ROW_NUMBER() OVER (
+            PARTITION BY target.id
+            ORDER BY ABS(JULIANDAY(source.create_time) - JULIANDAY(target.create_time))
+        ) AS distance_rank
+    FROM candidates
+    JOIN fits_files AS target
+        ON target.id = candidates.id
+    JOIN fits_files AS source
+        ON source.instrument = target.instrument
+        AND source.create_time BETWEEN DATETIME(target.create_time, '-12 hours') AND DATETIME(target.create_time, '+12 hours')
+    WHERE source.timezone_offset IS NOT NULL
+        AND (source.telescope IS target.telescope OR target.image_type_generic NOT IN ('FLAT', 'MASTER FLAT'))
+        AND (source.filter IS target.filter OR target.image_type_generic IN ('DARK', 'MASTER DARK', 'BIAS', 'MASTER BIAS'))
+)
+UPDATE fits_files
+SET timezone_offset = nearest.timezone_offset
+FROM nearest
+WHERE nearest.id = fits_files.id
+    AND nearest.distance_rank = 1;
+"""
+
+# The backfill, returning the ids of the frames that got a timezone
+TIMEZONE_BACKFILL_RETURNING = TIMEZONE_BACKFILL.rstrip().removesuffix(";") + "\nRETURNING fits_files.id;\n"
 
 class ProjectDB:
+    # Number of scouted images that are written to the DB in one transaction
+    scoutChunkSize = 500
+
     def __init__(self, db: AppDB):
         self._db = db
         self._mainThread = None
@@ -94,10 +261,12 @@ class ProjectDB:
         self._fileReadLoop = None
         self._fileReadThread = None
         self._fileReader = FileReader()
+        self._manifest = FileManifest(db)
     
     def __del__(self):
         if self._fileReadThread:
             self._fileReadThread.join()
+        self._fileReader.shutdown()
 
     def allProjectNames(self) -> list[str]:
         """
@@ -115,38 +284,54 @@ class ProjectDB:
             return ImagingProject(row[0], row[1], target, sessions)
         return None
     
-    async def insertImage(self, image: Image):
-        await self._insertImagesToDb(
-            [
-                (
-                    image.filename, 
-                    image.create_time, 
-                    image.latitude,
-                    image.longitude,
-                    image.timezone_offset,
-                    image.image_width, 
-                    image.image_height, 
-                    image.pixel_size, 
-                    image.scale, 
-                    image.object, 
-                    image.ra, 
-                    image.dec, 
-                    image.instrument,
-                    image.telescope,
-                    image.filter, 
-                    image.imagetype, 
-                    image.exptime, 
-                    image.focal_length, 
-                    image.temperature, 
-                    image.sensor_temperature, 
-                    image.gain, 
-                    image.bias, 
-                    image.mpsas, 
-                    image.airmass
-                )
-            ]
+    def insertImages(self, images: list[Image]) -> list[int]:
+        """
+        Inserts `images` and backfills calibration frame timezones in one transaction, so the rows
+        are committed when this returns. Returns the ids of the inserted or updated frames and of
+        older frames that got a timezone.
+        """
+        if len(images) == 0:
+            return []
+        rows = [self._imageRow(image) for image in images]
+        with self._db.transaction() as tx:
+            tx.executemany(FITS_FILE_INSERT, rows)
+            written = self._writtenIds(tx, rows)
+            backfilled = tx.fetchall(TIMEZONE_BACKFILL_RETURNING, {"filenames": json.dumps([row[0] for row in rows])})
+        return list(dict.fromkeys(row[0] for row in written + backfilled))
+
+    @staticmethod
+    def _writtenIds(tx: Transaction, rows: list[tuple]) -> list:
+        # Upserts keep the ids of rows that existed, so ids are looked up by filename
+        return tx.fetchall("SELECT id FROM fits_files WHERE filename IN (SELECT value FROM json_each(?)) ORDER BY id", (json.dumps([row[0] for row in rows]),))
+
+    @staticmethod
+    def _imageRow(image: Image) -> tuple:
+        return (
+            image.filename, 
+            image.create_time, 
+            image.latitude,
+            image.longitude,
+            image.timezone_offset,
+            image.image_width, 
+            image.image_height, 
+            image.pixel_size, 
+            image.scale, 
+            image.object, 
+            image.ra, 
+            image.dec, 
+            image.instrument,
+            image.telescope,
+            image.filter, 
+            image.imagetype, 
+            image.exptime, 
+            image.focal_length, 
+            image.temperature, 
+            image.sensor_temperature, 
+            image.gain, 
+            image.bias, 
+            image.mpsas, 
+            image.airmass
         )
-        self._udpateCalibrationFrameTimezones()
 
     def _getImagingTarget(self, targetId: int) -> ImagingTarget | None:
         cursor: Cursor = self._db.execute("SELECT id, object, ra, dec FROM imaging_targets WHERE id=?", (targetId,))
@@ -170,6 +355,7 @@ class ProjectDB:
 
         session_map = {}
         session_order = []
+        records = ImageRecordSession(self._db)
         for row in rows:
             session_id = row[1]
             image_id = row[2]
@@ -177,117 +363,94 @@ class ProjectDB:
                 if session_id not in session_map:
                     session_order.append(session_id)
                     session_map[session_id] = NightSession(row[3], [])
-                session_map[session_id].images.append(DBImage(image_id, self._db))
+                session_map[session_id].images.extend(DBImage.load([image_id], self._db, records))
         return list(map(lambda session_id: session_map[session_id], session_order))
 
-    async def scout(self, foldername: str, progress):
+    async def scout(self, foldername: str, progress, verify: bool = False, onInserted: Callable[[list[int]], None] | None = None):
+        """
+        Ingests the image files below `foldername` that are new or changed since the last scout.
+        With `verify`, files in directories that did not change are checked as well. `onInserted`
+        is called with the ids of every committed chunk of frames, and of the frames that got a
+        timezone at the end.
+        """
         start_time = datetime.now()
         print(f"Searching for files in {foldername}")
-        all_files = self._db.execute("""
-            SELECT filename FROM analyzed_files
-            UNION
-            SELECT filename FROM fits_files
-        """).fetchall()
-        if all_files is None:
-            known_files = set()
-        else:
-            known_files = set(map(lambda f: f[0], all_files))
+        scan = self._manifest.scan(foldername, verify)
+        self._fileReader.backend = self.scoutBackend
 
-        # futures = self._scout(foldername, known_files, progress)
-        self._fileReader.futures = []
-        self._fileReader.analyzed_files = []
-        futures = self._fileReader.scout(foldername, known_files, progress)
-        print(f"{datetime.now() - start_time}: Aggregated list of {len(futures)} files. Analyzing ...")
+        # Discovery, reading and inserting are interleaved: the scan is walked lazily, and every
+        # `scoutChunkSize` read files are written together with their manifest entries
         fits_files = []
+        analyzed_files = []
+        written = []
+        complete = True
         i = 0
-        start_time = datetime.now()
-        if len(futures) > 0:
-            chunk_size = 1
-            for future in as_completed(futures):
-                result = future.result()
-                if result:
-                    fits_files.append(result)
-                i = i + 1
-                print(f"\r{(datetime.now() - start_time)}: Progress: {(i / len(futures) * 100):.2f} percent", end="")
-                if (len(fits_files) > 0 and len(fits_files) % chunk_size == 0) or i == len(futures):
-                    await self._insertImagesToDb(fits_files)
-                    self._udpateCalibrationFrameTimezones()
-                    # print(f"\n{(datetime.now() - start_time)}: Inserted chunk of {len(fits_files)} images to DB")
-                    fits_files = []
-        
-        if len(self._fileReader.analyzed_files) > 0:
-            self._db.execute("INSERT OR IGNORE INTO analyzed_files (filename) VALUES " + ",".join(["(?)"] * len(self._fileReader.analyzed_files)), self._fileReader.analyzed_files)
+        for path, result in self._fileReader.read(scan):
+            if result:
+                fits_files.append(result)
+                written.append(result[0])
+            analyzed_files.append(path)
+            i = i + 1
+            print(f"\r{(datetime.now() - start_time)}: Read {i} files", end="")
+            if len(analyzed_files) >= self.scoutChunkSize:
+                complete = await self._insertScoutedChunk(scan, fits_files, analyzed_files, onInserted) and complete
+                fits_files = []
+                analyzed_files = []
+        complete = await self._insertScoutedChunk(scan, fits_files, analyzed_files, onInserted) and complete
 
-    async def _insertImagesToDb(self, images: list):
-        if len(images) == 0:
-            return
-        # Build the SQL statement with multiple rows in the VALUES clause
-        sql = """
-        INSERT OR FAIL INTO fits_files (
-            filename,
-            create_time,
-            lat,
-            lon,
-            timezone_offset,
-            image_width,
-            image_height,
-            pixel_size,
-            scale,
-            object,
-            ra,
-            dec,
-            instrument,
-            telescope,
-            filter,
-            imagetype,
-            exptime,
-            focal_length,
-            temperature,
-            sensor_temperature,
-            gain,
-            bias,
-            mpsas,
-            airmass
-        ) VALUES
-        """ + ",".join(["(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)"] * len(images))
-        
-        # Flatten the list of tuples for parameter substitution
-        values = [
-            item
-            for image in images
-            for item in image
-        ]
+        # One backfill for everything this scout wrote
+        backfilled = self._udpateCalibrationFrameTimezones(written)
+        if len(backfilled) > 0 and onInserted is not None:
+            onInserted(backfilled)
+        if complete:
+            self._manifest.commit(scan)
+        else:
+            # Without their directories, the files that failed are read again by the next scout
+            print(f"\nNot all files below {foldername} were inserted, they are scouted again next time")
+        print(f"\n{datetime.now() - start_time}: Read {i} files, listed {scan.listedDirectories} directories, skipped {scan.skippedDirectories} unchanged")
 
+    async def _insertScoutedChunk(self, scan: ManifestScan, images: list, analyzed_files: list[str], onInserted: Callable[[list[int]], None] | None = None) -> bool:
+        """
+        Inserts a chunk of scouted files, records them in the manifest and passes the ids of its
+        frames to `onInserted`. A chunk that fails is left out of the manifest, and `False` is returned.
+        """
         try:
-            self._db.execute(sql, values)
+            ids = await self._insertImagesToDb(images, analyzed_files)
         except Exception as e:
-            print(e)
-        finally:
-            return
-    
-    def _udpateCalibrationFrameTimezones(self):
-        statement = """
-        UPDATE fits_files
-        SET timezone_offset = (
-            SELECT source.timezone_offset
-                FROM fits_files AS source
-                WHERE source.create_time BETWEEN DATETIME(create_time, '-12 hours') 
-                    AND DATETIME(create_time, '+12 hours')
-                    AND source.timezone_offset IS NOT NULL
-                    AND source.instrument = instrument
-                    AND (source.telescope = telescope OR image_type_generic NOT IN ('FLAT', 'MASTER FLAT'))
-                    AND (source.filter = filter OR image_type_generic IN ('DARK', 'MASTER DARK', 'BIAS', 'MASTER BIAS'))
-                ORDER BY ABS(DATETIME(source.create_time) - DATETIME(create_time))
-                LIMIT 1
-        )
-        WHERE timezone_offset IS NULL;
+            print(f"\nError inserting {len(analyzed_files)} scouted files: {e}")
+            return False
+        self._manifest.commit(scan, analyzed_files)
+        if len(ids) > 0 and onInserted is not None:
+            onInserted(ids)
+        return True
+
+    async def _insertImagesToDb(self, images: list, analyzed_files: Sequence[str] = ()) -> list[int]:
+        """
+        Inserts the rows `images` and returns the ids of the inserted or updated frames.
+        """
+        if len(images) == 0 and len(analyzed_files) == 0:
+            return []
+        # One statement per row, but a single transaction and commit for the whole chunk
+        with self._db.transaction() as tx:
+            tx.executemany(FITS_FILE_INSERT, images)
+            tx.executemany("INSERT OR IGNORE INTO analyzed_files (filename) VALUES (?)", [(filename,) for filename in analyzed_files])
+            written = self._writtenIds(tx, images)
+        return [row[0] for row in written]
+
+    def _udpateCalibrationFrameTimezones(self, filenames: list[str]) -> list[int]:
+        """
+        Backfills the timezone of the written frames `filenames` that carry no location (typically
+        calibration frames), from the closest frame of the same camera within 12 hours.
+        Other frames without timezone are only revisited if a written frame with timezone lands next to them.
+        Returns the ids of the frames that got a timezone.
         """
         try:
-            self._db.execute(statement)
+            with self._db.transaction() as tx:
+                backfilled = tx.fetchall(TIMEZONE_BACKFILL_RETURNING, {"filenames": json.dumps(filenames)})
         except Exception as e:
             print(e)
-        finally:
-            return
+            return []
+        return [row[0] for row in backfilled]
     
     @property
     def selectedFolders(self) -> list[str]:
@@ -302,4 +465,20 @@ class ProjectDB:
     
     @selectedFolders.setter
     def selectedFolders(self, newValues: list[str]):
-        _ = self._db.execute("INSERT OR REPLACE INTO user_settings (item, value) VALUES (?, ?)", ("folders", json.dumps(newValues)))
\ No newline at end of file
+        _ = self._db.execute("INSERT OR REPLACE INTO user_settings (item, value) VALUES (?, ?)", ("folders", json.dumps(newValues)))
+
+    @property
+    def scoutBackend(self) -> str:
+        """
+        How scouts read files, one of `SCOUT_BACKENDS`
+        """
+        existing_settings = self._db.get("SELECT value FROM user_settings WHERE item = 'scoutBackend'")
+        if not isinstance(existing_settings, tuple):
+            return 'threads'
+        return json.loads(existing_settings[0])
+
+    @scoutBackend.setter
+    def scoutBackend(self, newValue: str):
+        if newValue not in SCOUT_BACKENDS:
+            raise ValueError(f"Unknown scout backend {newValue}, expected one of {SCOUT_BACKENDS}")
+        _ = self._db.execute("INSERT OR REPLACE INTO user_settings (item, value) VALUES (?, ?)", ("scoutBackend", json.dumps(newValue)))
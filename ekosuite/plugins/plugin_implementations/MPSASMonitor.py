@@ -1,8 +1,12 @@
+import json
+import numpy as np
+from typing import Sequence
 from ekosuite.app.AppDB import AppDB
 from ekosuite.plugins.core.PluginInterface import PluginInterface
 from ekosuite.plugins.core.PluginUserInterface import PluginUserInterface
 from ekosuite.plugins.model.images import Image
-from PyQt5.QtWidgets import QWidget, QBoxLayout, QPushButton, QListWidget, QListWidgetItem, QSizePolicy
+from ekosuite.plugins.model.images.ImageDelta import ImageDelta
+from PyQt5.QtWidgets import QWidget, QBoxLayout, QPushButton, QListWidget, QListWidgetItem, QSizePolicy, QLabel
 from PyQt5.QtCore import QSize
 from ekosuite.app.AppDB import AppDB
 
@@ -34,13 +38,61 @@ class MPSASMonitor(PluginInterface):
     
     def execute(self, input: Image, db: AppDB):
         """Execute the plugin's main functionality."""
-        self._ui.updateUi()
+        return self.executeBatch([input], db)
+
+    def executeBatch(self, inputs: Sequence[Image], db: AppDB, backfill: bool = False) -> dict[str, dict]:
+        """
+        Sky brightness of every night the images were taken in, over all frames of these nights.
+        """
+        return nightlySkyBrightness(db, [input.id for input in inputs])
 
     def terminate(self):
         """Clean up resources and terminate the plugin."""
         # Cleanup logic goes here
         pass
 
+def nightlySkyBrightness(db: AppDB, imageIds: Sequence[int]) -> dict[str, dict]:
+    """
+    `skyBrightness` of the nights the images `imageIds` were taken in, with one query for all of them.
+    """
+    rows = db.fetchall("""
+        SELECT ns.start_day, ff.mpsas
+            FROM fits_file_night_sessions AS ffns
+            JOIN night_sessions AS ns ON ns.id = ffns.night_session_id
+            JOIN fits_files AS ff ON ff.id = ffns.fits_file_id
+            WHERE ffns.night_session_id IN (
+                SELECT night_session_id FROM fits_file_night_sessions
+                WHERE fits_file_id IN (SELECT value FROM json_each(?))
+            )
+            AND ff.mpsas IS NOT NULL
+    """, (json.dumps(list(imageIds)), ))
+    if isinstance(rows, Exception):
+        raise rows
+    return skyBrightness([row[0] for row in rows], [row[1] for row in rows])
+
+def skyBrightness(nights: Sequence[str], values: Sequence[float]) -> dict[str, dict]:
+    """
+    Number of frames, median, darkest and brightest MPSAS of every night, from the MPSAS `values`
+    of frames taken in `nights`. All nights are summarized together in one sorted pass.
+    """
+    if len(values) == 0:
+        return {}
+    nights = np.asarray(nights)
+    values = np.asarray(values, dtype=float)
+    order = np.lexsort((values, nights))
+    nights, values = nights[order], values[order]
+    names, starts, counts = np.unique(nights, return_index=True, return_counts=True)
+    # Frames of a night are contiguous and sorted by MPSAS, so its median is in the middle
+    lower = starts + (counts - 1) // 2
+    upper = starts + counts // 2
+    medians = (values[lower] + values[upper]) / 2
+    return {str(name): {
+        "frames": int(count),
+        "median": float(median),
+        "darkest": float(values[start + count - 1]),
+        "brightest": float(values[start]),
+    } for name, start, count, median in zip(names, starts, counts, medians)}
+
 class MPSASMonitorUI(PluginUserInterface):
     def __init__(self, db: AppDB, parent=None):
         """
@@ -55,6 +107,8 @@ class MPSASMonitorUI(PluginUserInterface):
         self._night_icon = QPushButton()
         self._db = db
         self._chosenNight = None
+        self._graph: Graph | None = None
+        self._summary: QLabel | None = None
     
     @property
     def values(self) -> list[float]:
@@ -87,52 +141,70 @@ class MPSASMonitorUI(PluginUserInterface):
 
         return self._widget
 
+    def _series(self) -> tuple[list[str], list[float]]:
+        """
+        Local times and MPSAS of the frames of the chosen night.
+        """
+        if type(self._chosenNight) is not str:
+            return [], []
+        rows = self._db.fetchall("""
+            SELECT DATETIME(im.create_time, 'localtime'), im.mpsas
+                FROM 
+                    fits_files as im,
+                    night_sessions as ns,
+                    night_session_fits_files nsff
+                WHERE 
+                    im.id = nsff.fits_file_id
+                    AND nsff.night_session_id = ns.id
+                    AND ns.start_day = ?
+                ORDER BY DATETIME(im.create_time) ASC
+        """, (self._chosenNight, ))
+        if isinstance(rows, Exception):
+            print(f"Error reading MPSAS of night {self._chosenNight}: {rows}")
+            return [], []
+        return [row[0] for row in rows], [row[1] for row in rows]
+
+    def imagesAdded(self, delta: ImageDelta):
+        """
+        Redraws the graph if frames of the chosen night were added. Without a chosen night, the
+        latest night of the new frames is shown.
+        """
+        if self._graph is None:
+            return
+        if self._chosenNight is None and len(delta.nights) > 0:
+            self.selectNight(max(delta.nights))
+        elif self._chosenNight in delta.nights:
+            self._graph.setData(*self._series())
+
+    def executed(self, images: list, result: dict[str, dict]):
+        """
+        Shows the sky brightness of the chosen night if the plugin summarized it again.
+        """
+        if self._summary is not None and self._chosenNight in result:
+            self._summary.setText(self._summaryText(result[self._chosenNight]))
+
+    def _summaryText(self, statistics: dict | None) -> str:
+        if statistics is None:
+            return "No MPSAS recorded"
+        return f"{statistics['frames']} frames, median {statistics['median']:.2f}, darkest {statistics['darkest']:.2f}, brightest {statistics['brightest']:.2f} MPSAS"
+
     def updateUi(self):
         self.clearLayout(self._layout)
 
-        if type(self._chosenNight) is str:
-            keys = self._db.execute("""
-                SELECT DATETIME(im.create_time, 'localtime')
-                    FROM 
-                        fits_files as im,
-                        night_sessions as ns,
-                        night_session_fits_files nsff
-                    WHERE 
-                        im.id = nsff.fits_file_id
-                        AND nsff.night_session_id = ns.id
-                        AND ns.start_day = ?
-                    ORDER BY DATETIME(im.create_time) ASC
-            """, (self._chosenNight, )).fetchall()
-            values = self._db.execute("""
-                SELECT im.mpsas 
-                    FROM 
-                        fits_files as im,
-                        night_sessions as ns,
-                        night_session_fits_files nsff
-                    WHERE 
-                        im.id = nsff.fits_file_id
-                        AND nsff.night_session_id = ns.id
-                        AND ns.start_day = ?
-                    ORDER BY DATETIME(im.create_time) ASC
-            """, (self._chosenNight, )).fetchall()
-        else:
-            keys = []
-            values = []
-
-        if values is None or keys is None:
-            values = []
-            keys = []
-
-        self._layout.addWidget(Graph(
-            [k[0] for k in keys], # range(1, len(values) + 1),
-            [v[0] for v in values],
-        ))
+        keys, values = self._series()
+        self._graph = Graph(
+            keys, # range(1, len(values) + 1),
+            values,
+        )
+        self._layout.addWidget(self._graph)
+        recorded = [value for value in values if value is not None]
+        self._summary = QLabel(self._summaryText(skyBrightness([self._chosenNight] * len(recorded), recorded).get(self._chosenNight)))
+        self._layout.addWidget(self._summary)
         night_icon = QPushButton()
         night_icon.setText(self._chosenNight)
         night_icon.setMinimumHeight(30)
         night_icon.clicked.connect(self.pickNight)
         self._layout.addWidget(night_icon)
-        print("Updating UI with values:", self.values)
     
     def pickNight(self):
         self.widget = QWidget()
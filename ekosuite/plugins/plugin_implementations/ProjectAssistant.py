@@ -2,9 +2,9 @@ from typing import Callable
 from ekosuite.app.AppDB import AppDB
 from ekosuite.plugins.core.ImageFilter import ImageFilter
 from ekosuite.plugins.model.images.DBImage import DBImage
+from ekosuite.plugins.model.images.ImageDelta import ImageDelta
 from ekosuite.plugins.core.PluginInterface import PluginInterface
 from ekosuite.plugins.core.PluginUserInterface import PluginUserInterface
-from ekosuite.plugins.model.images import Image
 from PyQt5.QtWidgets import \
     QWidget, QBoxLayout, QPushButton, QLabel, \
     QTreeWidgetItem, QTreeWidget, QAbstractItemView, \
@@ -16,6 +16,9 @@ from PyQt5.QtGui import QDoubleValidator
 from ekosuite.app.AppDB import AppDB
 import os
 
+# Frames the validations look for next to the selected lights
+CALIBRATION_TYPES = {'DARK', 'FLAT', 'BIAS', 'MASTER DARK', 'MASTER FLAT', 'MASTER BIAS'}
+
 class Item:
         def __init__(self, id: int, filename: str, gain: float | None, temperature: float | None, bias: float | None):
             self.id = id
@@ -176,9 +179,9 @@ class ProjectAssistant(PluginInterface):
         """Return the user interface for the plugin or `None` if it doesn't apply."""
         return self._ui
 
-    def execute(self, input: Image, db: AppDB):
-        """Execute the plugin's main functionality."""
-        self._ui.updateUi()
+    def processesImages(self) -> bool:
+        # The view follows new images through ProjectAssistantUI.imagesAdded
+        return False
 
     def terminate(self):
         """Clean up resources and terminate the plugin."""
@@ -236,6 +239,7 @@ class ProjectAssistantUI(PluginUserInterface):
         self._db = db
         self._chosenNight = None
         self._selectedImages = []
+        self._imageFilter: ImageFilter | None = None
 
     def createUi(self) -> QWidget:
         self._layout = QBoxLayout(QBoxLayout.TopToBottom, self._widget)
@@ -290,6 +294,19 @@ class ProjectAssistantUI(PluginUserInterface):
         self._settings_window.setCentralWidget(widget)
         self._settings_window.show()
     
+    def imagesAdded(self, delta: ImageDelta):
+        """
+        Updates the image filter's options in place and adds the new matching lights to the
+        selection, which validates it again. New calibration frames can settle the warnings of the
+        selected lights, so they validate it as well.
+        """
+        if self._imageFilter is None:
+            return
+        if self._imageFilter.refresh(delta.imageIds):
+            return
+        if len(self._selectedImages) > 0 and len(delta.imageTypes & CALIBRATION_TYPES) > 0:
+            self._runValidations()
+
     def _selectImages(self, images: list[DBImage]):
         self._selectedImages = images
         self._runValidations()
@@ -332,6 +349,7 @@ class ProjectAssistantUI(PluginUserInterface):
 
         image_filter = ImageFilter(self._db, lambda images: self._selectImages(images), allowedImageTypes=['LIGHT'])
         image_filter.setMaximumHeight(300)
+        self._imageFilter = image_filter
         self._layout.addWidget(self._settingsButton)
         self._layout.addWidget(image_filter)
         self._layout.addWidget(self._warningLabel)
@@ -18,17 +18,29 @@ class MplCanvas(FigureCanvasQTAgg):
 class Graph(QWidget):
     def __init__(self, x_data, y_data, x_label='X', y_label='Y'):
         super().__init__()
-        sc = MplCanvas(self, width=5, height=4, dpi=100)
-        
-        data = pd.DataFrame({
-            y_label: y_data
-        }, index=x_data)
-        
-
-        df = pd.DataFrame(data, columns=[x_label, y_label])
-        df.plot(ax=sc.axes, kind='line', legend=False, color='blue', marker='o', markersize=5, linewidth=2, rot=10)
+        self._canvas = MplCanvas(self, width=5, height=4, dpi=100)
+        self._x_label = x_label
+        self._y_label = y_label
+        self._plot(x_data, y_data)
 
         layout = QVBoxLayout()
-        layout.addWidget(sc)
+        layout.addWidget(self._canvas)
 
         self.setLayout(layout)
+
+    def setData(self, x_data, y_data):
+        """
+        Plots new data on the existing canvas, which is redrawn the next time Qt paints.
+        """
+        self._canvas.axes.clear()
+        self._plot(x_data, y_data)
+        self._canvas.draw_idle()
+
+    def _plot(self, x_data, y_data):
+        data = pd.DataFrame({
+            self._y_label: y_data
+        }, index=x_data)
+        
+
+        df = pd.DataFrame(data, columns=[self._x_label, self._y_label])
+        df.plot(ax=self._canvas.axes, kind='line', legend=False, color='blue', marker='o', markersize=5, linewidth=2, rot=10)
@@ -0,0 +1,20 @@
+from typing import Callable
+from PyQt5.QtCore import QObject, pyqtSignal
+
+class MainThreadDispatcher(QObject):
+    """
+    Runs functions on the thread this object lives in, usually the GUI thread, when they are called
+    from any other thread, e.g. to hand worker results to widgets.
+    """
+    _called = pyqtSignal(object, object)
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        # Emitted from other threads, the signal is queued to this object's thread
+        self._called.connect(self._run)
+
+    def call(self, function: Callable, *args):
+        self._called.emit(function, args)
+
+    def _run(self, function: Callable, args: tuple):
+        function(*args)
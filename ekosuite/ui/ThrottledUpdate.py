@@ -0,0 +1,42 @@
+import time
+from typing import Callable
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from ekosuite.plugins.model.images.ImageDelta import ImageDelta
+
+class ThrottledUpdate(QObject):
+    """
+    Hands the `ImageDelta`s published on any thread to `onUpdate` on the thread this object lives
+    in, usually the GUI thread. Deltas that arrive within `interval` seconds of the previous update
+    are merged into the next one, so views redraw at most once per interval however fast frames
+    arrive.
+    """
+    _published = pyqtSignal(object)
+
+    def __init__(self, onUpdate: Callable[[ImageDelta], None], interval: float = 1.0, parent: QObject | None = None):
+        super().__init__(parent)
+        self._onUpdate = onUpdate
+        self.interval = interval
+        self._pending: ImageDelta | None = None
+        self._lastUpdate = float('-inf')
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._update)
+        # Emitted from other threads, the signal is queued to this object's thread
+        self._published.connect(self._receive)
+
+    def publish(self, delta: ImageDelta):
+        self._published.emit(delta)
+
+    def _receive(self, delta: ImageDelta):
+        self._pending = delta if self._pending is None else self._pending.merged(delta)
+        if self._timer.isActive():
+            return
+        wait = max(0.0, self._lastUpdate + self.interval - time.monotonic())
+        self._timer.start(int(wait * 1000))
+
+    def _update(self):
+        delta, self._pending = self._pending, None
+        self._lastUpdate = time.monotonic()
+        if delta is not None:
+            self._onUpdate(delta)
@@ -0,0 +1,89 @@
+import shutil
+import sqlite3
+import threading
+from queue import Queue
+
+import pytest
+
+from ekosuite import AppDB
+
+def test_reads_do_not_queue_behind_writer(tmp_path):
+    """
+    Reads are served by the reader pool while the writer thread is busy.
+    """
+    db = AppDB(folder=str(tmp_path))
+    db.execute("INSERT INTO user_settings (item, value) VALUES (?, ?)", ("folders", "[]"))
+
+    release = threading.Event()
+    db._enqueue(lambda: release.wait(5), Queue())
+
+    result = db.fetchall("SELECT value FROM user_settings WHERE item = ?", ("folders",))
+    assert result == [("[]",)], "Read should be answered while the writer is blocked"
+    assert db.metrics["writer"]["depth"] == 0
+
+    release.set()
+    db.close()
+
+def test_reads_see_committed_writes(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    db.execute("INSERT INTO user_settings (item, value) VALUES (?, ?)", ("dark_validity", "1 day"))
+
+    assert db.get("SELECT value FROM user_settings WHERE item = ?", ("dark_validity",)) == ("1 day",)
+    assert db.metrics["readers"]["count"] == 1
+    db.close()
+
+def test_transaction_commits_once(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    with db.transaction() as tx:
+        tx.executemany("INSERT INTO analyzed_files (filename) VALUES (?)", [(f"frame_{i}.fits",) for i in range(100)])
+        tx.execute("INSERT INTO user_settings (item, value) VALUES (?, ?)", ("folders", "[]"))
+
+    assert db.get("SELECT COUNT(*) FROM analyzed_files") == (100,)
+    assert db.get("SELECT value FROM user_settings WHERE item = 'folders'") == ("[]",)
+    db.close()
+
+def test_transaction_rolls_back_on_error(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.transaction() as tx:
+            tx.execute("INSERT INTO analyzed_files (filename) VALUES (?)", ("frame.fits",))
+            tx.execute("INSERT INTO analyzed_files (filename) VALUES (?)", ("frame.fits",))
+
+    assert db.get("SELECT COUNT(*) FROM analyzed_files") == (0,)
+    db.close()
+
+def test_failed_migration_is_neither_applied_nor_recorded(tmp_path, monkeypatch):
+    """
+    A migration and its `dbinfo` row commit together, so a migration that fails halfway is retried
+    from the start on the next launch instead of failing on its already applied ALTER TABLE.
+    """
+    migrations = tmp_path / "migrations"
+    shutil.copytree(AppDB.migrationsFolder, migrations)
+    monkeypatch.setattr(AppDB, "migrationsFolder", str(migrations))
+    (migrations / "v999.sql").write_text(
+        "BEGIN;\n"
+        "ALTER TABLE analyzed_files ADD COLUMN checked INTEGER;\n"
+        "INSERT INTO missing_table VALUES (1);\n"
+        "COMMIT;\n"
+    )
+    db = AppDB(folder=str(tmp_path / "db"))
+    columns = [row[1] for row in db.fetchall("PRAGMA table_info(analyzed_files)")]
+    assert "checked" not in columns
+    assert db.get("SELECT COUNT(*) FROM dbinfo WHERE version = 'v999'") == (0,)
+    db.close()
+
+    (migrations / "v999.sql").write_text(
+        "BEGIN;\n"
+        "ALTER TABLE analyzed_files ADD COLUMN checked INTEGER;\n"
+        "COMMIT;\n"
+    )
+    db = AppDB(folder=str(tmp_path / "db"))
+    columns = [row[1] for row in db.fetchall("PRAGMA table_info(analyzed_files)")]
+    assert "checked" in columns
+    assert db.get("SELECT COUNT(*) FROM dbinfo WHERE version = 'v999'") == (1,)
+    db.close()
+
+    db = AppDB(folder=str(tmp_path / "db"))
+    assert db.get("SELECT COUNT(*) FROM dbinfo WHERE version = 'v999'") == (1,)
+    assert db.get("PRAGMA journal_mode") == ("wal",)
+    db.close()
@@ -0,0 +1,86 @@
+import asyncio
+import os
+from datetime import datetime
+
+import fitsio
+import numpy as np
+
+from ekosuite import AppDB
+from ekosuite.plugins.model.images.CalibrationCache import CalibrationCache
+from ekosuite.plugins.model.images.DBImage import DBImage
+from ekosuite.plugins.model.images.ImageAnalysis import ImageAnalysisCache
+from ekosuite.plugins.model.images.ImageData import ImageData
+from ekosuite.plugins.model.project.ProjectDB import FITS_FILE_INSERT
+from tests.testdata import fits_row
+
+def write_frames(tmp_path, db: AppDB) -> dict[str, list[int]]:
+    rng = np.random.default_rng(7)
+    rows = []
+    for i in range(5):
+        path = os.path.join(tmp_path, f'flat_{i}.fits')
+        fitsio.write(path, rng.normal(20000, 100, (20, 30)).astype(np.uint16), clobber=True)
+        rows.append(fits_row(path, datetime(2023, 10, 2, 4, i), image_width=30, image_height=20, imagetype='Flat'))
+    path = os.path.join(tmp_path, 'bias.fits')
+    fitsio.write(path, np.full((20, 30), 500, dtype=np.uint16), clobber=True)
+    rows.append(fits_row(path, datetime(2023, 10, 2, 4, 10), image_width=30, image_height=20, imagetype='Master Bias'))
+    path = os.path.join(tmp_path, 'light.fits')
+    fitsio.write(path, np.full((20, 30), 1000, dtype=np.uint16), clobber=True)
+    rows.append(fits_row(path, datetime(2023, 10, 2, 4, 20), image_width=30, image_height=20, imagetype='Light'))
+    db.executemany(FITS_FILE_INSERT, rows)
+    ids = db.fetchall("SELECT id, image_type_generic FROM fits_files ORDER BY id")
+    return {kind: [id for id, generic in ids if generic == kind] for kind in ('FLAT', 'MASTER BIAS', 'LIGHT')}
+
+def test_products_are_reused_until_a_frame_changes(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    ids = write_frames(tmp_path, db)
+    frames = DBImage.load(ids['FLAT'], db)
+    builds = []
+    def build():
+        builds.append(1)
+        return frames[0].image_data.ccdData
+
+    product = CalibrationCache(db).getOrBuild('flat', frames, build)
+    # A new cache, as in the next run of the app
+    reused = CalibrationCache(db).getOrBuild('flat', frames, build)
+    assert len(builds) == 1
+    assert np.array_equal(reused.data, product.data)
+
+    stale = db.get("SELECT path FROM calibration_cache WHERE name = 'flat'")[0]
+    fitsio.write(frames[2].filename, np.zeros((20, 30), dtype=np.uint16), clobber=True)
+    CalibrationCache(db).getOrBuild('flat', frames, build)
+    assert len(builds) == 2
+    assert not os.path.exists(stale)
+
+def test_least_recently_used_products_are_evicted(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    ids = write_frames(tmp_path, db)
+    frames = DBImage.load(ids['FLAT'], db)
+    cache = CalibrationCache(db)
+    cache.getOrBuild('a', frames[:1], lambda: frames[0].image_data.ccdData)
+    size = db.get("SELECT size FROM calibration_cache")[0]
+    cache.diskBudget = 2 * size
+    cache.getOrBuild('b', frames[1:2], lambda: frames[1].image_data.ccdData)
+    # Using `a` makes `b` the least recently used product
+    cache.getOrBuild('a', frames[:1], lambda: frames[0].image_data.ccdData)
+    cache.getOrBuild('c', frames[2:3], lambda: frames[2].image_data.ccdData)
+    assert [row[0] for row in db.fetchall("SELECT name FROM calibration_cache ORDER BY name")] == ['a', 'c']
+    assert len(os.listdir(cache.folder)) == 2
+
+def test_master_flat_is_stacked_once(tmp_path, monkeypatch):
+    db = AppDB(folder=str(tmp_path))
+    ids = write_frames(tmp_path, db)
+    light = DBImage(ids['LIGHT'][0], db)
+
+    cache = ImageAnalysisCache(db)
+    asyncio.run(cache.make(light))
+    master_flat = cache.master_flat(light)
+    assert master_flat is not None
+    assert master_flat.meta['NCOMBINE'] == 5
+
+    def stack(*args, **kwargs):
+        raise AssertionError("The master flat was stacked again")
+    monkeypatch.setattr(ImageData, 'flat_stack', stack)
+    cache = ImageAnalysisCache(db)
+    asyncio.run(cache.make(light))
+    assert np.array_equal(cache.master_flat(light).data, master_flat.data)
+    assert db.get("SELECT COUNT(*) FROM calibration_cache")[0] == 1
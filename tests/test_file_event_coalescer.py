@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+
+from ekosuite.app.FileEventCoalescer import FileEventCoalescer
+
+class Batches:
+    def __init__(self):
+        self.batches = []
+        self.threads = set()
+        self.received = threading.Event()
+
+    def __call__(self, batch):
+        self.threads.add(threading.current_thread().name)
+        self.batches.append([path for path, _ in batch])
+        self.received.set()
+
+def test_file_written_in_steps_is_handed_off_once_stable(tmp_path):
+    batches = Batches()
+    coalescer = FileEventCoalescer(batches, quietPeriod=0.2)
+    path = os.path.join(tmp_path, 'light.fits')
+    with open(path, 'wb') as f:
+        for _ in range(5):
+            f.write(b'\0' * 2880)
+            f.flush()
+            coalescer.touch(path)
+            time.sleep(0.05)
+    coalescer.touch(path)
+    assert batches.received.wait(2)
+    time.sleep(0.3)
+    coalescer.stop()
+    assert batches.batches == [[path]]
+    assert threading.main_thread().name not in batches.threads
+
+def test_closed_files_are_batched_without_quiet_period(tmp_path):
+    batches = Batches()
+    coalescer = FileEventCoalescer(batches, quietPeriod=10)
+    paths = []
+    for i in range(3):
+        paths.append(os.path.join(tmp_path, f'flat_{i}.fits'))
+        with open(paths[-1], 'wb') as f:
+            f.write(b'\0' * 2880)
+        coalescer.touch(paths[-1])
+        coalescer.touch(paths[-1], closed=True)
+    # Not an image
+    coalescer.touch(os.path.join(tmp_path, 'flat.txt'), closed=True)
+    started = time.monotonic()
+    while sum(len(batch) for batch in batches.batches) < 3 and time.monotonic() - started < 2:
+        time.sleep(0.01)
+    coalescer.stop()
+    assert sorted(path for batch in batches.batches for path in batch) == paths
+
+def test_data_stream_reads_new_images_off_the_watchdog_thread(tmp_path):
+    import numpy as np
+    from astropy.io import fits
+    from ekosuite.app.DataStream import DataStream
+
+    stream = DataStream(str(tmp_path), quietPeriod=0.2)
+    received = []
+    stream.observe(lambda image: received.append((image.filename, threading.current_thread().name)))
+    path = os.path.join(tmp_path, 'light.fit')
+    hdu = fits.PrimaryHDU(np.zeros((8, 8), dtype=np.uint16))
+    hdu.header['DATE-OBS'] = '2023-10-02T04:00:00.000'
+    hdu.writeto(path)
+    started = time.monotonic()
+    while len(received) == 0 and time.monotonic() - started < 5:
+        time.sleep(0.05)
+    stream.stop()
+    assert len(received) == 1
+    assert received[0][0] == path
+    assert received[0][1].startswith('FileEventCoalescer')
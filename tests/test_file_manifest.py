@@ -0,0 +1,80 @@
+import asyncio
+import os
+
+from ekosuite import AppDB
+from ekosuite.plugins.model.project.FileManifest import FileManifest
+from ekosuite.plugins.model.project.ProjectDB import ProjectDB
+from tests.testdata import age, edit, write_fits
+
+def scan(manifest: FileManifest, folder: str) -> list[str]:
+    result = manifest.scan(folder)
+    changed = list(result)
+    manifest.commit(result)
+    return sorted(changed)
+
+def test_rescan_only_reports_changes(tmp_path):
+    db = AppDB(folder=os.path.join(tmp_path, 'db'))
+    manifest = FileManifest(db)
+    root = os.path.join(tmp_path, 'images')
+    lights = [write_fits(os.path.join(root, 'night_1', f'light_{i}.fits')) for i in range(3)]
+    age(*lights, os.path.join(root, 'night_1'), root)
+
+    assert scan(manifest, root) == sorted(lights)
+    # Nothing changed, so only the directories are looked at
+    result = manifest.scan(root)
+    assert list(result) == []
+    assert result.listedDirectories == 0
+    assert result.skippedDirectories == 2
+
+    # A file rewritten in place is only found when the directory is verified
+    edit(lights[0], 'M 33')
+    assert scan(manifest, root) == []
+    result = manifest.scan(root, verify=True)
+    assert list(result) == [lights[0]]
+    manifest.commit(result)
+
+    # New files and replaced files change the directory
+    flat = write_fits(os.path.join(root, 'night_1', 'flat_0.fits'))
+    replacement = write_fits(os.path.join(tmp_path, 'light_1.fits'))
+    os.replace(replacement, lights[1])
+    assert scan(manifest, root) == sorted([flat, lights[1]])
+    db.close()
+
+def test_files_ingested_before_the_manifest_are_not_read_again(tmp_path):
+    db = AppDB(folder=os.path.join(tmp_path, 'db'))
+    root = os.path.join(tmp_path, 'images')
+    ingested = write_fits(os.path.join(root, 'light_0.fits'))
+    db.execute("INSERT INTO analyzed_files (filename) VALUES (?)", (ingested,))
+    new = write_fits(os.path.join(root, 'light_1.fits'))
+    assert scan(FileManifest(db), root) == [new]
+    db.close()
+
+def test_scout_reingests_changed_files(tmp_path):
+    db = AppDB(folder=os.path.join(tmp_path, 'db'))
+    projectDB = ProjectDB(db)
+    root = os.path.join(tmp_path, 'images')
+    light = write_fits(os.path.join(root, 'light_0.fits'))
+    asyncio.run(projectDB.scout(root, progress=lambda p: None))
+    id = db.get("SELECT id FROM fits_files WHERE filename = ?", (light,))[0]
+
+    edit(light, 'M 33')
+    asyncio.run(projectDB.scout(root, progress=lambda p: None, verify=True))
+    assert db.fetchall("SELECT id, object FROM fits_files") == [(id, 'M 33')]
+    db.close()
+
+def test_files_of_a_failed_insert_are_scouted_again(tmp_path):
+    db = AppDB(folder=os.path.join(tmp_path, 'db'))
+    projectDB = ProjectDB(db)
+    root = os.path.join(tmp_path, 'images')
+    light = write_fits(os.path.join(root, 'light_0.fits'))
+    age(light, root)
+    async def failing(images, analyzed_files):
+        raise OSError("Disk full")
+    projectDB._insertImagesToDb = failing
+    asyncio.run(projectDB.scout(root, progress=lambda p: None))
+    assert db.fetchall("SELECT path FROM file_manifest") == []
+
+    del projectDB._insertImagesToDb
+    asyncio.run(projectDB.scout(root, progress=lambda p: None))
+    assert db.fetchall("SELECT filename FROM fits_files") == [(light,)]
+    db.close()
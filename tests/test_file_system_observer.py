@@ -0,0 +1,64 @@
+import asyncio
+import os
+import threading
+import time
+
+from watchdog.observers.api import BaseObserver
+from watchdog.utils import BaseThread
+
+from ekosuite import AppDB, FileSystemObserver, ProjectDB
+from tests.testdata import age, edit, write_fits
+
+def threads() -> tuple[int, int]:
+    """
+    Number of threads watchdog starts per watched folder (emitters and their buffers), and of other threads.
+    """
+    emitters = sum(1 for thread in threading.enumerate() if isinstance(thread, BaseThread) and not isinstance(thread, BaseObserver))
+    return emitters, threading.active_count() - emitters
+
+def test_folders_share_one_observer(tmp_path):
+    db = AppDB(folder=os.path.join(tmp_path, 'db'))
+    folders = [os.path.join(tmp_path, f'folder_{i}') for i in range(4)]
+    for folder in folders:
+        os.makedirs(folder)
+    projectDB = ProjectDB(db)
+    projectDB.selectedFolders = folders[:1]
+    observer = FileSystemObserver(db)
+    emitters, others = threads()
+
+    projectDB.selectedFolders = folders
+    observer.setupObservers()
+    assert sorted(observer._dataStream.watchedDirectories) == folders
+    assert threads() == (emitters * 4, others)
+
+    projectDB.selectedFolders = folders[1:3]
+    observer.setupObservers()
+    assert sorted(observer._dataStream.watchedDirectories) == folders[1:3]
+    # Unscheduled folders stop their emitters
+    started = time.monotonic()
+    while threads()[0] > emitters * 2 and time.monotonic() - started < 2:
+        time.sleep(0.05)
+    assert threads() == (emitters * 2, others)
+    observer.stop()
+    db.close()
+
+def test_startup_scout_finds_files_edited_in_place(tmp_path):
+    db = AppDB(folder=os.path.join(tmp_path, 'db'))
+    root = os.path.join(tmp_path, 'images')
+    light = write_fits(os.path.join(root, 'light_0.fits'))
+    age(light, root)
+    projectDB = ProjectDB(db)
+    asyncio.run(projectDB.scout(root, progress=lambda p: None))
+    id = db.get("SELECT id FROM fits_files WHERE filename = ?", (light,))[0]
+
+    # Edited while the app was not running, which leaves the directory as it was
+    directoryMtime = os.stat(root).st_mtime_ns
+    edit(light, 'M 33')
+    assert os.stat(root).st_mtime_ns == directoryMtime
+
+    projectDB.selectedFolders = [root]
+    observer = FileSystemObserver(db)
+    # Stopping waits for the scout of the selected folder
+    observer.stop()
+    assert db.fetchall("SELECT id, object FROM fits_files") == [(id, 'M 33')]
+    db.close()
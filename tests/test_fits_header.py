@@ -0,0 +1,31 @@
+import os
+import pytest
+
+from ekosuite.plugins.model.images.FITSImage import FITSImage
+from ekosuite.plugins.model.images.FITSHeader import read_fits_row, read_primary_header
+from tests.testdata import FITS_ROW, fits_row, write_fits
+
+def fits_image_row(image: FITSImage) -> tuple:
+    columns = FITS_ROW.keys() - {'filename', 'create_time'}
+    return fits_row(image.filename, image.create_time, **{column: getattr(image, column) for column in columns})
+
+def test_header_row_matches_fits_image(tmp_path):
+    paths = [
+        write_fits(os.path.join(tmp_path, 'light.fits'),
+                   DATE_OBS='2023-10-01T19:00:01.123456', SITELAT=34.0, SITELONG=-118.0, XPIXSZ=3.76,
+                   object="Barnard's Loop", RA=85.5, DEC=-1.5, INSTRUME='ZWO ASI2600MM Pro', TELESCOP='Esprit 100',
+                   FILTER='Ha  ', IMAGETYP='LIGHT', EXPTIME=300, FOCALLEN=550, FOCUSTEM=12.25, CCD_TEMP=-10.0,
+                   GAIN=100, OFFSET=50, MPSAS=21.3, AIRMASS=1.0421),
+        # Calibration frame without location and most optional keywords
+        write_fits(os.path.join(tmp_path, 'dark.fits'), DATE_OBS='2023-10-02T11:00:00.000', IMAGETYP='Dark Frame', EXPTIME=1e-3),
+    ]
+    for path in paths:
+        assert read_fits_row(path) == fits_image_row(FITSImage(path))
+
+def test_non_fits_files_are_rejected(tmp_path):
+    path = os.path.join(tmp_path, '._light.fits')
+    with open(path, 'wb') as f:
+        f.write(b'\0' * 4096)
+    # AppleDouble files are not FITS files
+    with pytest.raises(ValueError):
+        read_primary_header(path)
@@ -0,0 +1,66 @@
+import asyncio
+import os
+from datetime import datetime
+
+from ekosuite import AppDB
+from ekosuite.plugins.model.images.CalibrationCache import CalibrationCache
+from ekosuite.plugins.model.images.DBImage import DBImage
+from ekosuite.plugins.model.images.ImageAnalysis import ImageAnalysis
+from tests.testdata import NIGHT_BIAS, NIGHT_DARK_CURRENT, NIGHT_SKY, write_night
+
+def test_calibrated_night_is_measured_and_stored(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    ids = write_night(tmp_path, db)
+    analysis = ImageAnalysis(db, DBImage.load(ids, db), maxWorkers=2, commitBatch=3)
+    results = asyncio.run(analysis.analyze(calibrate=True))
+
+    assert sorted(result.image_id for result in results) == ids
+    rows = db.fetchall("SELECT image_id, fwhm, snr, eccentricity, median FROM image_analysis ORDER BY image_id")
+    assert [row[0] for row in rows] == ids
+    for _, fwhm, snr, eccentricity, median in rows:
+        # Bias and dark are removed, the flat is uniform
+        assert abs(median - NIGHT_SKY) < 5
+        assert 4.0 < fwhm < 5.2
+        assert snr > 100
+        assert eccentricity < 0.4
+
+    # Results are snapshots of the stored rows
+    db.execute("DELETE FROM image_analysis")
+    assert sorted((r.image_id, r.fwhm, r.snr, r.eccentricity, r.median) for r in results) == rows
+
+def test_analyzing_again_replaces_the_results(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    ids = write_night(tmp_path, db, lights=2)
+    for _ in range(2):
+        asyncio.run(ImageAnalysis(db, DBImage.load(ids, db), maxWorkers=1).analyze(calibrate=False))
+    rows = db.fetchall("SELECT image_id, median FROM image_analysis ORDER BY image_id")
+    assert [row[0] for row in rows] == ids
+    assert all(abs(median - (NIGHT_SKY + NIGHT_BIAS + NIGHT_DARK_CURRENT)) < 5 for _, median in rows)
+
+def test_products_of_a_run_are_not_evicted_before_it_ends(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    ids = []
+    for i in range(3):
+        folder = tmp_path / f'night_{i}'
+        folder.mkdir()
+        ids += write_night(folder, db, lights=1, day=datetime(2023, 10, 2 + 3 * i))
+    # Room for a single product, while every night needs a master flat and a master dark
+    cache = CalibrationCache(db, diskBudget=1)
+    results = asyncio.run(ImageAnalysis(db, DBImage.load(ids, db), maxWorkers=1, calibrationCache=cache).analyze(calibrate=True))
+
+    assert sorted(result.image_id for result in results) == ids
+    assert all(abs(result.median - NIGHT_SKY) < 5 for result in results)
+    # Evicted once the run is done
+    assert db.get("SELECT COUNT(*) FROM calibration_cache") == (1,)
+    assert len(os.listdir(cache.folder)) == 1
+
+def test_frames_that_fail_are_reported(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    ids = write_night(tmp_path, db, lights=3)
+    images = DBImage.load(ids, db)
+    os.remove(images[1].filename)
+    analysis = ImageAnalysis(db, images, maxWorkers=1)
+    results = asyncio.run(analysis.analyze(calibrate=False))
+
+    assert [result.image_id for result in results] == [ids[0], ids[2]]
+    assert analysis.failed == [ids[1]]
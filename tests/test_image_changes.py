@@ -0,0 +1,91 @@
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+
+from PyQt5.QtCore import QCoreApplication
+
+from ekosuite import AppDB
+from ekosuite.app.ImageChanges import ImageChanges
+from ekosuite.plugins.model.images.FITSImage import FITSImage
+from ekosuite.plugins.model.images.ImageDelta import ImageDelta
+from ekosuite.plugins.model.project.ProjectDB import FITS_FILE_INSERT, ProjectDB
+from ekosuite.ui.ThrottledUpdate import ThrottledUpdate
+from tests.testdata import edit, night, write_fits
+
+def test_published_frames_are_described(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    db.executemany(FITS_FILE_INSERT, night(datetime(2024, 5, 1), 'a') + night(datetime(2024, 5, 3), 'b'))
+    changes = ImageChanges(db)
+    deltas: list[ImageDelta] = []
+    changes.subscribe(deltas.append)
+
+    changes.publish([])
+    assert deltas == []
+
+    changes.publish(list(range(13, 25)))
+    assert len(deltas) == 1
+    assert deltas[0].imageIds == list(range(13, 25))
+    # Only the lights have a timezone here, and so a night session
+    assert deltas[0].nights == {'2024-05-02'}
+    assert deltas[0].targets == {'M 31'}
+    assert deltas[0].imageTypes == {'LIGHT', 'FLAT', 'DARK'}
+    assert not deltas[0].backfill
+
+    # Scouted frames are backfill, until merged with live ones
+    changes.publish([1, 2], backfill=True)
+    assert deltas[1].backfill
+    assert not deltas[1].merged(deltas[0]).backfill
+
+def test_writers_publish_the_frames_they_wrote(tmp_path):
+    db = AppDB(folder=os.path.join(tmp_path, 'db'))
+    projectDB = ProjectDB(db)
+    projectDB.scoutChunkSize = 2
+    changes = ImageChanges(db)
+    deltas: list[ImageDelta] = []
+    changes.subscribe(deltas.append)
+    root = os.path.join(tmp_path, 'images')
+    paths = [write_fits(os.path.join(root, f'light_{i}.fits')) for i in range(5)]
+
+    # Every committed chunk of a scout is published on its own
+    asyncio.run(projectDB.scout(root, progress=lambda p: None, onInserted=lambda ids: changes.publish(ids, backfill=True)))
+    assert [len(delta) for delta in deltas] == [2, 2, 1]
+    assert all(delta.backfill for delta in deltas)
+    assert sorted(id for delta in deltas for id in delta.imageIds) == [1, 2, 3, 4, 5]
+
+    # A live frame is published alone, whatever a scout wrote before
+    changes.publish(projectDB.insertImages([FITSImage(write_fits(os.path.join(tmp_path, 'live', 'light.fits')))]))
+    assert deltas[-1].imageIds == [6] and not deltas[-1].backfill
+
+    # Files ingested again keep their id and are published with their new header
+    edit(paths[0], 'M 33')
+    id = db.get("SELECT id FROM fits_files WHERE filename = ?", (paths[0],))[0]
+    changes.publish(projectDB.insertImages([FITSImage(paths[0])]))
+    assert deltas[-1].imageIds == [id] and deltas[-1].targets == {'M 33'}
+    db.close()
+
+def test_updates_are_merged_and_throttled():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    updates: list[ImageDelta] = []
+    throttle = ThrottledUpdate(updates.append, interval=0.2)
+
+    published = []
+    def publish():
+        start = time.monotonic()
+        for i in range(20):
+            throttle.publish(ImageDelta([i], [f'night {i % 2}']))
+            time.sleep(0.01)
+        published.append(time.monotonic() - start)
+    publisher = threading.Thread(target=publish)
+    publisher.start()
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    publisher.join()
+
+    # The 20 deltas are merged into updates 0.2 s apart
+    assert 2 <= len(updates) <= published[0] / 0.2 + 2
+    assert [id for update in updates for id in update.imageIds] == list(range(20))
+    assert set().union(*(update.nights for update in updates)) == {'night 0', 'night 1'}
@@ -0,0 +1,70 @@
+import os
+import ccdproc as ccdp
+import fitsio
+import numpy as np
+
+from ekosuite.plugins.model.images.FITSHeader import map_primary_data
+from ekosuite.plugins.model.images.FITSImage import FITSImage
+from ekosuite.plugins.model.images.ImageData import ImageData
+
+def write_fits(path: str, pixels: np.ndarray, header: dict | None = None) -> str:
+    fitsio.write(path, pixels, header=header, clobber=True)
+    return path
+
+def test_mapped_data_matches_fitsio(tmp_path):
+    rng = np.random.default_rng(3)
+    cases = {
+        'u16': rng.integers(0, 65535, (30, 20), dtype=np.uint16),
+        'i16': rng.integers(-3000, 3000, (30, 20), dtype=np.int16),
+        'u32': rng.integers(0, 2 ** 32 - 1, (30, 20), dtype=np.uint32),
+        'f32': rng.random((30, 20), dtype=np.float32),
+        'u8': rng.integers(0, 255, (3, 30, 20), dtype=np.uint8),
+    }
+    for name, pixels in cases.items():
+        path = write_fits(os.path.join(tmp_path, f'{name}.fits'), pixels)
+        data = FITSImage(path).image_data.data
+        expected = fitsio.read(path)
+        # Unscaled data stays in the file's byte order
+        assert data.dtype.newbyteorder('=') == expected.dtype, name
+        assert np.array_equal(data, expected), name
+
+def test_scaled_data_matches_fitsio(tmp_path):
+    pixels = np.arange(600, dtype=np.int16).reshape((30, 20))
+    path = write_fits(os.path.join(tmp_path, 'scaled.fits'), pixels, [{'name': 'BSCALE', 'value': 0.5}, {'name': 'BZERO', 'value': 100.0}])
+    raw, bzero, bscale = map_primary_data(path)
+    assert (bzero, bscale) == (100.0, 0.5)
+    data = ImageData(raw, bzero, bscale).data
+    expected = fitsio.read(path)
+    assert data.dtype == expected.dtype
+    assert np.allclose(data, expected)
+
+def test_ccd_data_is_created_once(tmp_path):
+    path = write_fits(os.path.join(tmp_path, 'light.fits'), np.ones((30, 20), dtype=np.uint16))
+    image = FITSImage(path)
+    image_data = image.image_data
+    assert image.image_data is image_data
+    assert isinstance(image_data._raw_data, np.memmap)
+    assert image_data.ccdData is image_data.ccdData
+    assert np.array_equal(image_data.bias_subtract(image_data).data, np.zeros((30, 20)))
+    image_data.release()
+    assert image_data._ccdData is None
+
+def test_flat_stack_matches_ccdproc(tmp_path):
+    rng = np.random.default_rng(5)
+    bias = ImageData(np.full((40, 30), 500, dtype=np.uint16))
+    paths = []
+    for i in range(9):
+        pixels = rng.normal(20000 + 100 * i, 200, (40, 30)).astype(np.uint16)
+        # Hot pixels and a satellite trail to reject
+        pixels[rng.integers(0, 40, 5), rng.integers(0, 30, 5)] = 60000
+        if i == 3:
+            pixels[10, :] = 50000
+        paths.append(write_fits(os.path.join(tmp_path, f'flat_{i}.fits'), pixels))
+
+    for method in ('average', 'median'):
+        # A few rows per band, read from the mapped files
+        stacked = ImageData.flat_stack([FITSImage(path).image_data for path in paths], bias, method=method, memoryLimit=9 * 30 * 8 * 2 * 3)
+        expected = ccdp.combine([FITSImage(path).image_data.bias_subtract(bias) for path in paths], method=method, sigma_clip=True)
+        assert np.allclose(stacked.data, expected.data)
+        assert np.allclose(stacked.uncertainty.array, expected.uncertainty.array)
+        assert np.array_equal(stacked.mask, expected.mask)
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+from ekosuite import AppDB
+from ekosuite.plugins.core.ImageFacets import ImageFacets
+from ekosuite.plugins.core.ImageFilterQuery import FilterType, ImageFilterQuery
+from ekosuite.plugins.model.project.ProjectDB import FITS_FILE_INSERT
+from tests.testdata import fits_row, ingest_rows, night
+
+# What the triggers should have counted, from a full scan
+SCANNED_FACETS = """
+SELECT 'filter', image_type_generic, filter, NULL, COUNT(*) FROM fits_files GROUP BY 2, 3
+UNION ALL
+SELECT 'camera', image_type_generic, instrument, NULL, COUNT(*) FROM fits_files GROUP BY 2, 3
+UNION ALL
+SELECT 'target', image_type_generic, object, NULL, COUNT(*) FROM fits_files GROUP BY 2, 3
+UNION ALL
+SELECT 'telescope', image_type_generic, telescope, focal_length, COUNT(*) FROM fits_files GROUP BY 2, 3, 4
+UNION ALL
+SELECT 'night', ff.image_type_generic, ns.start_day, NULL, COUNT(*)
+FROM night_session_fits_files AS nsff
+JOIN night_sessions AS ns ON ns.id = nsff.night_session_id
+JOIN fits_files AS ff ON ff.id = nsff.fits_file_id
+GROUP BY 2, 3
+"""
+
+def counted(db: AppDB) -> list[tuple]:
+    return sorted(db.fetchall("SELECT facet, image_type, value, detail, count FROM facet_counts WHERE count != 0"), key=repr)
+
+def scanned(db: AppDB) -> list[tuple]:
+    return sorted(db.fetchall(SCANNED_FACETS), key=repr)
+
+def test_counts_follow_inserts_updates_and_deletes(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    day = datetime(2024, 5, 1)
+    ingest_rows(db, night(day, 'a') + night(day + timedelta(days=1), 'b'))
+    assert counted(db) == scanned(db)
+
+    # Ingested again with another type, filter and time, which moves it to another night
+    db.execute(FITS_FILE_INSERT, fits_row('a_light_0.fits', day + timedelta(days=2, hours=4), imagetype='Flat', filter='OIII'))
+    # A new night that links files inserted before it
+    db.execute(FITS_FILE_INSERT, fits_row('c_light_0.fits', day + timedelta(days=3, hours=4), filter=None))
+    db.execute("DELETE FROM fits_files WHERE filename = ?", ('b_light_1.fits',))
+    assert counted(db) == scanned(db)
+
+def test_options_list_values_with_counts(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    day = datetime(2024, 5, 1)
+    ingest_rows(db, night(day, 'a') + [fits_row('a_light_9.fits', day + timedelta(hours=5), filter='OIII')])
+    facets = ImageFacets(db)
+
+    assert facets.options(FilterType.FILTER, ['LIGHT']) == [('Ha', 'Ha', 6), ('OIII', 'OIII', 1)]
+    assert facets.options(FilterType.FILTER, ['DARK', 'FLAT']) == [(None, None, 3), ('Ha', 'Ha', 3)]
+    assert facets.options(FilterType.TELESCOPE, ['LIGHT']) == [('Telescope 550.0mm', ('Telescope', 550.0), 7)]
+    assert facets.options(FilterType.NIGHT, ['LIGHT', 'FLAT', 'DARK']) == [('2024-04-30', '2024-04-30', 13)]
+    assert facets.options(FilterType.TARGET, []) == []
+
+    # Telescopes without name or focal length are listed and selected as well
+    db.executemany(FITS_FILE_INSERT, [
+        fits_row('a_light_10.fits', day + timedelta(hours=6), telescope=None),
+        fits_row('a_light_11.fits', day + timedelta(hours=6), focal_length=None),
+        fits_row('a_flat_10.fits', day + timedelta(hours=13), telescope=None, focal_length=None, imagetype='Flat'),
+    ])
+    assert facets.options(FilterType.TELESCOPE, ['LIGHT', 'FLAT']) == [
+        ('Telescope', ('Telescope', None), 1),
+        ('Telescope 550.0mm', ('Telescope', 550.0), 10),
+        ('Unknown telescope', (None, None), 1),
+        ('Unknown telescope 550.0mm', (None, 550.0), 1),
+    ]
+    assert len(ImageFilterQuery(['LIGHT', 'FLAT'], {FilterType.TELESCOPE: [(None, None), ('Telescope', 550.0), ('Telescope', None)]}).imageIds(db)) == 12
+
+    # Every count is the number of frames its option selects
+    for filterType in FilterType:
+        for _, value, count in facets.options(filterType, ['LIGHT', 'FLAT']):
+            assert len(ImageFilterQuery(['LIGHT', 'FLAT'], {filterType: [value]}).imageIds(db)) == count
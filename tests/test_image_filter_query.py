@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+from ekosuite import AppDB
+from ekosuite.plugins.core.ImageFilterQuery import FilterType, ImageFilterQuery, ImageType, _compile
+from ekosuite.plugins.model.project.ProjectDB import FITS_FILE_INSERT
+from tests.testdata import fits_row
+
+def write_frames(db: AppDB) -> list[tuple]:
+    rows = []
+    for i in range(60):
+        rows.append(fits_row(f"/data/frame_{i}.fits", datetime(2024, 3, 1, 22, 0) + timedelta(days=i % 3),
+                             timezone_offset=None if i % 11 == 0 else -7.0, object=f"NGC {i % 2}",
+                             telescope=['Esprit', 'Esprit', 'RedCat'][i % 7 % 3], focal_length=[550.0, 400.0, 250.0][i % 7 % 3],
+                             filter=['Ha', 'OIII', None][i % 3], imagetype=['Light', 'Flat', 'Dark'][i % 3 if i % 5 else 0]))
+    db.executemany(FITS_FILE_INSERT, rows)
+    return rows
+
+def expected(db: AppDB, where: str, params: tuple = ()) -> list[int]:
+    return [row[0] for row in db.fetchall(f"SELECT ff.id FROM fits_files AS ff WHERE {where} ORDER BY 1", params)]
+
+def test_selections_match_their_predicates(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    write_frames(db)
+
+    def ids(imageTypes, selections) -> list[int]:
+        return sorted(ImageFilterQuery(imageTypes, selections).imageIds(db))
+
+    assert ids([ImageType.LIGHT], {}) == expected(db, "image_type_generic = 'LIGHT'")
+    assert ids(['LIGHT', 'FLAT'], {FilterType.FILTER: ['Ha', None]}) == expected(db, "image_type_generic IN ('LIGHT', 'FLAT') AND (filter = 'Ha' OR filter IS NULL)")
+    assert ids(['LIGHT'], {FilterType.FILTER: ['Ha', 'OIII', 'Ha'], FilterType.TARGET: ['NGC 1']}) == expected(db, "image_type_generic = 'LIGHT' AND filter IN ('Ha', 'OIII') AND object = 'NGC 1'")
+    # Telescopes match by name and focal length
+    assert ids(['LIGHT'], {FilterType.TELESCOPE: [('Esprit', 400.0), ['RedCat', 250.0]]}) == expected(db, "image_type_generic = 'LIGHT' AND ((telescope = 'Esprit' AND focal_length = 400.0) OR telescope = 'RedCat')")
+    # Files without a night session are only left out by night selections
+    assert db.get("SELECT night_session_id FROM night_session_fits_files WHERE fits_file_id = 1") is None
+    assert 1 in ids(['LIGHT'], {FilterType.CAMERA: ['Camera']})
+    night = db.get("SELECT start_day FROM night_sessions ORDER BY 1")[0]
+    assert ids(['LIGHT'], {FilterType.NIGHT: [night]}) == expected(db, """
+        image_type_generic = 'LIGHT' AND id IN (
+            SELECT fits_file_id FROM night_session_fits_files JOIN night_sessions ON id = night_session_id WHERE start_day = ?)
+    """, (night,))
+
+def test_statements_are_shared_and_searched_by_index(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    write_frames(db)
+
+    first, firstParams = ImageFilterQuery(['LIGHT'], {FilterType.FILTER: ['Ha', 'OIII', 'SII']}).compile()
+    second, secondParams = ImageFilterQuery(['LIGHT'], {FilterType.FILTER: ['L', 'R', 'G', 'B']}).compile()
+    assert first is second
+    assert len(firstParams) == len(secondParams)
+
+    hits = _compile.cache_info().hits
+    ImageFilterQuery(['LIGHT'], {FilterType.FILTER: ['Ha']}).compile()
+    ImageFilterQuery(['LIGHT'], {FilterType.FILTER: ['OIII']}).compile()
+    assert _compile.cache_info().hits > hits
+
+    for selections in [
+        {FilterType.FILTER: ['Ha']},
+        {FilterType.TELESCOPE: [('Esprit', 550.0)]},
+        {FilterType.NIGHT: ['2024-03-01'], FilterType.TARGET: ['NGC 1']},
+    ]:
+        query, params = ImageFilterQuery(['LIGHT'], selections).compile()
+        plan = [row[3] for row in db.fetchall("EXPLAIN QUERY PLAN " + query, params)]
+        assert not any(step.startswith("SCAN ff") for step in plan), plan
+
+def test_within_restricts_to_given_images(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    write_frames(db)
+    lights = expected(db, "image_type_generic = 'LIGHT' AND filter = 'Ha'")
+
+    assert sorted(ImageFilterQuery(['LIGHT'], {FilterType.FILTER: ['Ha']}, within=range(1, 31)).imageIds(db)) == [id for id in lights if id <= 30]
+    assert ImageFilterQuery(['LIGHT'], {}, within=[]).imageIds(db) == []
@@ -0,0 +1,29 @@
+import math
+
+import numpy as np
+
+from ekosuite.plugins.model.images.ImageMeasurement import ImageMeasurement
+from tests.testdata import STAR_FIELD_SHAPE, star_field
+
+def test_round_stars():
+    for sigma in (1.2, 2.0, 3.0):
+        measurement = ImageMeasurement.measure(star_field(sigma, sigma))
+        assert math.isclose(measurement.fwhm, 2 * math.sqrt(2 * math.log(2)) * sigma, rel_tol=0.03)
+        assert measurement.eccentricity < 0.35
+        assert measurement.snr > 50
+        # Median of the sky gradient
+        assert abs(measurement.median - 1090) < 5
+
+def test_elongated_stars():
+    measurement = ImageMeasurement.measure(star_field(3.0, 1.5, angle=0.5))
+    assert math.isclose(measurement.fwhm, 2 * math.sqrt(2 * math.log(2)) * math.sqrt((3.0 ** 2 + 1.5 ** 2) / 2), rel_tol=0.03)
+    assert math.isclose(measurement.eccentricity, math.sqrt(1 - 0.25), abs_tol=0.03)
+
+def test_hot_pixels_are_not_stars():
+    rng = np.random.default_rng(1)
+    pixels = rng.normal(1000, 10, STAR_FIELD_SHAPE)
+    pixels[rng.integers(20, 580, 50), rng.integers(20, 880, 50)] = 60000
+    measurement = ImageMeasurement.measure(pixels)
+    assert measurement.fwhm is None
+    assert measurement.eccentricity is None
+    assert abs(measurement.median - 1000) < 2
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+import pytest
+
+from ekosuite import AppDB
+from ekosuite.plugins.model.images.DBImage import DBImage
+from ekosuite.plugins.model.images.ImageRecord import ImageRecordSession
+from ekosuite.plugins.model.project.ProjectDB import FITS_FILE_INSERT
+
+def insert_frames(db: AppDB, count: int) -> list[int]:
+    start = datetime(2023, 10, 2, 4, 0, 0)
+    db.executemany(FITS_FILE_INSERT, [
+        (f'light_{i}.fits', start + timedelta(minutes=i), 34.0, -118.0, -7.0, 100, 100, 3.76, None, 'M 31', 10.0, 41.0,
+         'Camera', 'Telescope', 'Ha', 'Light', 300.0, 550.0, 10.0, -10.0, 100.0 + i, 50.0, 20.0, 1.2)
+        for i in range(count)
+    ])
+    return list(map(lambda row: row[0], db.fetchall("SELECT id FROM fits_files ORDER BY id")))
+
+def test_images_are_hydrated_with_one_query(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    ids = insert_frames(db, 1000)
+    session = ImageRecordSession(db)
+    images = DBImage.load(ids, db, session)
+
+    db.readerMetrics.reset()
+    assert [image.gain for image in images] == [100.0 + i for i in range(1000)]
+    assert images[0].filename == 'light_0.fits'
+    assert images[0].create_time == datetime(2023, 10, 2, 4, 0, 0)
+    assert db.readerMetrics.snapshot()["count"] == 2, "1000 ids are loaded in two chunks"
+
+    # The identity map serves ids that were already loaded
+    assert session.load(ids[:10])[0] is images[0].record
+    assert db.readerMetrics.snapshot()["count"] == 2
+    db.close()
+
+def test_records_are_immutable(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    ids = insert_frames(db, 1)
+    record = ImageRecordSession(db).get(ids[0])
+    with pytest.raises(AttributeError):
+        record.gain = 0
+    with pytest.raises(ValueError):
+        ImageRecordSession(db).get(ids[0] + 1)
+    db.close()
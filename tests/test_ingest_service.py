@@ -0,0 +1,53 @@
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from ekosuite import AppDB, ProjectDB
+from ekosuite.app.IngestService import IngestService
+
+def flat(i: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        filename=f'flat_{i}.fits', create_time=datetime(2023, 10, 2, 14, 0) + timedelta(seconds=i), latitude=None,
+        longitude=None, timezone_offset=None, image_width=100, image_height=100, pixel_size=3.76, scale=None,
+        object='FlatWizard', ra=0.0, dec=0.0, instrument='Camera', telescope='Telescope', filter='Ha',
+        imagetype='Flat', exptime=1.0, focal_length=550.0, temperature=10.0, sensor_temperature=-10.0,
+        gain=100.0, bias=50.0, mpsas=None, airmass=None,
+    )
+
+class CountingProjectDB(ProjectDB):
+    def __init__(self, db):
+        super().__init__(db)
+        self.batches = []
+
+    def insertImages(self, images):
+        self.batches.append(len(images))
+        super().insertImages(images)
+
+def test_arrivals_are_inserted_in_micro_batches(tmp_path):
+    db = AppDB(folder=os.path.join(tmp_path, 'db'))
+    projectDB = CountingProjectDB(db)
+    service = IngestService(projectDB, maxBatch=10, maxDelay=5)
+    for i in range(25):
+        service.submit(flat(i))
+    service.stop()
+
+    assert projectDB.batches == [10, 10, 5]
+    assert db.get("SELECT COUNT(*) FROM fits_files")[0] == 25
+    latency = service.latency.snapshot()
+    assert latency['count'] == 25
+    assert 0 < latency['max_wait'] < 5
+    db.close()
+
+def test_time_window_bounds_batch_delay(tmp_path):
+    db = AppDB(folder=os.path.join(tmp_path, 'db'))
+    projectDB = CountingProjectDB(db)
+    service = IngestService(projectDB, maxBatch=100, maxDelay=0.05)
+    service.submit(flat(0))
+    # The single image is inserted once its window closes, without waiting for more
+    for _ in range(100):
+        if db.get("SELECT COUNT(*) FROM fits_files")[0] == 1:
+            break
+        service._thread.join(0.02)
+    assert db.get("SELECT COUNT(*) FROM fits_files")[0] == 1
+    service.stop()
+    db.close()
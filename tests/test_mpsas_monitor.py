@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+
+from ekosuite import AppDB
+from ekosuite.plugins.plugin_implementations.MPSASMonitor import nightlySkyBrightness, skyBrightness
+from tests.testdata import ingest_rows, night
+
+def test_nights_are_summarized_together():
+    assert skyBrightness([], []) == {}
+    assert skyBrightness(['b', 'a', 'a', 'b', 'a'], [21.0, 20.5, 19.0, 20.0, 21.5]) == {
+        'a': {"frames": 3, "median": 20.5, "darkest": 21.5, "brightest": 19.0},
+        'b': {"frames": 2, "median": 20.5, "darkest": 21.0, "brightest": 20.0},
+    }
+
+def test_batches_cover_whole_nights(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    day = datetime(2024, 5, 1)
+    ingest_rows(db, night(day, 'a') + night(day + timedelta(days=3), 'b'))
+    db.execute("UPDATE fits_files SET mpsas = CASE WHEN image_type_generic = 'LIGHT' THEN 20.0 + id / 10.0 END")
+    lights = db.fetchall("SELECT id FROM fits_files WHERE image_type_generic = 'LIGHT' ORDER BY id")
+    first, second = [id for id, in lights[:6]], [id for id, in lights[6:]]
+
+    # One frame of a night summarizes all of its frames
+    nights = nightlySkyBrightness(db, [first[2]])
+    assert list(nights.values()) == [{"frames": 6, "median": 20.35, "darkest": 20.6, "brightest": 20.1}]
+    assert nightlySkyBrightness(db, [first[0], second[-1]]).keys() == {list(nights)[0], *nightlySkyBrightness(db, second[:1])}
+    assert nightlySkyBrightness(db, []) == {}
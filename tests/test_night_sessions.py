@@ -0,0 +1,74 @@
+from datetime import datetime
+
+from ekosuite import AppDB
+from ekosuite.plugins.model.project.ProjectDB import FITS_FILE_INSERT
+from tests.testdata import fits_row
+
+# The night_session_fits_files view as it was defined before sessions were materialized
+LEGACY_NIGHT_SESSION_FITS_FILES = """
+SELECT
+    ns.id AS night_session_id,
+    ff.id AS fits_file_id
+FROM
+    night_sessions ns
+JOIN
+    fits_files ff
+ON
+    (
+        DATE(DATETIME(ff.create_time, (ff.timezone_offset || ' hours'))) = ns.start_day
+        AND
+        TIME(DATETIME(ff.create_time, (ff.timezone_offset || ' hours'))) > '12:00:00'
+    )
+    OR
+    (
+        DATE(DATETIME(ff.create_time, (ff.timezone_offset || ' hours'))) = DATE(ns.start_day, '+1 day')
+        AND
+        TIME(DATETIME(ff.create_time, (ff.timezone_offset || ' hours'))) <= '12:00:00'
+    )
+ORDER BY 1, 2
+"""
+
+def sessions(db: AppDB) -> list[tuple]:
+    return db.fetchall("SELECT night_session_id, fits_file_id FROM night_session_fits_files ORDER BY 1, 2")
+
+def test_materialized_sessions_match_legacy_view(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    db.executemany(FITS_FILE_INSERT, [
+        # Flats without timezone, taken on a night that has no lights yet
+        fits_row('flat_1.fits', datetime(2023, 10, 3, 5, 0, 0), timezone_offset=None, imagetype='Flat'),
+        fits_row('flat_2.fits', datetime(2023, 10, 4, 5, 0, 0), timezone_offset=None, imagetype='Flat'),
+        # Lights around noon local time (UTC-7)
+        fits_row('light_1.fits', datetime(2023, 10, 1, 19, 0, 1)),
+        fits_row('light_2.fits', datetime(2023, 10, 2, 18, 59, 59)),
+        fits_row('light_3.fits', datetime(2023, 10, 2, 19, 0, 0)),
+        fits_row('light_4.fits', datetime(2023, 10, 2, 19, 0, 1)),
+        # A different site east of UTC
+        fits_row('light_5.fits', datetime(2023, 10, 2, 23, 30, 0), timezone_offset=10.0),
+    ])
+    assert sessions(db) == db.fetchall(LEGACY_NIGHT_SESSION_FITS_FILES)
+
+    # Timezone backfill of calibration frames moves them into existing sessions only
+    db.execute("UPDATE fits_files SET timezone_offset = -7.0 WHERE image_type_generic = 'FLAT'")
+    assert sessions(db) == db.fetchall(LEGACY_NIGHT_SESSION_FITS_FILES)
+
+    # A light on the flats' night creates the session and picks up the earlier flats
+    db.execute(FITS_FILE_INSERT, fits_row('light_6.fits', datetime(2023, 10, 4, 4, 0, 0)))
+    assert sessions(db) == db.fetchall(LEGACY_NIGHT_SESSION_FITS_FILES)
+    assert len(db.fetchall("SELECT 1 FROM night_session_fits_files WHERE fits_file_id IN (SELECT id FROM fits_files WHERE filename LIKE 'flat_%')")) == 2
+
+    # Removing a file removes its session link
+    db.execute("DELETE FROM fits_files WHERE filename = 'light_5.fits'")
+    assert sessions(db) == db.fetchall(LEGACY_NIGHT_SESSION_FITS_FILES)
+    db.close()
+
+def test_session_lookup_uses_index(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    plan = db.fetchall("""
+        EXPLAIN QUERY PLAN
+        SELECT ff.id FROM fits_files ff
+        JOIN night_session_fits_files nsff ON nsff.fits_file_id = ff.id
+        WHERE nsff.night_session_id = ?
+    """, (1,))
+    details = ' '.join(map(lambda row: row[-1], plan))
+    assert 'idx_fits_file_night_sessions_night_session_id' in details
+    db.close()
@@ -0,0 +1,143 @@
+import threading
+import time
+
+from ekosuite.plugins.core.PluginInterface import PluginInterface
+from ekosuite.plugins.core.PluginScheduler import PluginScheduler
+
+class RecordingPlugin(PluginInterface):
+    """
+    Records the images it executes and the thread, sleeping `delay` seconds per image.
+    """
+    pluginName = "Recording"
+
+    def __init__(self, delay: float = 0.0, failOn: object = None):
+        self.delay = delay
+        self.failOn = failOn
+        self.executed: list = []
+        self.threads: set[str] = set()
+
+    def initialize(self, db):
+        pass
+
+    @classmethod
+    def name(cls) -> str:
+        return cls.pluginName
+
+    def description() -> str:
+        return "Records executed images"
+
+    def getUserInterface(self):
+        return None
+
+    def execute(self, input, db):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        if input == self.failOn:
+            raise ValueError("Broken frame")
+        self.executed.append(input)
+        return input * 2
+
+    def terminate(self):
+        pass
+
+class SlowPlugin(RecordingPlugin):
+    pluginName = "Slow"
+
+class BatchPlugin(RecordingPlugin):
+    """
+    Records the batches it executes, with their backfill flag.
+    """
+    pluginName = "Batch"
+
+    def __init__(self, delay: float = 0.0):
+        super().__init__(delay)
+        self.batches: list[tuple[list, bool]] = []
+
+    def executeBatch(self, inputs, db, backfill=False):
+        time.sleep(self.delay)
+        self.batches.append((list(inputs), backfill))
+        return sum(inputs)
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+def test_slow_plugins_do_not_hold_up_others():
+    results = []
+    scheduler = PluginScheduler(db=None, maxWorkers=2, onExecuted=lambda plugin, images, outputs: results.append((plugin.name(), images, outputs)))
+    fast, slow = RecordingPlugin(), SlowPlugin(delay=0.05)
+    scheduler.add(fast)
+    scheduler.add(slow)
+
+    start = time.perf_counter()
+    for i in range(20):
+        scheduler.submit([i])
+    assert time.perf_counter() - start < 0.05
+
+    wait_until(lambda: len(fast.executed) == 20)
+    assert len(slow.executed) < 20
+    wait_until(lambda: len(slow.executed) == 20)
+    assert fast.executed == list(range(20)) and slow.executed == list(range(20))
+    assert all(thread.startswith("PluginScheduler") for thread in fast.threads | slow.threads)
+
+    metrics = scheduler.metrics()
+    # Frames that arrived while the slow plugin was busy were coalesced into few batches
+    assert metrics["Slow"]["images"] == 20
+    assert metrics["Slow"]["batches"] < 20
+    assert metrics["Slow"]["max_execute"] >= 0.05
+    assert metrics["Recording"]["avg_execute"] < metrics["Slow"]["avg_execute"]
+    wait_until(lambda: sum(len(images) for name, images, _ in results if name == "Slow") == 20)
+    assert all(outputs == [image * 2 for image in images] for _, images, outputs in results)
+    scheduler.stop()
+
+def test_failures_are_counted_and_removed_plugins_stop():
+    scheduler = PluginScheduler(db=None)
+    failing = RecordingPlugin(failOn=1)
+    scheduler.add(failing)
+    scheduler.submit([0, 1, 2])
+    wait_until(lambda: scheduler.metrics()["Recording"]["images"] == 3)
+    # The batch stops at the failing frame
+    assert failing.executed == [0]
+    assert scheduler.metrics()["Recording"]["errors"] == 1
+
+    scheduler.submit([2])
+    wait_until(lambda: failing.executed == [0, 2])
+    scheduler.remove(failing)
+    scheduler.submit([3])
+    time.sleep(0.05)
+    assert failing.executed == [0, 2]
+    assert scheduler.metrics() == {}
+    scheduler.stop()
+
+def test_batches_keep_backfill_and_live_images_apart():
+    results = []
+    scheduler = PluginScheduler(db=None, maxBatch=4, onExecuted=lambda plugin, images, result: results.append((images, result)))
+    plugin = BatchPlugin(delay=0.05)
+    scheduler.add(plugin)
+    scheduler.submit([0])
+    # Queued while the first batch runs
+    scheduler.submit(list(range(1, 7)), backfill=True)
+    scheduler.submit([7, 8])
+    wait_until(lambda: scheduler.metrics()["Batch"]["images"] == 9)
+
+    assert plugin.batches == [([0], False), ([1, 2, 3, 4], True), ([5, 6], True), ([7, 8], False)]
+    assert plugin.executed == []
+    wait_until(lambda: len(results) == 4)
+    assert results[1] == ([1, 2, 3, 4], 10)
+    scheduler.stop()
+
+def test_removed_plugins_are_not_executed_with_empty_batches():
+    scheduler = PluginScheduler(db=None, maxWorkers=1)
+    busy, plugin = SlowPlugin(delay=0.1), BatchPlugin()
+    scheduler.add(busy)
+    scheduler.submit([0])
+    # Scheduled behind the busy plugin, then removed before its batch starts
+    scheduler.add(plugin)
+    scheduler.submit([1])
+    scheduler.remove(plugin)
+    wait_until(lambda: busy.executed == [0, 1])
+    time.sleep(0.05)
+    assert plugin.batches == []
+    scheduler.stop()
@@ -0,0 +1,47 @@
+import asyncio
+import math
+
+from ekosuite import AppDB
+from ekosuite.plugins.model.images.FITSImage import FITSImage
+from ekosuite.plugins.model.images.ImageAnalysis import ImageAnalysis
+from ekosuite.plugins.model.images.ImageData import ImageData
+from ekosuite.plugins.model.images.ImageMeasurement import ImageMeasurement
+from ekosuite.plugins.model.images.QuickLookAnalysis import QuickLookAnalysis
+from tests.testdata import star_field, write_night
+
+def test_binned_measures_match_full_resolution():
+    pixels = star_field(3.0, 3.0)
+    full = ImageMeasurement.measure(pixels)
+    for binning, tolerance in ((2, 0.03), (4, 0.05)):
+        quick = ImageMeasurement.measure(ImageData(pixels).binned(binning), binning=binning)
+        assert quick.approximate
+        assert math.isclose(quick.fwhm, full.fwhm, rel_tol=tolerance)
+        assert math.isclose(quick.noise, full.noise, rel_tol=0.15)
+        assert math.isclose(quick.median, full.median, rel_tol=0.01)
+
+def test_full_analysis_replaces_quick_look(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    ids = write_night(tmp_path, db, lights=2)
+    filenames = [row[0] for row in db.fetchall("SELECT filename FROM fits_files WHERE image_type_generic = 'LIGHT' ORDER BY id")]
+    quickLook = QuickLookAnalysis(db)
+    quickLook.submit([FITSImage(filename) for filename in filenames]).result()
+    assert db.fetchall("SELECT image_id, approximate FROM image_analysis ORDER BY image_id") == [(id, 1) for id in ids]
+
+    pending = ImageAnalysis.approximated(db)
+    assert [image.id for image in pending] == ids
+    results = asyncio.run(ImageAnalysis(db, pending, maxWorkers=1).analyze(calibrate=True))
+    assert not any(result.approximate for result in results)
+
+    # A late quick look does not overwrite the full analysis
+    quickLook.analyze([FITSImage(filenames[0])])
+    quickLook.stop()
+    assert db.fetchall("SELECT image_id, approximate FROM image_analysis ORDER BY image_id") == [(id, 0) for id in ids]
+    assert ImageAnalysis.approximated(db) == []
+
+def test_images_are_looked_up_in_one_statement(tmp_path):
+    db = AppDB(folder=str(tmp_path))
+    ids = write_night(tmp_path, db, lights=1)
+    filename = db.get("SELECT filename FROM fits_files WHERE id = ?", (ids[0],))[0]
+    # More file names than SQLite binds parameters per statement, 32766 by default and 250000 in some builds
+    filenames = [f'missing_{i}.fits' for i in range(250000)] + [filename]
+    assert QuickLookAnalysis(db)._imageIds(filenames) == {filename: ids[0]}
@@ -0,0 +1,47 @@
+import os
+import time
+import numpy as np
+from astropy.io import fits
+
+from ekosuite.plugins.model.project.ProjectDB import FileReader
+
+class SlowReader(FileReader):
+    def _readImage(self, path: str):
+        time.sleep(0.001)
+        return (path,)
+
+def test_reads_do_not_run_ahead_of_the_consumer():
+    reader = SlowReader(maxWorkers=2)
+    pulled = 0
+    def paths():
+        nonlocal pulled
+        for i in range(200):
+            pulled += 1
+            yield f'frame_{i}.fits'
+
+    consumed = 0
+    results = []
+    for path, row in reader.read(paths()):
+        consumed += 1
+        assert pulled - consumed <= reader.maxInFlight
+        results.append(row)
+    assert sorted(results) == sorted((f'frame_{i}.fits',) for i in range(200))
+
+def test_process_backend_reads_the_same_rows(tmp_path):
+    paths = []
+    for i in range(40):
+        hdu = fits.PrimaryHDU(np.zeros((8, 8), dtype=np.uint16))
+        hdu.header['DATE-OBS'] = f'2023-10-02T04:{i:02d}:00.000'
+        hdu.header['SITELAT'] = 34.0
+        hdu.header['SITELONG'] = -118.0
+        hdu.header['IMAGETYP'] = 'Light'
+        paths.append(os.path.join(tmp_path, f'light_{i}.fits'))
+        hdu.writeto(paths[-1])
+    rows = {}
+    for backend in ('threads', 'processes'):
+        reader = FileReader(maxWorkers=2, backend=backend)
+        reader.processChunkSize = 8
+        rows[backend] = dict(reader.read(paths))
+        reader.shutdown()
+    assert rows['processes'] == rows['threads']
+    assert len(rows['threads']) == 40 and None not in rows['threads'].values()
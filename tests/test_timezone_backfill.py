@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+
+from ekosuite import AppDB
+from ekosuite.plugins.model.project.ProjectDB import FITS_FILE_INSERT
+from tests.testdata import fits_row, ingest_rows, night
+
+# The statement that ran after every inserted chunk before the backfill became incremental
+LEGACY_TIMEZONE_BACKFILL = """
+UPDATE fits_files
+SET timezone_offset = (
+    SELECT source.timezone_offset
+        FROM fits_files AS source
+        WHERE source.create_time BETWEEN DATETIME(create_time, '-12 hours')
+            AND DATETIME(create_time, '+12 hours')
+            AND source.timezone_offset IS NOT NULL
+            AND source.instrument = instrument
+            AND (source.telescope = telescope OR image_type_generic NOT IN ('FLAT', 'MASTER FLAT'))
+            AND (source.filter = filter OR image_type_generic IN ('DARK', 'MASTER DARK', 'BIAS', 'MASTER BIAS'))
+        ORDER BY ABS(DATETIME(source.create_time) - DATETIME(create_time))
+        LIMIT 1
+)
+WHERE timezone_offset IS NULL;
+"""
+
+def timezones(db: AppDB) -> list[tuple]:
+    return db.fetchall("SELECT filename, timezone_offset FROM fits_files ORDER BY filename")
+
+def two_sites(day: datetime) -> list[tuple]:
+    """
+    Lights of two cameras at sites in UTC-7 and UTC+1, taken in alternation, each followed by
+    flats and darks without location.
+    """
+    sites = {
+        'west': {'instrument': 'West Camera', 'telescope': 'West Telescope', 'latitude': 34.0, 'longitude': -118.0, 'timezone_offset': -7.0},
+        'east': {'instrument': 'East Camera', 'telescope': 'East Telescope', 'latitude': 48.0, 'longitude': 11.0, 'timezone_offset': 1.0},
+    }
+    rows = []
+    for i in range(6):
+        for offset, (site, columns) in enumerate(sites.items()):
+            rows.append(fits_row(f'{site}_light_{i}.fits', day + timedelta(hours=4, minutes=10 * i + offset), **columns))
+    for i in range(3):
+        for offset, (site, columns) in enumerate(sites.items()):
+            calibration = {**columns, 'latitude': None, 'longitude': None, 'timezone_offset': None}
+            rows.append(fits_row(f'{site}_flat_{i}.fits', day + timedelta(hours=5, minutes=2 * i + offset), imagetype='Flat', **calibration))
+            rows.append(fits_row(f'{site}_dark_{i}.fits', day + timedelta(hours=6, minutes=2 * i + offset), imagetype='Dark', filter=None, **calibration))
+    return rows
+
+def test_incremental_backfill_matches_legacy_statement(tmp_path):
+    first = night(datetime(2023, 10, 2), 'a')
+    second = night(datetime(2023, 10, 5), 'b')
+
+    legacy = AppDB(folder=str(tmp_path / 'legacy'))
+    incremental = AppDB(folder=str(tmp_path / 'incremental'))
+
+    for batch in (first, second):
+        legacy.executemany(FITS_FILE_INSERT, batch)
+        legacy.execute(LEGACY_TIMEZONE_BACKFILL)
+        ingest_rows(incremental, batch)
+
+    assert timezones(incremental) == timezones(legacy)
+    assert all(map(lambda row: row[1] == -7.0, timezones(incremental)))
+    legacy.close()
+    incremental.close()
+
+def test_backfill_keeps_sites_apart(tmp_path):
+    """
+    Calibration frames get the timezone of their own camera's site. The legacy statement cannot be
+    compared here: its unqualified columns resolve to `source`, so it matches frames of any camera.
+    """
+    rows = two_sites(datetime(2023, 10, 2))
+    db = AppDB(folder=str(tmp_path))
+    # Calibration frames of both sites arrive before some of the lights they are matched with
+    for batch in (rows[0::3], rows[1::3], rows[2::3]):
+        ingest_rows(db, batch)
+
+    for filename, timezone_offset in timezones(db):
+        assert timezone_offset == {'west': -7.0, 'east': 1.0}[filename.split('_')[0]], filename
+    db.close()
+
+def test_backfill_revisits_frames_when_lights_arrive_later(tmp_path):
+    rows = night(datetime(2023, 10, 2), 'a')
+    lights = [row for row in rows if row[15] == 'Light']
+    calibration = [row for row in rows if row[15] != 'Light']
+
+    db = AppDB(folder=str(tmp_path))
+    for batch in (calibration, lights):
+        ingest_rows(db, batch)
+
+    assert db.get("SELECT COUNT(*) FROM fits_files WHERE timezone_offset IS NULL") == (0,)
+    db.close()
+
+def test_backfill_covers_upserted_frames(tmp_path):
+    """
+    An upsert keeps the id of the row, which must not keep the frame out of the backfill.
+    """
+    day = datetime(2023, 10, 2)
+    dark = dict(latitude=None, longitude=None, timezone_offset=None, imagetype='Dark', filter=None)
+    db = AppDB(folder=str(tmp_path))
+    ingest_rows(db, night(day, 'a'))
+
+    # A dark with a wrong clock, too far from any light to get a timezone
+    ingest_rows(db, [fits_row('a_dark_9.fits', day + timedelta(days=3), **dark)])
+    darkId, timezone_offset = db.get("SELECT id, timezone_offset FROM fits_files WHERE filename = 'a_dark_9.fits'")
+    assert timezone_offset is None
+
+    # Ingested again with the clock fixed, and still without timezone after the upsert
+    db.execute(FITS_FILE_INSERT, fits_row('a_dark_9.fits', day + timedelta(hours=14, minutes=9), **dark))
+    assert db.get("SELECT id, timezone_offset FROM fits_files WHERE filename = 'a_dark_9.fits'") == (darkId, None)
+
+    ingest_rows(db, [fits_row('a_dark_9.fits', day + timedelta(hours=14, minutes=9), **dark)])
+    assert db.get("SELECT id, timezone_offset FROM fits_files WHERE filename = 'a_dark_9.fits'") == (darkId, -7.0)
+    db.close()
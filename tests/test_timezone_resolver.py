@@ -0,0 +1,18 @@
+from datetime import datetime
+from ekosuite.plugins.model.images.Image import Image
+from ekosuite.plugins.model.images.TimezoneResolver import TimezoneResolver
+
+def test_offset_follows_daylight_saving_time():
+    resolver = TimezoneResolver()
+    assert resolver.offset(34.05, -118.24, datetime(2024, 10, 1, 6, 0)) == -7
+    assert resolver.offset(34.05, -118.24, datetime(2024, 1, 15, 6, 0)) == -8
+
+def test_nearby_frames_share_one_lookup():
+    resolver = TimezoneResolver()
+    for i in range(100):
+        assert resolver.offset(48.2082 + i * 1e-5, 16.3738, datetime(2024, 7, 1, 22, i % 60)) == 2
+    assert resolver._zoneAt.cache_info().misses == 1
+    assert resolver._offsetAt.cache_info().misses == 4
+
+def test_unknown_location_has_no_offset():
+    assert Image.timezoneOffsetAt(None, 16.3738) is None
@@ -0,0 +1,35 @@
+import os
+import numpy as np
+import pytest
+from xisf import XISF
+
+from ekosuite.plugins.model.images.XISFHeader import read_xisf_header, read_xisf_image
+from ekosuite.plugins.model.images.XISFImage import XISFImage
+from tests.testdata import write_xisf
+
+def test_header_matches_xisf_package(tmp_path):
+    pixels = np.random.default_rng(1).integers(0, 65535, (40, 30, 1), dtype=np.uint16)
+    for name, options in (('plain.xisf', {}), ('compressed.xisf', {'codec': 'zlib', 'shuffle': True})):
+        path = write_xisf(os.path.join(tmp_path, name), pixels, **options)
+        reference = XISF(path)
+        metadata = read_xisf_header(path)
+        expected = reference.get_images_metadata()[0]
+        for key in ('geometry', 'location', 'dtype', 'FITSKeywords'):
+            assert metadata[key] == expected[key]
+        assert metadata.get('compression') == expected.get('compression')
+        assert np.array_equal(read_xisf_image(path, metadata), reference.read_image(0))
+
+def test_xisf_image_reads_header_once(tmp_path):
+    path = write_xisf(os.path.join(tmp_path, 'light.xisf'), np.zeros((20, 10, 1), dtype=np.float32))
+    image = XISFImage(path)
+    assert image.object == 'M 31'
+    assert image.create_time.microsecond == 123456
+    assert image.image_data._raw_data.shape == (20, 10, 1)
+
+def test_non_xisf_files_are_rejected(tmp_path):
+    path = os.path.join(tmp_path, 'light.xisf')
+    with open(path, 'wb') as f:
+        f.write(b'SIMPLE  ' + b'\0' * 100)
+    # FITS files are not XISF files
+    with pytest.raises(ValueError):
+        read_xisf_header(path)
@@ -1,18 +1,157 @@
-import asyncio
+import json
+import math
 import os
 import time
 import shutil
+import fitsio
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 from astropy.nddata import CCDData
 from astropy.io import fits
+from xisf import XISF
 
 from ekosuite import AppDB, FileSystemObserver, FileSystemImageChangeListener
 from ekosuite import ProjectDB
+from ekosuite.plugins.model.project.ProjectDB import FITS_FILE_INSERT, TIMEZONE_BACKFILL
+
+# The columns of a `FITS_FILE_INSERT` row in order, with the values of a light of M 31 from a site in UTC-7
+FITS_ROW = {
+    'filename': None, 'create_time': None, 'latitude': 34.0, 'longitude': -118.0, 'timezone_offset': -7.0,
+    'image_width': 100, 'image_height': 100, 'pixel_size': 3.76, 'scale': None, 'object': 'M 31', 'ra': 10.0,
+    'dec': 41.0, 'instrument': 'Camera', 'telescope': 'Telescope', 'filter': 'Ha', 'imagetype': 'Light',
+    'exptime': 300.0, 'focal_length': 550.0, 'temperature': 10.0, 'sensor_temperature': -10.0, 'gain': 100.0,
+    'bias': 50.0, 'mpsas': 20.0, 'airmass': 1.2,
+}
+
+# FITS keywords of `write_xisf`, as the xisf package reads them
+XISF_KEYWORDS = {
+    'DATE-OBS': [{'value': "'2023-10-01T19:00:01.123456'", 'comment': 'UTC'}],
+    'SITELAT': [{'value': '34.0', 'comment': ''}],
+    'OBJECT': [{'value': "'M 31    '", 'comment': 'Target'}],
+    'HISTORY': [{'value': '', 'comment': 'first'}, {'value': '', 'comment': 'second'}],
+}
+
+# Frames of `star_field`
+STAR_FIELD_SHAPE = (600, 900)
+
+# Frames of `write_night`, with the levels they are made of
+NIGHT_SHAPE = (120, 160)
+NIGHT_BIAS = 500
+NIGHT_DARK_CURRENT = 20
+NIGHT_SKY = 1000
 
 def test_data_folder():
     return os.path.join(os.path.dirname(__file__), "__data__")
 
+def fits_row(filename: str, create_time: datetime, **columns) -> tuple:
+    """
+    A `FITS_FILE_INSERT` row with the values of `FITS_ROW`, except for the given `columns`.
+    """
+    unknown = columns.keys() - FITS_ROW.keys()
+    if unknown:
+        raise TypeError(f"Unknown columns {sorted(unknown)}")
+    return tuple({**FITS_ROW, 'filename': filename, 'create_time': create_time, **columns}.values())
+
+def ingest_rows(db: AppDB, rows: list[tuple]):
+    """
+    Inserts or updates `rows` and backfills their timezones, as an ingest does.
+    """
+    db.executemany(FITS_FILE_INSERT, rows)
+    db.execute(TIMEZONE_BACKFILL, {"filenames": json.dumps([row[0] for row in rows])})
+
+def night(day: datetime, prefix: str) -> list[tuple]:
+    """
+    A night of lights at a single site (UTC-7), followed by flats and darks without location.
+    """
+    rows = [fits_row(f'{prefix}_light_{i}.fits', day + timedelta(hours=4, minutes=10 * i)) for i in range(6)]
+    rows += [fits_row(f'{prefix}_flat_{i}.fits', day + timedelta(hours=13, minutes=i), latitude=None, longitude=None,
+                      timezone_offset=None, imagetype='Flat') for i in range(3)]
+    rows += [fits_row(f'{prefix}_dark_{i}.fits', day + timedelta(hours=14, minutes=i), latitude=None, longitude=None,
+                      timezone_offset=None, imagetype='Dark', filter=None) for i in range(3)]
+    return rows
+
+def star_field(sigma_x: float, sigma_y: float, angle: float = 0.0, stars: int = 150, seed: int = 0) -> np.ndarray:
+    """
+    Stars of the given widths, rotated by `angle`, on a sky with a gradient as from light pollution.
+    """
+    rng = np.random.default_rng(seed)
+    y, x = np.indices(STAR_FIELD_SHAPE)
+    pixels = rng.normal(1000, 10, STAR_FIELD_SHAPE) + 0.2 * x
+    for cx, cy in zip(rng.uniform(20, STAR_FIELD_SHAPE[1] - 20, stars), rng.uniform(20, STAR_FIELD_SHAPE[0] - 20, stars)):
+        u = (x - cx) * math.cos(angle) + (y - cy) * math.sin(angle)
+        v = -(x - cx) * math.sin(angle) + (y - cy) * math.cos(angle)
+        pixels += rng.uniform(500, 3000) * np.exp(-(u ** 2 / (2 * sigma_x ** 2) + v ** 2 / (2 * sigma_y ** 2)))
+    return pixels
+
+def write_night(folder, db: AppDB, lights: int = 4, day: datetime = datetime(2023, 10, 2)) -> list[int]:
+    """
+    Writes flats, a master bias and dark, and `lights` lights of a few stars taken on `day` to
+    `folder` and inserts them. Returns the ids of the lights.
+    """
+    rng = np.random.default_rng(11)
+    rows = []
+    def stars(sigma: float) -> np.ndarray:
+        y, x = np.indices(NIGHT_SHAPE)
+        pixels = rng.normal(NIGHT_SKY, 5, NIGHT_SHAPE)
+        # Stars far enough apart to be measured on their own
+        for cx in (35, 80, 125):
+            for cy in (30, 90):
+                cx, cy = cx + rng.uniform(-3, 3), cy + rng.uniform(-3, 3)
+                pixels += 2000 * np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * sigma ** 2))
+        return pixels
+    def write(name: str, pixels: np.ndarray, imagetype: str, minute: int):
+        path = os.path.join(folder, name)
+        fitsio.write(path, pixels.astype(np.uint16), clobber=True)
+        rows.append(fits_row(path, day + timedelta(hours=4, minutes=minute), image_width=NIGHT_SHAPE[1], image_height=NIGHT_SHAPE[0], imagetype=imagetype))
+    for i in range(5):
+        write(f'flat_{i}.fits', rng.normal(20000, 50, NIGHT_SHAPE), 'Flat', i)
+    write('bias.fits', np.full(NIGHT_SHAPE, NIGHT_BIAS), 'Master Bias', 10)
+    write('dark.fits', np.full(NIGHT_SHAPE, NIGHT_BIAS + NIGHT_DARK_CURRENT), 'Master Dark', 11)
+    for i in range(lights):
+        write(f'light_{i}.fits', stars(2.0) + NIGHT_BIAS + NIGHT_DARK_CURRENT, 'Light', 20 + i)
+    db.executemany(FITS_FILE_INSERT, rows)
+    lights = json.dumps([row[0] for row in rows if row[15] == 'Light'])
+    return [row[0] for row in db.fetchall("SELECT id FROM fits_files WHERE filename IN (SELECT value FROM json_each(?)) ORDER BY id", (lights,))]
+
+def write_fits(path: str, object: str = 'M 31', **keywords) -> str:
+    """
+    Writes a small light of `object`. `keywords` add or replace header cards, with `_` standing
+    for `-` as in `DATE_OBS`.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    hdu = fits.PrimaryHDU(np.zeros((8, 8), dtype=np.uint16))
+    hdu.header['DATE-OBS'] = '2023-10-02T04:00:00.000'
+    hdu.header['OBJECT'] = object
+    hdu.header['IMAGETYP'] = 'Light'
+    for key, value in keywords.items():
+        hdu.header[key.replace('_', '-')] = value
+    hdu.writeto(path, overwrite=True)
+    return path
+
+def write_xisf(path: str, pixels: np.ndarray, **options) -> str:
+    """
+    Writes `pixels` with the `XISF_KEYWORDS` and an attached vector property, which header readers
+    skip. `options` are passed to `XISF.write`, e.g. a `codec`.
+    """
+    properties = {'Statistic': {'id': 'Statistic', 'type': 'F64Vector', 'value': np.linspace(0, 1, 1000)}}
+    XISF.write(path, pixels, image_metadata={'FITSKeywords': XISF_KEYWORDS, 'XISFProperties': properties}, xisf_metadata={}, **options)
+    return path
+
+def age(*paths: str):
+    """
+    Moves mtimes into the past, as if the files had been written well before the scan.
+    """
+    past = time.time() - 3600
+    for path in paths:
+        os.utime(path, (past, past))
+
+def edit(path: str, object: str):
+    """
+    Rewrites the header in place, like header editors do.
+    """
+    with fits.open(path, mode='update') as hdul:
+        hdul[0].header['OBJECT'] = object
+
 def cleanup():
     folder = test_data_folder()
     if not os.path.exists(folder):
@@ -91,7 +230,7 @@ def wait_after_saving_images(environment, nimages: int):
 
     def insertImage(image):
         nonlocal image_count
-        asyncio.run(environment['projectDB'].insertImage(image))
+        environment['projectDB'].insertImages([image])
         image_count += 1
 
     environment['fileSystemObserver'].addListener(FileSystemImageChangeListener(lambda image: insertImage(image)))